@@ -0,0 +1,113 @@
+import gzip
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from analytics.serializers import PerformanceReportSerializer
+from core.renderers import FastJSONRenderer, orjson
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark serializing and rendering a performance report (time and bytes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1000,
+            help='Number of users in the report (default: 1000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs of each step; the median and best are shown (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        report = self.build_report(options['users'])
+        repeat = max(1, options['repeat'])
+
+        data, serialize_times = self.timed(lambda: PerformanceReportSerializer(report).data, repeat)
+        stdlib, stdlib_times = self.timed(lambda: JSONRenderer().render(data), repeat)
+        fast, fast_times = self.timed(lambda: FastJSONRenderer().render(data), repeat)
+
+        self.stdout.write(f'Performance report with {options["users"]} users, {repeat} runs (median / best):')
+        self.report_time('serializer.data', serialize_times)
+        self.report_time('JSONRenderer', stdlib_times)
+        self.report_time('FastJSONRenderer' + ('' if orjson else ' (orjson missing)'), fast_times)
+        self.stdout.write(
+            f'  speed-up: {statistics.median(stdlib_times) / statistics.median(fast_times):.1f}x'
+        )
+
+        self.stdout.write('Response size:')
+        self.stdout.write(f'  identity: {len(fast):,} bytes')
+        self.stdout.write(f'  gzip:     {len(gzip.compress(fast)):,} bytes')
+        if brotli is not None:
+            self.stdout.write(f'  br:       {len(brotli.compress(fast, quality=5)):,} bytes')
+        if len(stdlib) != len(fast):
+            self.stdout.write(self.style.WARNING(f'  JSONRenderer output differs: {len(stdlib):,} bytes'))
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def build_report(self, count):
+        """A report shaped like PerformanceReportAPIView's, without the database."""
+        end_date = timezone.now().date()
+        performances = []
+        for i in range(count):
+            user = User(
+                id=i + 1, email=f'mr{i}@example.com', first_name='Medical', last_name=f'Rep {i}',
+                role='mr', phone=f'98{i:08d}', manager_id=1,
+            )
+            performances.append({
+                'user': user,
+                'performance_score': round(random.uniform(0, 100), 2),
+                'rank': i + 1,
+                'kpis': {
+                    'dcr_compliance': round(random.uniform(0, 100), 2),
+                    'call_average': round(random.uniform(0, 10), 2),
+                    'tp_submission': random.choice([0.0, 100.0]),
+                    'expense_efficiency': round(random.uniform(0, 100), 2),
+                    'total_dcrs': random.randint(0, 30),
+                    'working_days': 22,
+                    'field_work_days': random.randint(0, 22),
+                    'total_doctors_visited': random.randint(0, 120),
+                    'total_chemists_visited': random.randint(0, 60),
+                    'total_expense_amount': Decimal(random.randint(0, 500000)) / 100,
+                    'tp_submitted': random.random() < 0.8,
+                },
+            })
+        return {
+            'period_start': end_date - timedelta(days=30),
+            'period_end': end_date,
+            'total_users': count,
+            'performances': performances,
+        }
+
+    @staticmethod
+    def timed(func, repeat):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+        return result, times
+
+    def report_time(self, label, times):
+        self.stdout.write(
+            f'  {label + ":":<36} {statistics.median(times) * 1000:8.2f} ms / {min(times) * 1000:8.2f} ms'
+        )
@@ -6,6 +6,7 @@ from decimal import Decimal
 from users.models import User
 from reports.models import DailyCallReport
 from tours.models import TourProgram
+from leaves.intervals import IntervalIndex
 from leaves.models import LeaveRequest
 from expenses.models import ExpenseClaim
 from masters.models import Holiday
@@ -43,19 +44,15 @@ class PerformanceCalculator:
         # Get approved leave days
         leave_days = 0
         if exclude_leaves:
-            approved_leaves = LeaveRequest.objects.filter(
-                user=user,
-                status='approved',
-                start_date__lte=self.end_date,
-                end_date__gte=self.start_date
+            approved_leaves = (
+                LeaveRequest.objects.approved()
+                .filter(user=user)
+                .overlapping(self.start_date, self.end_date)
+                .values_list('start_date', 'end_date')
             )
             
-            for leave in approved_leaves:
-                # Calculate overlap with our date range
-                overlap_start = max(leave.start_date, self.start_date)
-                overlap_end = min(leave.end_date, self.end_date)
-                if overlap_start <= overlap_end:
-                    leave_days += (overlap_end - overlap_start).days + 1
+            # Days covered by any leave, clipped to our date range
+            leave_days = IntervalIndex(approved_leaves).covered_days(self.start_date, self.end_date)
         
         # Rough calculation: assume 5 working days per week
         # More sophisticated calculation would check actual weekdays
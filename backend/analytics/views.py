@@ -20,6 +20,7 @@ class PerformanceReportAPIView(APIView):
     API view to get performance report for users within a date range.
     """
     permission_classes = [permissions.IsAuthenticated, IsManagerOrAdmin]
+    replica_reads = True
 
     def get(self, request):
         # Get query parameters
@@ -117,6 +118,7 @@ class TopPerformersAPIView(APIView):
     API view to get top performers for dashboard widget.
     """
     permission_classes = [permissions.IsAuthenticated, IsManagerOrAdmin]
+    replica_reads = True
 
     def get(self, request):
         limit = int(request.query_params.get('limit', 3))
@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import OrganisationCounter
+
+
+@admin.register(OrganisationCounter)
+class OrganisationCounterAdmin(admin.ModelAdmin):
+    list_display = ('metric', 'scope', 'value', 'updated_at')
+    readonly_fields = ('metric', 'scope', 'value', 'updated_at')
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.core import checks
+
+        from core.checks import check_serializer_joins, check_shared_cache, require_shared_cache_for_replica
+        from . import signals  # noqa: F401
+
+        require_shared_cache_for_replica()
+        checks.register(check_shared_cache, checks.Tags.caches)
+        checks.register(check_serializer_joins, checks.Tags.urls)
@@ -0,0 +1,232 @@
+"""
+Organisation-wide counters for the admin dashboard.
+
+Each ``Counter`` names a ``(metric, scope)`` row of ``OrganisationCounter``
+and the rows of one model it counts, as a queryset filter for exact
+recounts and as a predicate over field values for incremental upkeep.
+
+Counted instances remember the values they were loaded with
+(``post_init``). When one is saved or deleted, or its status is changed by
+a bulk UPDATE (``core.signals.status_changed``), the predicates are applied
+to the old and new values and the affected rows are moved with ``F()``
+increments in the same transaction. A counter whose predicate also reads
+another model (``recount_on``, e.g. the claim owner's role) is recounted
+exactly when one of those fields changes. ``reconcile_counters`` rewrites
+them all from exact counts and is meant to run nightly.
+"""
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+from core.signals import status_changed
+from .models import OrganisationCounter
+
+DEFERRED = object()
+
+
+class Counter:
+    """A counted subset of one model's rows."""
+
+    def __init__(self, metric, scope, model, q=None, fields=(), matches=None, recount_on=None):
+        self.metric = metric
+        self.scope = scope
+        self.model = model
+        self.q = q or Q()
+        self.fields = fields
+        self._matches = matches
+        # {model label: fields} of other models the predicate reads.
+        self.recount_on = recount_on or {}
+
+    @property
+    def key(self):
+        return self.metric, self.scope
+
+    def matches(self, values, instance):
+        return self._matches is None or self._matches(values, instance)
+
+    def count(self, apps=global_apps):
+        return apps.get_model(self.model).objects.filter(self.q).count()
+
+
+def _owner_role(instance):
+    """The owner's role, read on its own unless the owner is already loaded."""
+    user_field = type(instance)._meta.get_field('user')
+    if user_field.is_cached(instance):
+        return instance.user.role
+    if not hasattr(instance, '_owner_role'):
+        instance._owner_role = (
+            user_field.related_model._default_manager.filter(pk=instance.user_id)
+            .values_list('role', flat=True).first()
+        )
+    return instance._owner_role
+
+
+COUNTERS = [
+    Counter('users', 'all', 'users.User'),
+    Counter(
+        'users', 'active', 'users.User', Q(is_active=True),
+        fields=('is_active',), matches=lambda values, instance: values['is_active'],
+    ),
+    Counter(
+        'products', 'active', 'masters.Product', Q(is_active=True),
+        fields=('is_active',), matches=lambda values, instance: values['is_active'],
+    ),
+    Counter(
+        'doctors', 'active', 'masters.Doctor', Q(is_active=True),
+        fields=('is_active',), matches=lambda values, instance: values['is_active'],
+    ),
+    Counter(
+        'chemists', 'active', 'masters.Chemist', Q(is_active=True),
+        fields=('is_active',), matches=lambda values, instance: values['is_active'],
+    ),
+    Counter('leave_requests', 'all', 'leaves.LeaveRequest'),
+    Counter('expense_claims', 'all', 'expenses.ExpenseClaim'),
+    Counter(
+        'expense_claims', 'pending:manager', 'expenses.ExpenseClaim',
+        Q(status='pending', user__role='manager'), fields=('status',),
+        matches=lambda values, instance: values['status'] == 'pending' and _owner_role(instance) == 'manager',
+        recount_on={'users.User': ('role',)},
+    ),
+    Counter('tour_programs', 'all', 'tours.TourProgram'),
+]
+
+
+def counters_for(model):
+    label = model._meta.label
+    return [counter for counter in COUNTERS if counter.model == label]
+
+
+def _snapshot_fields(model):
+    label = model._meta.label
+    return (
+        {field for counter in counters_for(model) for field in counter.fields}
+        | {field for counter in COUNTERS for field in counter.recount_on.get(label, ())}
+    )
+
+
+def _snapshot(instance):
+    return {name: instance.__dict__.get(name, DEFERRED) for name in _snapshot_fields(type(instance))}
+
+
+def get_counters():
+    """Return ``{(metric, scope): value}`` for every counter, in one query."""
+    values = {counter.key: 0 for counter in COUNTERS}
+    values.update(
+        ((metric, scope), value)
+        for metric, scope, value in OrganisationCounter.objects.values_list('metric', 'scope', 'value')
+    )
+    return values
+
+
+def adjust(counter, delta):
+    """Move ``counter`` by ``delta`` with an atomic increment."""
+    updated = OrganisationCounter.objects.filter(metric=counter.metric, scope=counter.scope).update(
+        value=F('value') + delta, updated_at=timezone.now()
+    )
+    if not updated:
+        # No row yet; the exact count already includes this change.
+        OrganisationCounter.objects.bulk_create(
+            [OrganisationCounter(metric=counter.metric, scope=counter.scope, value=counter.count())],
+            ignore_conflicts=True
+        )
+
+
+def apply_change(instance, old, new):
+    """
+    Adjust the counters of ``instance``'s model for a change from ``old``
+    to ``new`` field values; ``None`` means the row did not or no longer
+    exists.
+    """
+    for counter in counters_for(type(instance)):
+        if any(values is not None and DEFERRED in (values[f] for f in counter.fields) for values in (old, new)):
+            # Fields were not loaded; recount this one exactly.
+            reconcile_counters([counter])
+            continue
+        was = old is not None and counter.matches(old, instance)
+        now = new is not None and counter.matches(new, instance)
+        if was != now:
+            adjust(counter, 1 if now else -1)
+
+
+def recount_dependents(instance, old, new):
+    """Recount the counters of other models whose predicates read a changed field of ``instance``."""
+    label = type(instance)._meta.label
+
+    def changed(field):
+        # Fields left deferred were not written by the save.
+        return new[field] is not DEFERRED and (old[field] is DEFERRED or old[field] != new[field])
+
+    stale = [
+        counter for counter in COUNTERS
+        if any(changed(field) for field in counter.recount_on.get(label, ()))
+    ]
+    if stale:
+        reconcile_counters(stale)
+
+
+def remember_values(sender, instance, **kwargs):
+    # Model.from_db() only marks instances as loaded after __init__, so a
+    # missing primary key is what tells new rows apart.
+    instance._counter_values = None if instance.pk is None else _snapshot(instance)
+
+
+def count_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new = _snapshot(instance)
+    old = None if created else getattr(instance, '_counter_values', None)
+    apply_change(instance, old, new)
+    if old is not None:
+        recount_dependents(instance, old, new)
+    instance._counter_values = new
+
+
+def count_deleted(sender, instance, **kwargs):
+    apply_change(instance, getattr(instance, '_counter_values', None) or _snapshot(instance), None)
+
+
+def count_status_changes(sender, instances, previous_status, **kwargs):
+    for instance in instances:
+        if 'status' not in _snapshot_fields(type(instance)):
+            continue
+        new = _snapshot(instance)
+        apply_change(instance, {**new, 'status': previous_status[instance.pk]}, new)
+
+
+def connect():
+    labels = {counter.model for counter in COUNTERS}
+    labels.update(label for counter in COUNTERS for label in counter.recount_on)
+    for label in labels:
+        model = global_apps.get_model(label)
+        uid = f'counters-{label}'
+        post_init.connect(remember_values, sender=model, dispatch_uid=f'{uid}-init')
+        post_save.connect(count_saved, sender=model, dispatch_uid=f'{uid}-save')
+        post_delete.connect(count_deleted, sender=model, dispatch_uid=f'{uid}-delete')
+        status_changed.connect(count_status_changes, sender=model, dispatch_uid=f'{uid}-status')
+
+
+def reconcile_counters(counters=None, apps=global_apps):
+    """
+    Rewrite counters from exact counts.
+
+    Returns the number of counters that were out of date.
+    """
+    model = apps.get_model('api', 'OrganisationCounter')
+    corrected = 0
+    for counter in counters or COUNTERS:
+        with transaction.atomic():
+            row = (
+                model.objects.select_for_update()
+                .filter(metric=counter.metric, scope=counter.scope).first()
+            )
+            value = counter.count(apps)
+            if row is None:
+                model.objects.create(metric=counter.metric, scope=counter.scope, value=value)
+                corrected += 1
+            elif row.value != value:
+                row.value = value
+                row.save(update_fields=['value', 'updated_at'])
+                corrected += 1
+    return corrected
@@ -0,0 +1,179 @@
+"""
+Cached dashboard cards.
+
+Each role's counters are read with a single ``SELECT`` of scalar subqueries
+anchored on the requesting user's row, and the result is kept in the
+Django cache: per user for MRs and managers (whose cards cover their own
+team) and once for all admins. ``api.signals`` deletes the affected entries
+when doctors, chemists, leave requests, expense claims, tour programs,
+products or users change, including the bulk status UPDATEs announced by
+``core.signals.status_changed``.
+
+Admin cards come from the signal-maintained ``OrganisationCounter`` rows
+(see ``api.counters``) instead of counting whole tables.
+
+Invalidation reaches every worker only because the default cache is shared
+between processes (see ``CACHES``; ``core.checks`` warns otherwise).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from expenses.models import ExpenseClaim
+from leaves.models import LeaveRequest
+from masters.models import Chemist, Doctor
+from tours.models import TourProgram
+from users.models import ReportingLine, User
+from .counters import get_counters
+from .inbox import SubqueryCount
+
+ADMIN_SCOPE = 'admin'
+
+
+def cache_key(scope, today):
+    """Key of a scope's cards; the month is part of it for the tour program."""
+    return f'dashboard:{scope}:{today:%Y-%m}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TTL', 300)
+
+
+def _count(queryset):
+    return SubqueryCount(queryset.values('pk'))
+
+
+def _tour_program_columns(month, year):
+    current = TourProgram.objects.filter(user=OuterRef('pk'), month=month, year=year)
+    return {
+        'tp_status': Subquery(current.values('status')[:1]),
+        'tp_area_details': Subquery(current.values('area_details')[:1]),
+    }
+
+
+def _tour_program(row, month, year):
+    return {
+        "current_month": month,
+        "current_year": year,
+        "status": row['tp_status'] or "Not submitted",
+        "area_details": row['tp_area_details'] or "",
+    }
+
+
+def _read(user, **columns):
+    return User.objects.filter(pk=user.pk).annotate(**columns).values(*columns).get()
+
+
+def build_mr_cards(user, today):
+    row = _read(
+        user,
+        doctors_added=_count(Doctor.objects.filter(added_by=user, is_active=True)),
+        chemists_added=_count(Chemist.objects.filter(added_by=user, is_active=True)),
+        pending_leave_requests=_count(LeaveRequest.objects.filter(user=user, status='pending')),
+        pending_expense_claims=_count(ExpenseClaim.objects.filter(user=user, status='pending')),
+        **_tour_program_columns(today.month, today.year),
+    )
+    return {
+        "summary_cards": {
+            "doctors_added": row['doctors_added'],
+            "chemists_added": row['chemists_added'],
+            "pending_leave_requests": row['pending_leave_requests'],
+            "pending_expense_claims": row['pending_expense_claims'],
+        },
+        "tour_program": _tour_program(row, today.month, today.year),
+    }
+
+
+def build_manager_cards(user, today):
+    team = user.team_user_ids(include_self=False)
+    everyone = user.team_user_ids()
+    row = _read(
+        user,
+        team_members=_count(user.get_team_members()),
+        pending_tp_approvals=_count(TourProgram.objects.filter(user__in=team, status='submitted')),
+        pending_leave_approvals=_count(LeaveRequest.objects.filter(user__in=team, status='pending')),
+        pending_expense_approvals=_count(ExpenseClaim.objects.filter(user__in=team, status='pending')),
+        total_doctors=_count(Doctor.objects.filter(added_by__in=everyone, is_active=True)),
+        total_chemists=_count(Chemist.objects.filter(added_by__in=everyone, is_active=True)),
+        **_tour_program_columns(today.month, today.year),
+    )
+    return {
+        "summary_cards": {
+            "team_members": row['team_members'],
+            "pending_tp_approvals": row['pending_tp_approvals'],
+            "pending_leave_approvals": row['pending_leave_approvals'],
+            "pending_expense_approvals": row['pending_expense_approvals'],
+        },
+        "tour_program": _tour_program(row, today.month, today.year),
+        "team_summary": {
+            "total_doctors": row['total_doctors'],
+            "total_chemists": row['total_chemists'],
+        },
+    }
+
+
+def build_admin_cards(user, today):
+    counters = get_counters()
+    return {
+        "summary_cards": {
+            "total_users": counters['users', 'all'],
+            "active_users": counters['users', 'active'],
+            "total_products": counters['products', 'active'],
+            "pending_manager_expense_approvals": counters['expense_claims', 'pending:manager'],
+        },
+        "system_summary": {
+            "total_doctors": counters['doctors', 'active'],
+            "total_chemists": counters['chemists', 'active'],
+            "total_leave_requests": counters['leave_requests', 'all'],
+            "total_expense_claims": counters['expense_claims', 'all'],
+            "total_tour_programs": counters['tour_programs', 'all'],
+        },
+    }
+
+
+BUILDERS = {
+    'mr': build_mr_cards,
+    'manager': build_manager_cards,
+    'admin': build_admin_cards,
+}
+
+
+def get_dashboard_cards(user, today=None):
+    """Return the role-specific part of ``user``'s dashboard, cached."""
+    builder = BUILDERS.get(user.role)
+    if builder is None:
+        return {}
+    today = today or timezone.now().date()
+    scope = ADMIN_SCOPE if user.role == 'admin' else f'user:{user.pk}'
+    key = cache_key(scope, today)
+
+    cards = cache.get(key)
+    if cards is None:
+        cards = builder(user, today)
+        cache.set(key, cards, _cache_timeout())
+    return cards
+
+
+def _scope_keys(user_ids):
+    """Keys of every dashboard showing data owned by ``user_ids``."""
+    today = timezone.now().date()
+    scopes = set()
+    if user_ids:
+        ancestors = ReportingLine.objects.filter(descendant_id__in=user_ids).values_list('ancestor_id', flat=True)
+        scopes = {f'user:{pk}' for pk in set(ancestors) | set(user_ids)}
+    scopes.add(ADMIN_SCOPE)
+    return [cache_key(scope, today) for scope in scopes]
+
+
+def invalidate_for_users(user_ids):
+    """
+    Drop the cards of ``user_ids`` and everyone above them, now and again
+    once the current transaction commits, so a reader that rebuilt from
+    pre-commit data cannot keep it.
+    """
+    user_ids = {pk for pk in user_ids if pk is not None}
+    keys = _scope_keys(user_ids)
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys + _scope_keys(user_ids)))
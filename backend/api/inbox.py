@@ -0,0 +1,184 @@
+"""
+Merged approval inbox for managers.
+
+Pending tour programs, leave requests and expense claims of a manager's
+team are read with one ``UNION ALL`` query, ordered newest first and paged
+with an opaque cursor. Each branch joins the owner and the leave/expense
+type, and carries the per-type pending counts as scalar subqueries, so a
+page and its counts come back in a single round-trip.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import CharField, DateField, DecimalField, F, IntegerField, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
+
+from expenses.models import ExpenseClaim
+from leaves.models import LeaveRequest
+from tours.models import TourProgram
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+KINDS = ('expense_claim', 'leave_request', 'tour_program')
+
+
+class SubqueryCount(Subquery):
+    """``(SELECT COUNT(*) FROM ...)`` for an uncorrelated queryset."""
+
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+    output_field = IntegerField()
+
+
+def pending_querysets(user):
+    """
+    Return ``{kind: queryset}`` of the items awaiting ``user``'s review.
+
+    Mirrors the permissions of the single review actions: managers see
+    their team (and only MR expense claims), admins everything.
+    """
+    tours = TourProgram.objects.filter(status='submitted')
+    leaves = LeaveRequest.objects.filter(status='pending')
+    expenses = ExpenseClaim.objects.filter(status__in=('pending', 'queried'))
+    if not user.is_staff:
+        team = user.team_user_ids(include_self=False)
+        tours = tours.filter(user__in=team)
+        leaves = leaves.filter(user__in=team)
+        expenses = expenses.filter(user__in=team).exclude(user__role='manager')
+    return {'expense_claim': expenses, 'leave_request': leaves, 'tour_program': tours}
+
+
+def encode_cursor(row):
+    raw = f"{row['ts'].isoformat()}|{row['kind']}|{row['item_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return ``(timestamp, kind, id)`` or ``None`` for a malformed cursor."""
+    try:
+        ts, kind, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(ts), kind, int(item_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _after_cursor(kind, cursor):
+    """Filter for rows of ``kind`` after ``cursor`` in (-ts, -kind, -id) order."""
+    ts, cursor_kind, item_id = cursor
+    if kind < cursor_kind:
+        return Q(ts__lte=ts)
+    if kind == cursor_kind:
+        return Q(ts__lt=ts) | Q(ts=ts, pk__lt=item_id)
+    return Q(ts__lt=ts)
+
+
+def _null(output_field):
+    # A typed NULL: PostgreSQL resolves the column type of two untyped NULL
+    # branches to text, which then cannot be unioned with a date or integer.
+    return Cast(Value(None), output_field=output_field)
+
+
+def _branch(kind, queryset, counts, cursor, **columns):
+    null = {
+        'type_name': _null(CharField()),
+        'amount': _null(DecimalField(max_digits=10, decimal_places=2)),
+        'start_date': _null(DateField()),
+        'end_date': _null(DateField()),
+        'month': _null(IntegerField()),
+        'year': _null(IntegerField()),
+    }
+    null.update(columns)
+
+    queryset = queryset.annotate(ts=null.pop('ts'))
+    if cursor:
+        queryset = queryset.filter(_after_cursor(kind, cursor))
+
+    # Annotation order defines the UNION column order; keep it identical.
+    queryset = queryset.annotate(
+        kind=Value(kind, output_field=CharField()),
+        item_id=F('pk'),
+        item_ts=F('ts'),
+        item_status=F('status'),
+        owner_id=F('user_id'),
+        owner_email=F('user__email'),
+        owner_first_name=F('user__first_name'),
+        owner_last_name=F('user__last_name'),
+        item_type_name=null['type_name'],
+        item_amount=null['amount'],
+        item_start_date=null['start_date'],
+        item_end_date=null['end_date'],
+        item_month=null['month'],
+        item_year=null['year'],
+        **counts,
+    )
+    return queryset.values(
+        'kind', 'item_id', 'item_ts', 'item_status', 'owner_id', 'owner_email',
+        'owner_first_name', 'owner_last_name', 'item_type_name', 'item_amount',
+        'item_start_date', 'item_end_date', 'item_month', 'item_year', *counts
+    ).order_by()
+
+
+def get_inbox_page(user, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return ``(rows, next_cursor, counts)`` for ``user``'s inbox.
+
+    ``cursor`` is the value returned as ``next_cursor`` by a previous call.
+    """
+    sources = pending_querysets(user)
+    decoded = decode_cursor(cursor) if cursor else None
+    counts = {
+        f'{kind}_count': SubqueryCount(queryset.values('pk'))
+        for kind, queryset in sorted(sources.items())
+    }
+
+    branches = [
+        _branch(
+            'expense_claim', sources['expense_claim'], counts, decoded,
+            ts=F('submitted_at'), type_name=F('expense_type__name'), amount=F('amount'),
+        ),
+        _branch(
+            'leave_request', sources['leave_request'], counts, decoded,
+            ts=F('requested_at'), type_name=F('leave_type__name'),
+            start_date=F('start_date'), end_date=F('end_date'),
+        ),
+        _branch(
+            'tour_program', sources['tour_program'], counts, decoded,
+            ts=Coalesce('submitted_at', 'created_at'), month=F('month'), year=F('year'),
+        ),
+    ]
+    query = branches[0].union(*branches[1:], all=True).order_by('-item_ts', '-kind', '-item_id')
+    rows = list(query[:page_size + 1])
+
+    if rows:
+        count_values = {kind: rows[0][f'{kind}_count'] for kind in KINDS}
+    else:
+        count_values = {kind: sources[kind].count() for kind in KINDS}
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor({'ts': last['item_ts'], 'kind': last['kind'], 'item_id': last['item_id']})
+
+    return [_present(row) for row in rows], next_cursor, count_values
+
+
+def _present(row):
+    first_name, last_name = row['owner_first_name'] or '', row['owner_last_name'] or ''
+    return {
+        'type': row['kind'],
+        'id': row['item_id'],
+        'submitted_at': row['item_ts'],
+        'status': row['item_status'],
+        'user': {
+            'id': row['owner_id'],
+            'email': row['owner_email'],
+            'full_name': f'{first_name} {last_name}'.strip() or row['owner_email'],
+        },
+        'type_name': row['item_type_name'],
+        'amount': row['item_amount'],
+        'start_date': row['item_start_date'],
+        'end_date': row['item_end_date'],
+        'month': row['item_month'],
+        'year': row['item_year'],
+    }
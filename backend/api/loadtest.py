@@ -0,0 +1,369 @@
+"""
+HTTP load testing against a running server.
+
+``manage.py seed_load_data`` fills the database with a team hierarchy of
+``@loadtest.local`` users and their data (only with ``DEBUG`` on or
+``--allow-production``, and with a password given on the command line);
+``manage.py load_test`` then signs those users in through ``/api/token/``
+and has each virtual user replay a weighted mix of the calls the app makes,
+with real HTTP requests to ``runserver`` or gunicorn on the same machine.
+
+Setup (which users exist, their contacts, their pending claims) is read
+from the database the command is configured with, so the server under test
+must use the same one. Only the standard library is used for the traffic.
+"""
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.db.models import Max
+from django.utils import timezone
+
+from expenses.models import ExpenseClaim
+from masters.models import Chemist, Doctor
+from reports.models import DailyCallReport
+from users.models import User
+
+SEED_DOMAIN = 'loadtest.local'
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values``; ``None`` when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Stats:
+    """Thread-safe latency samples per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, seconds, ok):
+        with self._lock:
+            self.samples[name].append(seconds * 1000)
+            if not ok:
+                self.errors[name] += 1
+
+    def summary(self, elapsed):
+        """Rows of ``count, errors, rps`` and latency percentiles in ms."""
+        rows = []
+        for name in sorted(self.samples):
+            values = self.samples[name]
+            rows.append({
+                'endpoint': name,
+                'count': len(values),
+                'errors': self.errors[name],
+                'rps': round(len(values) / elapsed, 2) if elapsed else 0.0,
+                'mean_ms': round(sum(values) / len(values), 2),
+                'p50_ms': round(percentile(values, 50), 2),
+                'p95_ms': round(percentile(values, 95), 2),
+                'p99_ms': round(percentile(values, 99), 2),
+                'max_ms': round(max(values), 2),
+            })
+        return rows
+
+
+class Client:
+    """Persistent HTTP/1.1 connection of one virtual user."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+        self.prefix = parts.path.rstrip('/')
+        self.token = None
+
+    def request(self, method, path, data=None):
+        """Send a request and return ``(status, parsed body)``."""
+        headers = {'Accept': 'application/json'}
+        body = None
+        if data is not None:
+            body = json.dumps(data)
+            headers['Content-Type'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+
+        for attempt in (1, 2):
+            try:
+                self.connection.request(method, self.prefix + path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                content = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection.
+                self.connection.close()
+                if attempt == 2:
+                    raise
+        try:
+            parsed = json.loads(content) if content else None
+        except ValueError:
+            parsed = None
+        return response.status, parsed
+
+    def close(self):
+        self.connection.close()
+
+
+class Scenario:
+    """One kind of call and the roles that make it."""
+
+    def __init__(self, name, roles, weight, run):
+        self.name = name
+        self.roles = roles
+        self.weight = weight
+        self.run = run
+
+
+def _date_range(days=30):
+    today = timezone.now().date()
+    return {'start_date': str(today - timedelta(days=days)), 'end_date': str(today)}
+
+
+def dashboard(user, client):
+    return client.request('GET', '/api/dashboard/')
+
+
+def dcr_list(user, client):
+    return client.request('GET', '/api/reports/daily-call-reports/')
+
+
+def dcr_create(user, client):
+    report_date = user.take_dcr_date()
+    visits = {}
+    if user.doctor_ids:
+        visits['doctors_visited'] = random.sample(user.doctor_ids, min(3, len(user.doctor_ids)))
+    if user.chemist_ids:
+        visits['chemists_visited'] = random.sample(user.chemist_ids, min(2, len(user.chemist_ids)))
+    return client.request('POST', '/api/reports/daily-call-reports/', {
+        'date': str(report_date),
+        'work_type': 'field_work' if visits else 'office_work',
+        'summary': 'Load test visit',
+        **visits,
+    })
+
+
+def unread_count(user, client):
+    return client.request('GET', '/api/notifications/unread_count/')
+
+
+def expense_approve(user, client):
+    try:
+        claim_id = user.pending_claims.popleft()
+    except IndexError:
+        return None
+    return client.request('POST', f'/api/expenses/expense-claims/{claim_id}/approve/', {
+        'manager_comments': 'Approved by load test',
+    })
+
+
+def dcr_summary(user, client):
+    return client.request('GET', '/api/reports/dcr-summary/?' + urlencode(_date_range()))
+
+
+def expense_summary(user, client):
+    return client.request('GET', '/api/reports/expense-summary/?' + urlencode(_date_range()))
+
+
+def leave_summary(user, client):
+    return client.request('GET', '/api/reports/leave-summary/?' + urlencode(_date_range()))
+
+
+def performance_report(user, client):
+    return client.request('GET', '/api/analytics/performance-report/?' + urlencode(_date_range()))
+
+
+def top_performers(user, client):
+    return client.request('GET', '/api/analytics/top-performers/?days=30')
+
+
+MR = ('mr',)
+MANAGER = ('manager',)
+EVERYONE = ('mr', 'manager')
+
+SCENARIOS = [
+    Scenario('dashboard', EVERYONE, 25, dashboard),
+    Scenario('dcr_list', EVERYONE, 15, dcr_list),
+    Scenario('dcr_create', MR, 10, dcr_create),
+    Scenario('unread_count', EVERYONE, 25, unread_count),
+    Scenario('expense_approve', MANAGER, 10, expense_approve),
+    Scenario('dcr_summary', EVERYONE, 5, dcr_summary),
+    Scenario('expense_summary', MANAGER, 3, expense_summary),
+    Scenario('leave_summary', MANAGER, 3, leave_summary),
+    Scenario('performance_report', MANAGER, 2, performance_report),
+    Scenario('top_performers', MANAGER, 2, top_performers),
+]
+
+
+def parse_mix(text):
+    """Parse ``name=weight,...`` into a weight per scenario, others 0."""
+    names = {scenario.name for scenario in SCENARIOS}
+    weights = dict.fromkeys(names, 0)
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = item.partition('=')
+        if name not in names:
+            raise ValueError(f'Unknown scenario: {name}')
+        weights[name] = float(weight)
+    return weights
+
+
+class VirtualUserState:
+    """What one virtual user needs to know about the account it drives."""
+
+    def __init__(self, user, doctor_ids, chemist_ids, next_dcr_date, pending_claims):
+        self.email = user.email
+        self.role = user.role
+        self.doctor_ids = doctor_ids
+        self.chemist_ids = chemist_ids
+        self.next_dcr_date = next_dcr_date
+        self.pending_claims = pending_claims
+        self._lock = threading.Lock()
+
+    def take_dcr_date(self):
+        """Next unused report date; accounts can be shared by virtual users."""
+        with self._lock:
+            self.next_dcr_date += timedelta(days=1)
+            return self.next_dcr_date
+
+
+def load_accounts(count, manager_share):
+    """
+    Pick ``count`` seeded accounts, about ``manager_share`` of them managers.
+
+    Accounts are reused round-robin when there are fewer than asked for,
+    and virtual users driving the same account share its state.
+    """
+    seeded = User.objects.filter(email__endswith=f'@{SEED_DOMAIN}', is_active=True).order_by('pk')
+    managers = list(seeded.filter(role='manager'))
+    mrs = list(seeded.filter(role='mr'))
+    if not managers or not mrs:
+        raise ValueError('No seeded users found; run "manage.py seed_load_data" first.')
+
+    manager_slots = min(count, max(1, round(count * manager_share)))
+    picked = [managers[i % len(managers)] for i in range(manager_slots)]
+    picked += [mrs[i % len(mrs)] for i in range(count - manager_slots)]
+    user_ids = {user.pk for user in picked}
+
+    contacts = defaultdict(lambda: ([], []))
+    for doctor_id, owner_id in Doctor.objects.filter(added_by__in=user_ids, is_active=True).values_list('pk', 'added_by'):
+        contacts[owner_id][0].append(doctor_id)
+    for chemist_id, owner_id in Chemist.objects.filter(added_by__in=user_ids, is_active=True).values_list('pk', 'added_by'):
+        contacts[owner_id][1].append(chemist_id)
+
+    # New reports are filed after every existing one, so dates never clash.
+    last_dates = dict(
+        DailyCallReport.objects.filter(user__in=user_ids).values('user').annotate(last=Max('date'))
+        .values_list('user', 'last')
+    )
+    today = timezone.now().date()
+
+    claim_queues = {}
+    for manager in {user for user in picked if user.role == 'manager'}:
+        claim_queues[manager.pk] = deque(
+            ExpenseClaim.objects.filter(user__in=manager.team_user_ids(include_self=False), status='pending')
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    states = {}
+    for user in picked:
+        if user.pk not in states:
+            doctor_ids, chemist_ids = contacts[user.pk]
+            states[user.pk] = VirtualUserState(
+                user, doctor_ids, chemist_ids,
+                max(last_dates.get(user.pk) or today, today),
+                claim_queues.get(user.pk, deque()),
+            )
+    return [states[user.pk] for user in picked]
+
+
+class LoadTest:
+    """Drive virtual users against ``base_url`` and collect latencies."""
+
+    def __init__(self, base_url, accounts, password, weights=None, duration=60.0,
+                 requests=None, ramp_up=0.0, think_time=0.0, timeout=30.0):
+        self.base_url = base_url
+        self.accounts = accounts
+        self.password = password
+        self.weights = weights or {scenario.name: scenario.weight for scenario in SCENARIOS}
+        self.duration = duration
+        self.requests = requests
+        self.ramp_up = ramp_up
+        self.think_time = think_time
+        self.timeout = timeout
+        self.stats = Stats()
+        self._issued = 0
+        self._lock = threading.Lock()
+        self._deadline = None
+
+    def scenarios_for(self, role):
+        scenarios = [s for s in SCENARIOS if role in s.roles and self.weights.get(s.name, 0) > 0]
+        return scenarios, [self.weights[s.name] for s in scenarios]
+
+    def _take_slot(self):
+        if time.monotonic() >= self._deadline:
+            return False
+        if self.requests is None:
+            return True
+        with self._lock:
+            if self._issued >= self.requests:
+                return False
+            self._issued += 1
+            return True
+
+    def _timed(self, name, call):
+        start = time.perf_counter()
+        try:
+            result = call()
+        except (OSError, http.client.HTTPException):
+            self.stats.record(name, time.perf_counter() - start, ok=False)
+            return None
+        if result is None:
+            return None
+        self.stats.record(name, time.perf_counter() - start, ok=result[0] < 400)
+        return result
+
+    def virtual_user(self, index, account):
+        if self.ramp_up and len(self.accounts) > 1:
+            time.sleep(self.ramp_up * index / len(self.accounts))
+        client = Client(self.base_url, self.timeout)
+        try:
+            result = self._timed('login', lambda: client.request(
+                'POST', '/api/token/', {'email': account.email, 'password': self.password}
+            ))
+            if result is None or result[0] != 200:
+                return
+            client.token = result[1]['access']
+
+            scenarios, weights = self.scenarios_for(account.role)
+            if not scenarios:
+                return
+            while self._take_slot():
+                scenario = random.choices(scenarios, weights)[0]
+                self._timed(scenario.name, lambda: scenario.run(account, client))
+                if self.think_time:
+                    time.sleep(random.uniform(0, 2 * self.think_time))
+        finally:
+            client.close()
+
+    def run(self):
+        """Run to completion and return ``(elapsed seconds, summary rows)``."""
+        start = time.monotonic()
+        self._deadline = start + self.duration + self.ramp_up
+        with ThreadPoolExecutor(max_workers=len(self.accounts)) as pool:
+            futures = [pool.submit(self.virtual_user, i, account) for i, account in enumerate(self.accounts)]
+            for future in futures:
+                future.result()
+        elapsed = time.monotonic() - start
+        return elapsed, self.stats.summary(elapsed)
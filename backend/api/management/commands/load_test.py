@@ -0,0 +1,82 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.loadtest import SCENARIOS, LoadTest, load_accounts, parse_mix
+
+
+class Command(BaseCommand):
+    help = 'Replay a mix of API calls with concurrent virtual users and report latency per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server under test')
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users (default: 20)')
+        parser.add_argument('--manager-share', type=float, default=0.2,
+                            help='Fraction of virtual users signed in as managers (default: 0.2)')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds to run after ramp-up (default: 60)')
+        parser.add_argument('--requests', type=int, help='Stop after this many calls in total instead')
+        parser.add_argument('--ramp-up', type=float, default=5, help='Seconds over which users start (default: 5)')
+        parser.add_argument('--think-time', type=float, default=0,
+                            help='Mean pause between a user\'s calls, in seconds (default: 0)')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+        parser.add_argument('--mix', help='Scenario weights as name=weight,... (available: %s)' % ', '.join(
+            scenario.name for scenario in SCENARIOS
+        ))
+        parser.add_argument('--password', required=True,
+                            help='Password the users were seeded with ("seed_load_data --password")')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+        parser.add_argument('--max-p95', type=float, help='Fail if any endpoint\'s p95 exceeds this many ms')
+        parser.add_argument('--max-error-rate', type=float,
+                            help='Fail if more than this fraction of calls fail (e.g. 0.01)')
+
+    def handle(self, *args, **options):
+        try:
+            weights = parse_mix(options['mix']) if options['mix'] else None
+            accounts = load_accounts(options['users'], options['manager_share'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f'Running {len(accounts)} virtual users against {options["base_url"]}...'
+        )
+        test = LoadTest(
+            options['base_url'], accounts, options['password'], weights=weights,
+            duration=options['duration'], requests=options['requests'], ramp_up=options['ramp_up'],
+            think_time=options['think_time'], timeout=options['timeout'],
+        )
+        elapsed, rows = test.run()
+        self.print_table(elapsed, rows)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'elapsed': round(elapsed, 2), 'users': len(accounts), 'endpoints': rows}, f, indent=2)
+
+        self.check_thresholds(rows, options)
+
+    def print_table(self, elapsed, rows):
+        columns = ['endpoint', 'count', 'errors', 'rps', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+        widths = [max([len(column)] + [len(str(row[column])) for row in rows]) for column in columns]
+        self.stdout.write('  '.join(column.rjust(width) for column, width in zip(columns, widths)))
+        for row in rows:
+            self.stdout.write('  '.join(str(row[column]).rjust(width) for column, width in zip(columns, widths)))
+
+        total = sum(row['count'] for row in rows)
+        errors = sum(row['errors'] for row in rows)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} calls in {elapsed:.1f}s ({total / elapsed:.1f} req/s), {errors} errors'
+        ))
+
+    def check_thresholds(self, rows, options):
+        failures = []
+        if options['max_p95'] is not None:
+            failures += [
+                f'{row["endpoint"]} p95 {row["p95_ms"]}ms > {options["max_p95"]}ms'
+                for row in rows if row['p95_ms'] > options['max_p95']
+            ]
+        total = sum(row['count'] for row in rows)
+        if options['max_error_rate'] is not None and total:
+            rate = sum(row['errors'] for row in rows) / total
+            if rate > options['max_error_rate']:
+                failures.append(f'error rate {rate:.2%} > {options["max_error_rate"]:.2%}')
+        if failures:
+            raise CommandError('; '.join(failures))
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.partitioning import MIN_POSTGRESQL_VERSION, PARTITIONED_MODELS, MonthlyPartitioning
+
+
+class Command(BaseCommand):
+    help = (
+        'Create upcoming and detach old monthly partitions of the DCR (with its visits) '
+        'and expense claim tables (PostgreSQL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Rebuild tables that are not partitioned yet as partitioned tables (locks them while copying)',
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.PARTITION_MONTHS_AHEAD,
+            help=f'Months of future partitions to keep ready (default: {settings.PARTITION_MONTHS_AHEAD})',
+        )
+        parser.add_argument(
+            '--retain-months',
+            type=int,
+            default=settings.PARTITION_RETAIN_MONTHS,
+            help='Detach partitions older than this many months (default: %(default)s, 0 = never)',
+        )
+        parser.add_argument(
+            '--model',
+            choices=PARTITIONED_MODELS,
+            help='Only manage this model\'s table',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the statements instead of running them',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Table partitioning requires PostgreSQL.')
+        if options['convert'] and connection.pg_version < MIN_POSTGRESQL_VERSION:
+            # Checked before any table is touched, so no model is left half done.
+            raise CommandError(
+                f'--convert requires PostgreSQL {MIN_POSTGRESQL_VERSION // 10000} or later; this server is '
+                f'{connection.pg_version // 10000}.{connection.pg_version % 10000}. Earlier versions delete a '
+                'report\'s visits when its date moves it to another partition.'
+            )
+
+        labels = [options['model']] if options['model'] else PARTITIONED_MODELS
+        for label in labels:
+            partitioning = MonthlyPartitioning.for_label(label, dry_run=options['dry_run'])
+            if not partitioning.is_partitioned():
+                if not options['convert']:
+                    self.stdout.write(self.style.WARNING(
+                        f'{partitioning.table} is not partitioned; run with --convert to partition it'
+                    ))
+                    continue
+                self.stdout.write(f'Converting {partitioning.table}...')
+                for note in partitioning.convert(options['months_ahead']):
+                    self.stdout.write(self.style.WARNING(f'  {note}'))
+                if options['dry_run']:
+                    # The table is unchanged, so there is nothing more to plan.
+                    self.print_statements(partitioning)
+                    continue
+
+            created = partitioning.ensure_partitions(options['months_ahead'])
+            detached = []
+            if options['retain_months'] > 0:
+                detached = partitioning.detach_partitions(options['retain_months'])
+            if options['dry_run']:
+                self.print_statements(partitioning)
+            self.stdout.write(self.style.SUCCESS(
+                f'{partitioning.table}: {len(created)} partitions created, {len(detached)} detached'
+                + (f' ({", ".join(detached)})' if detached else '')
+            ))
+
+    def print_statements(self, partitioning):
+        for statement in partitioning.statements:
+            self.stdout.write(f'  {statement};')
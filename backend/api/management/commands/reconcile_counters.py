@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.counters import COUNTERS, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the organisation counters shown on the admin dashboard (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--metric',
+            type=str,
+            help='Only reconcile the counters of this metric (e.g. expense_claims)',
+        )
+
+    def handle(self, *args, **options):
+        counters = COUNTERS
+        if options['metric']:
+            counters = [counter for counter in COUNTERS if counter.metric == options['metric']]
+            if not counters:
+                self.stdout.write(self.style.ERROR(f'Unknown metric: {options["metric"]}'))
+                return
+
+        corrected = reconcile_counters(counters)
+        self.stdout.write(self.style.SUCCESS(f'Reconciled organisation counters ({corrected} corrected)'))
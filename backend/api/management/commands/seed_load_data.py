@@ -0,0 +1,168 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.counters import reconcile_counters
+from api.dashboard import invalidate_for_users
+from api.loadtest import SEED_DOMAIN
+from expenses.models import ExpenseClaim
+from leaves.models import LeaveRequest
+from masters.models import Chemist, ChemistCategory, Doctor, DoctorSpecialty, ExpenseType, LeaveType
+from notifications.models import Notification
+from notifications.utils import reconcile_unread_counts
+from reports.models import ChemistVisit, DailyCallReport, DoctorVisit
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Seed a team hierarchy and its activity for "manage.py load_test"'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--managers', type=int, default=5, help='Number of managers (default: 5)')
+        parser.add_argument('--mrs-per-manager', type=int, default=10, help='MRs reporting to each manager (default: 10)')
+        parser.add_argument('--days', type=int, default=60, help='Days of daily call reports per MR (default: 60)')
+        parser.add_argument('--contacts', type=int, default=20, help='Doctors and chemists per MR (default: 20)')
+        parser.add_argument('--claims', type=int, default=20, help='Pending expense claims per MR (default: 20)')
+        parser.add_argument('--notifications', type=int, default=50, help='Notifications per user (default: 50)')
+        parser.add_argument('--password', required=True, help='Password of every seeded user')
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded users and their data first')
+        parser.add_argument('--allow-production', action='store_true',
+                            help='Seed even though DEBUG is off (the users can sign in to this database)')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['allow_production']:
+            raise CommandError(
+                'Refusing to seed load-test users with DEBUG off; pass --allow-production '
+                'if this database is really meant for load testing.'
+            )
+
+        seeded = User.objects.filter(email__endswith=f'@{SEED_DOMAIN}')
+        if options['clear']:
+            self.stdout.write('Deleting previously seeded users...')
+            # Contacts are detached rather than deleted when their owner goes.
+            Doctor.objects.filter(added_by__in=seeded).delete()
+            Chemist.objects.filter(added_by__in=seeded).delete()
+            seeded.delete()
+        elif seeded.exists():
+            self.stdout.write(self.style.ERROR('Seeded users already exist; pass --clear to replace them.'))
+            return
+
+        with transaction.atomic():
+            specialty, _ = DoctorSpecialty.objects.get_or_create(name='General Medicine')
+            category, _ = ChemistCategory.objects.get_or_create(name='Retail Pharmacy')
+            expense_type = ExpenseType.objects.filter(is_active=True).first() or ExpenseType.objects.create(
+                name='Travel', code='TR', max_amount=5000
+            )
+            leave_type = LeaveType.objects.filter(is_active=True).first() or LeaveType.objects.create(
+                name='Casual Leave', code='CL', max_days_per_year=15
+            )
+
+            managers, mrs = self.create_users(options)
+            self.create_contacts(mrs, options['contacts'], specialty, category)
+            self.create_reports(mrs, options['days'])
+            self.create_claims(mrs, options['claims'], expense_type)
+            self.create_leaves(mrs, leave_type)
+            self.create_notifications(managers + mrs, options['notifications'])
+
+        # Bulk inserts skip the signals that keep these up to date.
+        reconcile_counters()
+        reconcile_unread_counts([user.pk for user in managers + mrs])
+        invalidate_for_users([user.pk for user in managers + mrs])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(managers)} managers and {len(mrs)} MRs'
+        ))
+
+    def create_users(self, options):
+        # Hashing once keeps large seeds fast; save() maintains the reporting lines.
+        password = make_password(options['password'])
+        managers, mrs = [], []
+        for m in range(options['managers']):
+            manager = User(
+                email=f'manager{m}@{SEED_DOMAIN}', first_name='Manager', last_name=str(m),
+                role='manager', password=password,
+            )
+            manager.save()
+            managers.append(manager)
+            for r in range(options['mrs_per_manager']):
+                mr = User(
+                    email=f'mr{m}-{r}@{SEED_DOMAIN}', first_name='MR', last_name=f'{m}-{r}',
+                    role='mr', manager=manager, password=password,
+                )
+                mr.save()
+                mrs.append(mr)
+        return managers, mrs
+
+    def create_contacts(self, mrs, count, specialty, category):
+        Doctor.objects.bulk_create([
+            Doctor(name=f'Dr. Load {i}', specialty=specialty, location=f'Clinic {i}', added_by=mr)
+            for mr in mrs for i in range(count)
+        ], batch_size=1000)
+        Chemist.objects.bulk_create([
+            Chemist(name=f'Pharmacy {i}', category=category, location=f'Street {i}', added_by=mr)
+            for mr in mrs for i in range(count)
+        ], batch_size=1000)
+
+    def create_reports(self, mrs, days):
+        today = timezone.now().date()
+        doctors, chemists = {}, {}
+        for pk, owner in Doctor.objects.filter(added_by__in=mrs).values_list('pk', 'added_by'):
+            doctors.setdefault(owner, []).append(pk)
+        for pk, owner in Chemist.objects.filter(added_by__in=mrs).values_list('pk', 'added_by'):
+            chemists.setdefault(owner, []).append(pk)
+
+        reports = DailyCallReport.objects.bulk_create([
+            DailyCallReport(
+                user=mr, date=today - timedelta(days=day), work_type='field_work',
+                summary=f'Field work on day {day}',
+            )
+            for mr in mrs for day in range(1, days + 1)
+        ], batch_size=1000)
+        if not reports or reports[0].pk is None:
+            reports = list(DailyCallReport.objects.filter(user__in=mrs))
+
+        doctor_visits, chemist_visits = [], []
+        for report in reports:
+            owned_doctors = doctors.get(report.user_id, [])
+            owned_chemists = chemists.get(report.user_id, [])
+            doctor_visits += [
+                DoctorVisit(dailycallreport_id=report.pk, date=report.date, doctor_id=pk)
+                for pk in random.sample(owned_doctors, min(4, len(owned_doctors)))
+            ]
+            chemist_visits += [
+                ChemistVisit(dailycallreport_id=report.pk, date=report.date, chemist_id=pk)
+                for pk in random.sample(owned_chemists, min(2, len(owned_chemists)))
+            ]
+        DoctorVisit.objects.bulk_create(doctor_visits, batch_size=1000)
+        ChemistVisit.objects.bulk_create(chemist_visits, batch_size=1000)
+
+    def create_claims(self, mrs, count, expense_type):
+        today = timezone.now().date()
+        ExpenseClaim.objects.bulk_create([
+            ExpenseClaim(
+                user=mr, expense_type=expense_type, amount=Decimal(random.randint(100, 2000)),
+                date=today - timedelta(days=i % 28), description='Load test claim', status='pending',
+            )
+            for mr in mrs for i in range(count)
+        ], batch_size=1000)
+
+    def create_leaves(self, mrs, leave_type):
+        # Saved one by one so the leave balances follow.
+        today = timezone.now().date()
+        for mr in mrs:
+            LeaveRequest.objects.create(
+                user=mr, leave_type=leave_type, start_date=today + timedelta(days=7),
+                end_date=today + timedelta(days=8), reason='Load test leave', status='pending',
+            )
+
+    def create_notifications(self, users, count):
+        Notification.objects.bulk_create([
+            Notification(recipient=user, verb=f'load test notification {i}', unread=i % 3 == 0)
+            for user in users for i in range(count)
+        ], batch_size=1000)
@@ -0,0 +1,61 @@
+import glob
+import io
+import os
+import pstats
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Summarise the hottest functions across profiles captured by ProfilingMiddleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoint',
+            type=str,
+            help='Only include endpoints whose name contains this text (e.g. analytics_performance)',
+        )
+        parser.add_argument(
+            '--hours',
+            type=int,
+            help='Only include profiles captured in the last N hours',
+        )
+        parser.add_argument(
+            '--sort',
+            choices=['cumulative', 'tottime', 'ncalls'],
+            default='cumulative',
+            help='Order functions by cumulative time, own time or call count (default: cumulative)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=25,
+            help='Number of functions to show (default: 25)',
+        )
+
+    def handle(self, *args, **options):
+        paths = sorted(glob.glob(os.path.join(settings.PROFILING_DIR, '*', '*.prof')))
+        if options['endpoint']:
+            paths = [path for path in paths if options['endpoint'] in os.path.basename(os.path.dirname(path))]
+        if options['hours']:
+            cutoff = (datetime.now() - timedelta(hours=options['hours'])).timestamp()
+            paths = [path for path in paths if os.path.getmtime(path) >= cutoff]
+
+        if not paths:
+            self.stdout.write(self.style.WARNING(f'No profiles found in {settings.PROFILING_DIR}'))
+            return
+
+        endpoints = {}
+        for path in paths:
+            endpoint = os.path.basename(os.path.dirname(path))
+            endpoints[endpoint] = endpoints.get(endpoint, 0) + 1
+        for endpoint, count in sorted(endpoints.items(), key=lambda item: -item[1]):
+            self.stdout.write(f'{count:6d}  {endpoint}')
+
+        output = io.StringIO()
+        stats = pstats.Stats(*paths, stream=output)
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(output.getvalue())
+        self.stdout.write(self.style.SUCCESS(f'Summarised {len(paths)} profiles'))
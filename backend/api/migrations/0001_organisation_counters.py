@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:17
+
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    """Start every counter from an exact count."""
+    from api.counters import reconcile_counters
+
+    reconcile_counters(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('expenses', '0002_content_addressed_attachments'),
+        ('leaves', '0003_leave_intervals'),
+        ('masters', '0003_territory_path'),
+        ('tours', '0001_initial'),
+        ('users', '0002_reporting_line'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganisationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=50, verbose_name='Metric')),
+                ('scope', models.CharField(default='all', max_length=50, verbose_name='Scope')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Value')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Organisation Counter',
+                'verbose_name_plural': 'Organisation Counters',
+                'ordering': ['metric', 'scope'],
+                'unique_together': {('metric', 'scope')},
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
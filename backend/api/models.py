@@ -1,3 +1,26 @@
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+
+class OrganisationCounter(models.Model):
+    """
+    Denormalized organisation-wide count, such as active users or pending
+    manager expense claims.
+
+    Kept current by ``api.counters`` from model signals and corrected by
+    the ``reconcile_counters`` management command.
+    """
+
+    metric = models.CharField(_('Metric'), max_length=50)
+    scope = models.CharField(_('Scope'), max_length=50, default='all')
+    value = models.BigIntegerField(_('Value'), default=0)
+    updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Organisation Counter')
+        verbose_name_plural = _('Organisation Counters')
+        unique_together = ['metric', 'scope']
+        ordering = ['metric', 'scope']
+
+    def __str__(self):
+        return f"{self.metric} ({self.scope}): {self.value}"
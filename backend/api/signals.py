@@ -0,0 +1,56 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.signals import status_changed
+from expenses.models import ExpenseClaim
+from leaves.models import LeaveRequest
+from masters.models import Chemist, Doctor, Product
+from tours.models import TourProgram
+from users.models import User
+from . import counters
+from .dashboard import invalidate_for_users
+
+# Models shown on the dashboard, with the field naming the user they count for.
+DASHBOARD_MODELS = {
+    Doctor: 'added_by_id',
+    Chemist: 'added_by_id',
+    LeaveRequest: 'user_id',
+    ExpenseClaim: 'user_id',
+    TourProgram: 'user_id',
+    Product: None,
+}
+
+
+def invalidate_dashboards(sender, instance, **kwargs):
+    """Drop the cached cards that count ``instance``."""
+    owner_field = DASHBOARD_MODELS[sender]
+    invalidate_for_users([getattr(instance, owner_field)] if owner_field else [])
+
+
+for model in DASHBOARD_MODELS:
+    post_save.connect(invalidate_dashboards, sender=model, dispatch_uid=f'dashboard-save-{model.__name__}')
+    post_delete.connect(invalidate_dashboards, sender=model, dispatch_uid=f'dashboard-delete-{model.__name__}')
+
+
+counters.connect()
+
+
+@receiver(status_changed)
+def invalidate_reviewed_dashboards(sender, instances, **kwargs):
+    """Bulk reviews change statuses with one UPDATE, which sends no post_save."""
+    invalidate_for_users({instance.user_id for instance in instances})
+
+
+@receiver(post_save, sender=User)
+@receiver(pre_delete, sender=User)
+def invalidate_user_dashboards(sender, instance, update_fields=None, **kwargs):
+    """
+    Users count towards their managers' team and the admin totals.
+
+    ``post_save`` runs before the reporting lines are rewired, so the former
+    managers are dropped now and the new ones once the change commits;
+    deletions are handled before the user's reporting lines go.
+    """
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_for_users([instance.pk])
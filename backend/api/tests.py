@@ -1,3 +1,858 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipUnless
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import LiveServerTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.checks import check_serializer_joins, check_shared_cache, require_shared_cache_for_replica
+from core.db_routers import CACHE_TABLE_APP_LABEL, ReplicaRouter, pin_to_primary
+from core.fanout import fan_out, shutdown as shutdown_fanout
+from core.middleware import accepted_encodings
+from core.partitioning import MIN_POSTGRESQL_VERSION, MonthlyPartitioning, add_months, key_columns
+from core.renderers import FastJSONRenderer
+from core.testing import DATABASE_CACHE, LOCAL_CACHE
+from expenses.models import ExpenseClaim
+from expenses.serializers import ExpenseClaimSerializer
+from expenses.views import ExpenseClaimViewSet
+from leaves.models import LeaveRequest
+from masters.cache import get_active_holidays
+from masters.models import Chemist, ChemistCategory, Doctor, DoctorSpecialty, ExpenseType, LeaveType
+from reports.models import ChemistVisit, DailyCallReport, DoctorVisit
+from tours.models import TourProgram
+from .counters import get_counters
+from .loadtest import percentile
+from .models import OrganisationCounter
+
+User = get_user_model()
+
+class InboxTestCase(APITestCase):
+    """Test cases for the merged approval inbox."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(email='manager@test.com', role='manager')
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr', manager=self.manager)
+        outsider = User.objects.create_user(email='outsider@test.com', role='mr')
+        expense_type = ExpenseType.objects.create(name='Travel', code='TR')
+        leave_type = LeaveType.objects.create(name='Casual Leave', code='CL')
+
+        now = timezone.now()
+        for i, user in enumerate([self.mr, self.mr, outsider]):
+            claim = ExpenseClaim.objects.create(
+                user=user, expense_type=expense_type, amount=Decimal('10.00'),
+                date=date(2030, 1, 1), description='Taxi'
+            )
+            ExpenseClaim.objects.filter(pk=claim.pk).update(submitted_at=now - timedelta(hours=i * 3))
+        leave = LeaveRequest.objects.create(
+            user=self.mr, leave_type=leave_type, start_date=date(2030, 2, 1),
+            end_date=date(2030, 2, 2), reason='Trip'
+        )
+        LeaveRequest.objects.filter(pk=leave.pk).update(requested_at=now - timedelta(hours=1))
+        TourProgram.objects.create(
+            user=self.mr, month=3, year=2030, area_details='North', status='submitted',
+            submitted_at=now - timedelta(hours=2)
+        )
+        TourProgram.objects.create(user=self.mr, month=4, year=2030, area_details='South')
+
+        self.client.force_authenticate(user=self.manager)
+
+    def test_feed_is_merged_ordered_and_paginated(self):
+        """Test that the feed merges all types newest first across cursor pages."""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/inbox/', {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['counts'], {
+            'expense_claim': 2, 'leave_request': 1, 'tour_program': 1, 'total': 4
+        })
+        self.assertEqual(
+            [item['type'] for item in response.data['results']],
+            ['expense_claim', 'leave_request', 'tour_program']
+        )
+        self.assertEqual(response.data['results'][0]['type_name'], 'Travel')
+        self.assertEqual(response.data['results'][2]['month'], 3)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([item['type'] for item in response.data['results']], ['expense_claim'])
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(response.data['counts']['total'], 4)
+
+    def test_mr_has_no_inbox(self):
+        """Test that MRs are refused."""
+        self.client.force_authenticate(user=self.mr)
+        self.assertEqual(self.client.get('/api/inbox/').status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ListQueryCountTestCase(APITestCase):
+    """Test cases for flat query counts on the list endpoints."""
+
+    endpoints = [
+        '/api/expenses/expense-claims/',
+        '/api/leaves/leave-requests/',
+        '/api/tours/tour-programs/',
+        '/api/reports/daily-call-reports/',
+        '/api/masters/doctors/',
+        '/api/masters/chemists/',
+    ]
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@test.com', role='manager', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        self.expense_type = ExpenseType.objects.create(name='Travel', code='TR')
+        self.leave_type = LeaveType.objects.create(name='Casual Leave', code='CL')
+        self.specialty = DoctorSpecialty.objects.create(name='Cardiology')
+        self.category = ChemistCategory.objects.create(name='Retail')
+        self.created = 0
+
+    def create_rows(self, count):
+        for _ in range(count):
+            self.created += 1
+            i = self.created
+            reviewer = User.objects.create_user(email=f'reviewer{i}@test.com', role='manager')
+            mr = User.objects.create_user(email=f'mr{i}@test.com', role='mr', manager=reviewer)
+            ExpenseClaim.objects.create(
+                user=mr, expense_type=self.expense_type, amount=Decimal('10.00'),
+                date=date(2030, 1, 1), description='Taxi', reviewed_by=reviewer
+            )
+            LeaveRequest.objects.create(
+                user=mr, leave_type=self.leave_type, start_date=date(2030, 2, 1),
+                end_date=date(2030, 2, 2), reason='Trip'
+            )
+            TourProgram.objects.create(user=mr, month=3, year=2030, area_details='North', reviewed_by=reviewer)
+            doctor = Doctor.objects.create(name=f'Dr {i}', specialty=self.specialty, added_by=mr)
+            chemist = Chemist.objects.create(name=f'Chemist {i}', category=self.category, added_by=mr)
+            report = DailyCallReport.objects.create(user=mr, date=date(2030, 1, 1), summary='Visits')
+            report.doctors_visited.add(doctor)
+            report.chemists_visited.add(chemist)
+
+    def count_queries(self):
+        counts = {}
+        for url in self.endpoints:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            counts[url] = len(queries)
+        return counts
+
+    def test_query_counts_do_not_grow_with_page_size(self):
+        """Test that each list endpoint costs the same queries for 1 and 5 rows."""
+        self.create_rows(1)
+        one_row = self.count_queries()
+        self.create_rows(4)
+        five_rows = self.count_queries()
+
+        self.assertEqual(one_row, five_rows)
+        response = self.client.get('/api/reports/daily-call-reports/')
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(response.data['results'][0]['doctors_visited_details'][0]['specialty_details']['name'], 'Cardiology')
+
+    def test_missing_join_is_reported(self):
+        """Test that the system check flags a serializer reading an undeclared relation."""
+        self.assertEqual(check_serializer_joins(None), [])
+
+        class UnjoinedViewSet(ExpenseClaimViewSet):
+            select_related_fields = ('user', 'expense_type')
+
+        self.assertEqual(UnjoinedViewSet.missing_joins('list'), (ExpenseClaimSerializer, ['reviewed_by']))
+        with mock.patch('core.checks._routed_actions', return_value=[(UnjoinedViewSet, 'retrieve')]):
+            errors = check_serializer_joins(None)
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+        self.assertIn('UnjoinedViewSet.retrieve renders ExpenseClaimSerializer, which reads reviewed_by', errors[0].msg)
+
+
+class DashboardTestCase(APITestCase):
+    """Test cases for the cached dashboard cards."""
+
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create_user(email='manager@test.com', role='manager')
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr', manager=self.manager)
+        self.expense_type = ExpenseType.objects.create(name='Travel', code='TR')
+        self.url = '/api/dashboard/'
+        self.addCleanup(cache.clear)
+
+    def create_claim(self):
+        return ExpenseClaim.objects.create(
+            user=self.mr, expense_type=self.expense_type, amount=Decimal('10.00'),
+            date=date(2030, 1, 1), description='Taxi'
+        )
+
+    def cards(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_cards_are_read_once_and_cached(self):
+        """Test that a miss costs one card query and a hit only the cache read."""
+        self.create_claim()
+        get_active_holidays()
+        self.client.force_authenticate(user=self.manager)
+        with CaptureQueriesContext(connection) as miss:
+            first = self.client.get(self.url).data
+        with CaptureQueriesContext(connection) as hit:
+            second = self.client.get(self.url).data
+
+        # Both read the cache; the miss also counts the cards and stores them
+        # (the database cache's cull count, savepoint, lookup, insert, release).
+        self.assertEqual((len(miss), len(hit)), (7, 1))
+        self.assertEqual(first, second)
+        self.assertEqual(first['summary_cards']['team_members'], 1)
+        self.assertEqual(first['summary_cards']['pending_expense_approvals'], 1)
+        self.assertEqual(first['tour_program']['status'], 'Not submitted')
+
+    def test_changes_invalidate_owner_and_managers(self):
+        """Test that saves and bulk reviews refresh the affected dashboards."""
+        self.assertEqual(self.cards(self.mr)['summary_cards']['pending_expense_claims'], 0)
+        self.assertEqual(self.cards(self.manager)['summary_cards']['pending_expense_approvals'], 0)
+
+        claim = self.create_claim()
+        self.assertEqual(self.cards(self.mr)['summary_cards']['pending_expense_claims'], 1)
+        self.assertEqual(self.cards(self.manager)['summary_cards']['pending_expense_approvals'], 1)
+
+        self.client.post(
+            '/api/expenses/expense-claims/bulk_review/', {'ids': [claim.pk], 'decision': 'approve'}, format='json'
+        )
+        self.assertEqual(self.cards(self.manager)['summary_cards']['pending_expense_approvals'], 0)
+        self.assertEqual(self.cards(self.mr)['summary_cards']['pending_expense_claims'], 0)
+
+    def test_process_local_cache_is_flagged(self):
+        """Test that production settings with a per-process cache raise a warning."""
+        with override_settings(DEBUG=False, CACHES=LOCAL_CACHE):
+            self.assertEqual([warning.id for warning in check_shared_cache(None)], ['core.W001'])
+        with override_settings(DEBUG=False, CACHES=DATABASE_CACHE):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class OrganisationCounterTestCase(APITestCase):
+    """Test cases for the signal-maintained organisation counters."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.admin = User.objects.create_user(email='admin@test.com', role='admin', is_staff=True)
+        self.manager = User.objects.create_user(email='manager@test.com', role='manager', manager=self.admin)
+        self.expense_type = ExpenseType.objects.create(name='Travel', code='TR')
+
+    def create_claim(self):
+        return ExpenseClaim.objects.create(
+            user=self.manager, expense_type=self.expense_type, amount=Decimal('10.00'),
+            date=date(2030, 1, 1), description='Hotel'
+        )
+
+    def test_counters_follow_saves_transitions_and_deletes(self):
+        """Test creates, status changes (single and bulk), deactivation and deletes."""
+        claims = [self.create_claim() for _ in range(3)]
+        counters = get_counters()
+        self.assertEqual(counters['users', 'all'], 2)
+        self.assertEqual(counters['expense_claims', 'all'], 3)
+        self.assertEqual(counters['expense_claims', 'pending:manager'], 3)
+
+        claims[0].status = 'rejected'
+        claims[0].save()
+        self.client.force_authenticate(user=self.admin)
+        self.client.post(
+            '/api/expenses/expense-claims/bulk_review/', {'ids': [claims[1].pk], 'decision': 'approve'}, format='json'
+        )
+        claims[2].delete()
+        self.manager.is_active = False
+        self.manager.save()
+
+        counters = get_counters()
+        self.assertEqual(counters['expense_claims', 'all'], 2)
+        self.assertEqual(counters['expense_claims', 'pending:manager'], 0)
+        self.assertEqual(counters['users', 'active'], 1)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('(0 corrected)', out.getvalue())
+
+    def test_owner_role_change_recounts_manager_claims(self):
+        """Test that promoting or demoting a claim owner moves the manager-claims counter."""
+        mr = User.objects.create_user(email='mr@test.com', role='mr', manager=self.manager)
+        claim = ExpenseClaim.objects.create(
+            user=mr, expense_type=self.expense_type, amount=Decimal('10.00'),
+            date=date(2030, 1, 1), description='Taxi'
+        )
+        self.assertEqual(get_counters()['expense_claims', 'pending:manager'], 0)
+
+        mr.role = 'manager'
+        mr.save()
+        self.assertEqual(get_counters()['expense_claims', 'pending:manager'], 1)
+        User.objects.get(pk=mr.pk).save()
+        self.assertEqual(get_counters()['expense_claims', 'pending:manager'], 1)
+
+        # A claim saved without its owner loaded reads only the role.
+        claim = ExpenseClaim.objects.get(pk=claim.pk)
+        claim.status = 'approved'
+        with CaptureQueriesContext(connection) as queries:
+            claim.save()
+        self.assertFalse(any('"users_user"."password"' in query['sql'] for query in queries))
+        self.assertEqual(get_counters()['expense_claims', 'pending:manager'], 0)
+
+    def test_reconcile_fixes_drift(self):
+        """Test that the command rewrites drifted counters."""
+        self.create_claim()
+        OrganisationCounter.objects.filter(metric='expense_claims').update(value=40)
+        out = StringIO()
+        call_command('reconcile_counters', '--metric', 'expense_claims', stdout=out)
+        self.assertIn('2 corrected', out.getvalue())
+        self.assertEqual(get_counters()['expense_claims', 'pending:manager'], 1)
+
+    def test_admin_dashboard_reads_counters_once(self):
+        """Test that the admin cards cost a single counter query besides the cache's own."""
+        self.create_claim()
+        get_active_holidays()
+        self.client.force_authenticate(user=self.admin)
+        # The cache read, the counters, and the five queries that store the cards.
+        with self.assertNumQueries(7):
+            data = self.client.get('/api/dashboard/').data
+        self.assertEqual(data['summary_cards']['pending_manager_expense_approvals'], 1)
+        self.assertEqual(data['system_summary']['total_expense_claims'], 1)
+
+
+@override_settings(REQUEST_METRICS_HEADERS=True)
+class RequestMetricsTestCase(APITestCase):
+    """Test cases for the per-request SQL and timing instrumentation."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='mr@test.com', role='mr')
+        self.client.force_authenticate(user=self.user)
+
+    def test_headers_and_log_line(self):
+        """Test that responses carry the query count and timings, and are logged."""
+        with self.assertLogs('core.requests', 'INFO') as logs, CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/expenses/expense-claims/')
+
+        self.assertEqual(response['X-Query-Count'], str(len(queries)))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+, total;dur=[\d.]+$')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], '/api/expenses/expense-claims/')
+        self.assertEqual(record['queries'], len(queries))
+        self.assertIn('slowest_sql', record)
+        self.assertNotIn('statements', record)
+
+    @override_settings(REQUEST_METRICS_SLOW_MS=0.001)
+    def test_slow_requests_log_statements(self):
+        """Test that requests over the threshold log every statement as a warning."""
+        with self.assertLogs('core.requests', 'WARNING') as logs:
+            self.client.get('/api/expenses/expense-claims/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(len(record['statements']), record['queries'])
+
+
+class ProfilingTestCase(APITestCase):
+    """Test cases for on-demand request profiling."""
+
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        override = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.profile_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.admin = User.objects.create_user(email='admin@test.com', role='admin', is_staff=True)
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr')
+
+    def get(self, user, **extra):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return self.client.get('/api/analytics/performance-report/', {'profile': '1'}, **extra)
+
+    def test_staff_can_profile_a_request(self):
+        """Test that a profile is saved by endpoint and summarised by the command."""
+        response = self.get(self.admin)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile_id = response['X-Profile-Id']
+        self.assertTrue(profile_id.startswith('api_analytics_performance_report/'))
+        self.assertTrue(os.path.exists(os.path.join(self.profile_dir, profile_id)))
+
+        out = StringIO()
+        call_command('summarize_profiles', '--endpoint', 'performance', '--limit', '5', stdout=out)
+        self.assertIn('api_analytics_performance_report', out.getvalue())
+        self.assertIn('Summarised 1 profiles', out.getvalue())
+
+    def test_other_users_are_not_profiled(self):
+        """Test that the flag is ignored for non-staff users."""
+        response = self.get(self.mr)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+
+class LoadTestTestCase(LiveServerTestCase):
+    """Test cases for the load-test seed and driver commands."""
+
+    def setUp(self):
+        # The report endpoints fan out; close the pool's connections afterwards.
+        self.addCleanup(shutdown_fanout)
+
+    def test_percentile_uses_nearest_rank(self):
+        """Test the percentile helper on a known sample."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_seed_refuses_without_debug(self):
+        """Test that seeding needs DEBUG or --allow-production."""
+        with self.assertRaises(CommandError):
+            call_command('seed_load_data', '--password', 'seed-pass', stdout=StringIO())
+        self.assertFalse(User.objects.filter(email__endswith='@loadtest.local').exists())
+
+    def test_seed_and_replay_against_live_server(self):
+        """Test that seeded users can sign in and every scenario succeeds."""
+        call_command(
+            'seed_load_data', '--managers', '1', '--mrs-per-manager', '2', '--days', '3',
+            '--contacts', '3', '--claims', '5', '--notifications', '4', '--password', 'seed-pass',
+            '--allow-production', stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.filter(email__endswith='@loadtest.local').count(), 3)
+        self.assertEqual(ExpenseClaim.objects.filter(status='pending').count(), 10)
+
+        result_path = os.path.join(tempfile.mkdtemp(), 'results.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(result_path))
+        out = StringIO()
+        call_command(
+            'load_test', '--base-url', self.live_server_url, '--users', '3', '--manager-share', '0.34',
+            '--requests', '40', '--ramp-up', '0', '--json', result_path, '--max-error-rate', '0',
+            '--password', 'seed-pass',
+            stdout=out,
+        )
+        with open(result_path) as f:
+            results = json.load(f)
+        endpoints = {row['endpoint']: row for row in results['endpoints']}
+        self.assertEqual(endpoints['login']['count'], 3)
+        self.assertEqual(sum(row['count'] for row in results['endpoints']), 43)
+        self.assertIn('p95_ms', out.getvalue())
+
+
+@override_settings(REPLICA_DATABASE='default')
+class ReplicaRoutingTestCase(APITransactionTestCase):
+    """
+    Test cases for read-replica routing.
+
+    The replica alias is pointed at ``default`` so the router's choices can
+    be observed on one database; the test transaction would otherwise keep
+    every read on the primary.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(shutdown_fanout)
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr')
+        self.other = User.objects.create_user(email='other@test.com', role='mr')
+        self.report = DailyCallReport.objects.create(
+            user=self.mr, date=date(2024, 1, 1), work_type='office_work', summary='Office'
+        )
+
+    def request(self, method, path, user, data=None):
+        """Send a request and return it with the aliases its model reads were routed to."""
+        routed = []
+        original = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            alias = original(router, model, **hints)
+            if model._meta.app_label != CACHE_TABLE_APP_LABEL:
+                routed.append(alias)
+            return alias
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        with mock.patch.object(ReplicaRouter, 'db_for_read', spy):
+            response = getattr(self.client, method)(path, data, format='json')
+        return response, set(routed)
+
+    def test_replica_needs_a_shared_cache(self):
+        """Test that a replica with a per-process cache for the pins is refused."""
+        with override_settings(CACHES=LOCAL_CACHE), self.assertRaises(ImproperlyConfigured):
+            require_shared_cache_for_replica()
+        with override_settings(CACHES=DATABASE_CACHE):
+            require_shared_cache_for_replica()
+        with override_settings(REPLICA_DATABASE='replica'):
+            require_shared_cache_for_replica()
+
+    def test_reports_and_lists_read_from_replica(self):
+        """Test that summaries, the dashboard and list GETs use the replica."""
+        for path in ['/api/reports/daily-call-reports/', '/api/reports/dcr-summary/', '/api/dashboard/']:
+            response, routed = self.request('get', path, self.mr)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(routed, {'default'}, path)
+
+    def test_details_and_writes_stay_on_primary(self):
+        """Test that detail GETs and writes never read from the replica."""
+        _, routed = self.request('get', f'/api/reports/daily-call-reports/{self.report.pk}/', self.mr)
+        self.assertEqual(routed, {None})
+
+        response, routed = self.request('post', '/api/reports/daily-call-reports/', self.mr, {
+            'date': '2024-01-02', 'work_type': 'office_work', 'summary': 'Office',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(routed, {None})
+
+    def test_writers_are_pinned_to_primary(self):
+        """Test read-after-write: the writer reads the primary, others the replica."""
+        self.request('post', '/api/reports/daily-call-reports/', self.mr, {
+            'date': '2024-01-02', 'work_type': 'office_work', 'summary': 'Office',
+        })
+        response, routed = self.request('get', '/api/reports/daily-call-reports/', self.mr)
+        self.assertEqual(routed, {None})
+        self.assertEqual(response.data['count'], 2)
+
+        _, routed = self.request('get', '/api/reports/daily-call-reports/', self.other)
+        self.assertEqual(routed, {'default'})
+
+    @override_settings(REPLICA_DATABASE='missing')
+    def test_unconfigured_replica_is_ignored(self):
+        """Test that nothing is routed when the replica alias does not exist."""
+        _, routed = self.request('get', '/api/reports/daily-call-reports/', self.mr)
+        self.assertEqual(routed, {None})
+
+
+class FanOutTestCase(APITransactionTestCase):
+    """Test cases for running a view's independent queries concurrently."""
+
+    def setUp(self):
+        self.addCleanup(shutdown_fanout)
+
+    def test_tasks_run_concurrently_on_pool_threads(self):
+        """Test that tasks overlap, run off the request thread and see committed rows."""
+        User.objects.create_user(email='mr@test.com', role='mr')
+
+        def task():
+            time.sleep(0.2)
+            return threading.current_thread().name, User.objects.count()
+
+        start = time.monotonic()
+        results = fan_out(a=task, b=task, c=task)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertTrue(all(name.startswith('query-fanout') for name, _ in results.values()))
+        self.assertEqual({count for _, count in results.values()}, {1})
+
+    def test_transactions_run_inline(self):
+        """Test that tasks see uncommitted rows when called inside a transaction."""
+        with transaction.atomic():
+            User.objects.create_user(email='mr@test.com', role='mr')
+            results = fan_out(a=User.objects.count, b=lambda: threading.current_thread().name)
+        self.assertEqual(results, {'a': 1, 'b': threading.current_thread().name})
+
+    def test_pool_results_match_inline(self):
+        """Test that a summary fanned out over the pool equals the one built inline."""
+        manager = User.objects.create_user(email='manager@test.com', role='manager')
+        mr = User.objects.create_user(email='mr@test.com', role='mr', manager=manager)
+        doctor = Doctor.objects.create(name='Dr. Pool', added_by=mr)
+        for day in (2, 3):
+            report = DailyCallReport.objects.create(
+                user=mr, date=date(2024, 1, day), work_type='field_work', summary='Visits'
+            )
+            report.doctors_visited.add(doctor)
+        self.client.force_authenticate(manager)
+
+        threads = set()
+
+        def record_thread(execute, sql, params, many, context):
+            threads.add(threading.current_thread().name)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record_thread):
+            pooled = self.client.get('/api/reports/dcr-summary/', {'detailed': 'true'})
+        self.assertTrue(any(name.startswith('query-fanout') for name in threads))
+        with override_settings(QUERY_FANOUT_WORKERS=0):
+            inline = self.client.get('/api/reports/dcr-summary/', {'detailed': 'true'})
+        self.assertEqual(pooled.status_code, status.HTTP_200_OK)
+        self.assertEqual(pooled.data['total_dcrs'], 2)
+        self.assertEqual(pooled.data['total_doctors_visited'], 2)
+        self.assertEqual(pooled.json(), inline.json())
+
+    @override_settings(REPLICA_DATABASE='default')
+    def test_pool_threads_follow_the_request_routing(self):
+        """Test that pool threads read from the replica, or the primary once the user is pinned."""
+        cache.clear()
+        mr = User.objects.create_user(email='mr@test.com', role='mr')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(mr)}')
+        original = ReplicaRouter.db_for_read
+
+        def summary_reads():
+            routed = set()
+
+            def spy(router, model, **hints):
+                alias = original(router, model, **hints)
+                if threading.current_thread().name.startswith('query-fanout'):
+                    routed.add(alias)
+                return alias
+
+            with mock.patch.object(ReplicaRouter, 'db_for_read', spy):
+                response = self.client.get('/api/reports/expense-summary/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return routed
+
+        self.assertEqual(summary_reads(), {'default'})
+        pin_to_primary(mr.pk)
+        self.assertEqual(summary_reads(), {None})
+
+    @override_settings(REQUEST_METRICS_HEADERS=True)
+    def test_pool_queries_are_counted(self):
+        """Test that queries run on pool threads reach the request metrics."""
+        user = User.objects.create_user(email='manager@test.com', role='manager')
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/reports/leave-summary/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Pool threads use their own connections.
+        self.assertLess(len(queries), int(response['X-Query-Count']))
+
+
+class RenderingTestCase(APITestCase):
+    """Test cases for the orjson renderer and response compression."""
+
+    def test_fast_renderer_matches_json_renderer(self):
+        """Test that FastJSONRenderer produces the same bytes as JSONRenderer."""
+        data = {
+            'amount': Decimal('12.50'),
+            'date': date(2024, 1, 2),
+            'at': datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+            'label': gettext_lazy('Approved'),
+            'text': 'line\u2028break',
+            1: [None, True, 1.5, 'ü'],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+    def test_accepted_encodings(self):
+        """Test Accept-Encoding parsing, including q=0 exclusions."""
+        self.assertEqual(accepted_encodings('gzip, deflate, br'), {'gzip', 'deflate', 'br'})
+        self.assertEqual(accepted_encodings('br;q=0, gzip;q=0.5'), {'gzip'})
+
+    @override_settings(COMPRESSION_MIN_SIZE=200)
+    def test_large_responses_are_gzipped(self):
+        """Test that large JSON responses are compressed and small ones are not."""
+        user = User.objects.create_user(email='manager@test.com', role='manager')
+        for i in range(20):
+            User.objects.create_user(email=f'mr{i}@test.com', role='mr', manager=user)
+        self.client.force_authenticate(user)
+
+        response = self.client.get('/api/users/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content))['count'], 21)
+
+        response = self.client.get('/api/users/', HTTP_ACCEPT_ENCODING='identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        response = self.client.get('/api/notifications/unread_count/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class PartitioningTestCase(APITestCase):
+    """
+    Test cases for the monthly partition planning.
+
+    The catalog queries need PostgreSQL, so they are stubbed and the
+    statements are checked in dry-run mode.
+    """
+
+    def test_month_arithmetic_and_key_columns(self):
+        """Test the month helpers and constraint column parsing."""
+        self.assertEqual(add_months(date(2024, 11, 15), 2), date(2025, 1, 1))
+        self.assertEqual(add_months(date(2024, 1, 31), -1), date(2023, 12, 1))
+        self.assertEqual(key_columns('UNIQUE (user_id, date)'), ['user_id', 'date'])
+        self.assertEqual(
+            key_columns('CREATE INDEX i ON public.t USING btree ("updated_at" DESC)'), ['updated_at']
+        )
+
+    def test_plans_missing_and_old_partitions(self):
+        """Test that missing months are created and old ones detached."""
+        partitioning = MonthlyPartitioning(DailyCallReport, dry_run=True)
+        existing = {date(2024, 1, 1): 'reports_dailycallreport_p202401', date(2024, 3, 1): 'reports_dailycallreport_p202403'}
+        with mock.patch.object(MonthlyPartitioning, 'partitions', return_value=existing), \
+                mock.patch.object(MonthlyPartitioning, 'fetch', return_value=[(False,)]):
+            created = partitioning.ensure_partitions(1, today=date(2024, 3, 10))
+            detached = partitioning.detach_partitions(1, today=date(2024, 3, 10))
+
+        self.assertEqual(created, ['reports_dailycallreport_p202402', 'reports_dailycallreport_p202404'])
+        self.assertEqual(detached, ['reports_dailycallreport_p202401'])
+        self.assertIn(
+            'CREATE TABLE "reports_dailycallreport_p202402" PARTITION OF "reports_dailycallreport" '
+            "FOR VALUES FROM ('2024-02-01') TO ('2024-03-01')",
+            partitioning.statements,
+        )
+
+    def test_rows_in_default_partition_are_moved(self):
+        """Test that a month with rows in the default partition is split out of it."""
+        partitioning = MonthlyPartitioning(ExpenseClaim, dry_run=True)
+        with mock.patch.object(MonthlyPartitioning, 'fetch', return_value=[(True,)]):
+            partitioning.create_partition(date(2024, 5, 1))
+        self.assertEqual([statement.split(' ')[0] for statement in partitioning.statements],
+                         ['CREATE', 'DELETE', 'CREATE', 'INSERT'])
+        self.assertTrue(partitioning.statements[0].startswith(
+            'CREATE TEMPORARY TABLE "expenses_expenseclaim_p202405_moving" ON COMMIT DROP AS '
+            'SELECT * FROM "expenses_expenseclaim_default"'
+        ))
+        self.assertTrue(partitioning.statements[-1].endswith('FROM "expenses_expenseclaim_p202405_moving"'))
+
+    def test_visits_are_partitioned_with_their_reports(self):
+        """Test that the visit tables gain and lose months together with the reports."""
+        partitioning = MonthlyPartitioning.for_label('reports.DailyCallReport', dry_run=True)
+        self.assertEqual([child.table for child in partitioning.children], [
+            'reports_dailycallreport_doctors_visited', 'reports_dailycallreport_chemists_visited',
+        ])
+        existing = {date(2024, 1, 1): 'reports_dailycallreport_p202401'}
+        with mock.patch.object(MonthlyPartitioning, 'partitions', return_value=existing), \
+                mock.patch.object(MonthlyPartitioning, 'fetch', return_value=[(False,)]):
+            partitioning.ensure_partitions(0, today=date(2024, 2, 10))
+        self.assertEqual([statement.split(' ')[2] for statement in partitioning.statements], [
+            '"reports_dailycallreport_p202402"', '"reports_dailycallreport_doctors_visited_p202402"',
+            '"reports_dailycallreport_chemists_visited_p202402"',
+        ])
+
+        partitioning.statements.clear()
+        with mock.patch.object(MonthlyPartitioning, 'partitions', return_value=existing), \
+                mock.patch.object(MonthlyPartitioning, 'fetch', return_value=[('visit_fk',)]):
+            detached = partitioning.detach_partitions(1, today=date(2024, 3, 10))
+        self.assertEqual(detached, ['reports_dailycallreport_p202401'])
+        self.assertEqual(partitioning.statements, [
+            'ALTER TABLE "reports_dailycallreport_doctors_visited" '
+            'DETACH PARTITION "reports_dailycallreport_doctors_visited_p202401"',
+            'ALTER TABLE "reports_dailycallreport_doctors_visited_p202401" DROP CONSTRAINT "visit_fk"',
+            'ALTER TABLE "reports_dailycallreport_chemists_visited" '
+            'DETACH PARTITION "reports_dailycallreport_chemists_visited_p202401"',
+            'ALTER TABLE "reports_dailycallreport_chemists_visited_p202401" DROP CONSTRAINT "visit_fk"',
+            'ALTER TABLE "reports_dailycallreport" DETACH PARTITION "reports_dailycallreport_p202401"',
+        ])
+
+    def test_command_requires_postgresql(self):
+        """Test that the command refuses other databases."""
+        if connection.vendor == 'postgresql':
+            self.skipTest('Running on PostgreSQL')
+        with self.assertRaises(CommandError):
+            call_command('manage_partitions', stdout=StringIO())
+
+    def test_convert_requires_postgresql_15(self):
+        """Test that --convert refuses an older server before touching any table."""
+        old_server = mock.Mock(vendor='postgresql', pg_version=140011)
+        with mock.patch('api.management.commands.manage_partitions.connection', old_server), \
+                mock.patch.object(MonthlyPartitioning, 'for_label') as for_label:
+            with self.assertRaisesMessage(CommandError, 'requires PostgreSQL 15 or later; this server is 14.11'):
+                call_command('manage_partitions', '--convert', '--dry-run', stdout=StringIO())
+        for_label.assert_not_called()
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Table partitioning requires PostgreSQL')
+class PostgresPartitioningTestCase(APITestCase):
+    """
+    Test cases converting the real tables on PostgreSQL.
+
+    The DDL runs inside the test transaction and is rolled back with it.
+    """
+
+    def setUp(self):
+        if connection.pg_version < MIN_POSTGRESQL_VERSION:
+            self.skipTest('Converting the tables requires PostgreSQL 15')
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr')
+        self.doctor = Doctor.objects.create(name='Dr. Part', added_by=self.mr)
+        self.chemist = Chemist.objects.create(name='Pharmacy', added_by=self.mr)
+        self.report = DailyCallReport.objects.create(
+            user=self.mr, date=date(2024, 1, 5), work_type='field_work', summary='Visits'
+        )
+        self.report.doctors_visited.add(self.doctor)
+        self.report.chemists_visited.add(self.chemist)
+        expense_type = ExpenseType.objects.create(name='Travel', code='TR')
+        ExpenseClaim.objects.create(
+            user=self.mr, expense_type=expense_type, amount=Decimal('10.00'), date=date(2024, 1, 5),
+            description='Claim',
+        )
+        self.run_deferred_checks()
+        call_command('manage_partitions', '--convert', '--months-ahead', '1', stdout=StringIO())
+
+    def run_deferred_checks(self):
+        """Check the deferred foreign keys now; ALTER TABLE refuses tables with pending checks."""
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+    def count(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            return cursor.fetchone()[0]
+
+    def test_conversion_keeps_rows_ids_and_foreign_keys(self):
+        """Test that the converted tables keep their rows, hand out new ids and reference the reports."""
+        for label in ('reports.DailyCallReport', 'expenses.ExpenseClaim'):
+            partitioning = MonthlyPartitioning.for_label(label)
+            self.assertTrue(all(p.is_partitioned() for p in partitioning.group), label)
+        self.assertEqual(self.count('reports_dailycallreport_p202401'), 1)
+        self.assertEqual(self.count('reports_dailycallreport_doctors_visited_p202401'), 1)
+        self.assertEqual(self.count('reports_dailycallreport_chemists_visited_p202401'), 1)
+        self.assertEqual(self.count('expenses_expenseclaim_p202401'), 1)
+
+        report = DailyCallReport.objects.create(
+            user=self.mr, date=date(2024, 1, 6), work_type='office_work', summary='Office'
+        )
+        self.assertGreater(report.pk, self.report.pk)
+        self.assertEqual(list(self.report.doctors_visited.all()), [self.doctor])
+
+        # A visit must match its report's (id, date), and stays unique per report.
+        other = Doctor.objects.create(name='Dr. Other', added_by=self.mr)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DoctorVisit.objects.create(dailycallreport=self.report, doctor=other, date=date(2024, 1, 6))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DoctorVisit.objects.create(dailycallreport=self.report, doctor=self.doctor)
+
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM reports_dailycallreport WHERE id = %s', [self.report.pk])
+        self.assertFalse(DoctorVisit.objects.filter(dailycallreport_id=self.report.pk).exists())
+        self.assertFalse(ChemistVisit.objects.filter(dailycallreport_id=self.report.pk).exists())
+
+    def test_visits_move_with_their_report(self):
+        """Test that changing a report's date moves its visits to the same month."""
+        self.report.date = date(2024, 2, 7)
+        self.report.save()
+        self.assertEqual(self.count('reports_dailycallreport_p202402'), 1)
+        self.assertEqual(self.count('reports_dailycallreport_doctors_visited_p202402'), 1)
+        self.assertEqual(self.count('reports_dailycallreport_chemists_visited_p202401'), 0)
+        self.assertEqual(
+            list(DoctorVisit.objects.filter(dailycallreport=self.report).values_list('date', flat=True)),
+            [date(2024, 2, 7)],
+        )
+
+    def test_new_months_take_rows_from_default_and_old_months_detach(self):
+        """Test that a new month moves its rows out of the default partitions and old months detach."""
+        future = DailyCallReport.objects.create(
+            user=self.mr, date=date(2030, 1, 3), work_type='field_work', summary='Later'
+        )
+        future.doctors_visited.add(self.doctor)
+        self.assertEqual(self.count('reports_dailycallreport_doctors_visited_default'), 1)
+        self.run_deferred_checks()
+
+        partitioning = MonthlyPartitioning.for_label('reports.DailyCallReport')
+        partitioning.ensure_partitions(0, today=date(2030, 1, 15))
+        self.assertEqual(self.count('reports_dailycallreport_default'), 0)
+        self.assertEqual(self.count('reports_dailycallreport_p203001'), 1)
+        self.assertEqual(self.count('reports_dailycallreport_doctors_visited_default'), 0)
+        self.assertEqual(self.count('reports_dailycallreport_doctors_visited_p203001'), 1)
+
+        self.run_deferred_checks()
+        detached = partitioning.detach_partitions(1, today=date(2030, 1, 15))
+        self.assertIn('reports_dailycallreport_p202401', detached)
+        self.assertFalse(DailyCallReport.objects.filter(pk=self.report.pk).exists())
+        self.assertFalse(DoctorVisit.objects.filter(dailycallreport_id=self.report.pk).exists())
+        self.assertEqual(self.count('reports_dailycallreport_p202401'), 1)
+        self.assertEqual(self.count('reports_dailycallreport_doctors_visited_p202401'), 1)
+        self.assertEqual(list(future.doctors_visited.all()), [self.doctor])
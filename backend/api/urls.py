@@ -1,10 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenRefreshView
 
 from users.views import UserViewSet
-from users.token_views import CustomTokenObtainPairView
-from .views import dashboard
+from users.token_views import CustomTokenObtainPairView, CustomTokenRefreshView
+from .views import dashboard, inbox
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -12,8 +11,9 @@ router.register(r'users', UserViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('dashboard/', dashboard, name='dashboard'),
+    path('inbox/', inbox, name='inbox'),
     path('leaves/', include('leaves.urls')),
     path('expenses/', include('expenses.urls')),
     path('masters/', include('masters.urls')),
@@ -0,0 +1,91 @@
+"""
+System checks for settings the performance features depend on.
+
+The dashboard cards, the reference-data version and the replica pins are
+shared through the default cache, and invalidated by deleting or bumping
+entries there. A process-local backend keeps each worker's copy to itself,
+so writes handled by one worker never reach the others.
+
+For the replica pins that is not a matter of staleness but of reading
+around one's own write, so a read replica with a process-local cache is
+refused when the apps load rather than reported as a warning.
+
+The routed viewsets are also checked for serializers that read relations
+their queryset does not join, which would cost a query per row.
+"""
+from django.conf import settings
+from django.core.checks import Error, Warning
+from django.core.exceptions import ImproperlyConfigured
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_process_local():
+    """Whether the default cache is not shared between processes."""
+    return settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES
+
+
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG or not cache_is_process_local():
+        return []
+    return [Warning(
+        'The default cache is local to each process.',
+        hint=(
+            'Dashboard cards and reference data cached by one worker are not invalidated by writes '
+            'handled in another. Use the database or Redis cache (CACHE_BACKEND / REDIS_URL) when '
+            'running more than one process.'
+        ),
+        id='core.W001',
+    )]
+
+
+def require_shared_cache_for_replica():
+    """Refuse a read replica whose primary pins would not reach other workers."""
+    from core.db_routers import replica_alias
+
+    if replica_alias() and cache_is_process_local():
+        raise ImproperlyConfigured(
+            f'DATABASES[{settings.REPLICA_DATABASE!r}] is configured but the default cache is local '
+            f'to each process, so a user pinned to the primary after writing would read the replica '
+            f'from every other worker. Use the database or Redis cache (CACHE_BACKEND / REDIS_URL).'
+        )
+
+
+def _routed_actions(patterns):
+    """Yield ``(viewset class, action)`` for every viewset route in ``patterns``."""
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from _routed_actions(pattern.url_patterns)
+            continue
+        viewset = getattr(pattern.callback, 'cls', None)
+        for action in (getattr(pattern.callback, 'actions', None) or {}).values():
+            yield viewset, action
+
+
+def check_serializer_joins(app_configs, **kwargs):
+    from django.urls import get_resolver
+
+    from core.mixins import RelatedFieldsMixin
+
+    errors = []
+    checked = set()
+    for viewset, action in _routed_actions(get_resolver().url_patterns):
+        # Created objects are rendered as saved, not read through the queryset.
+        if action == 'create' or not (isinstance(viewset, type) and issubclass(viewset, RelatedFieldsMixin)):
+            continue
+        if (viewset, action) in checked:
+            continue
+        checked.add((viewset, action))
+        serializer_class, missing = viewset.missing_joins(action)
+        if missing:
+            errors.append(Error(
+                f'{viewset.__name__}.{action} renders {serializer_class.__name__}, which reads '
+                f'{", ".join(missing)} without joining them.',
+                hint='Add them to select_related_fields or prefetch_related_fields.',
+                obj=viewset,
+                id='core.E001',
+            ))
+    return errors
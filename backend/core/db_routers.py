@@ -0,0 +1,124 @@
+"""
+Read-replica routing.
+
+When ``REPLICA_DATABASE`` names a configured alias, ``ReplicaRouter`` sends
+the reads of selected requests there: views with ``replica_reads = True``
+(the report summaries, analytics and the dashboard) and the ``list`` action
+of every viewset, for ``GET`` and ``HEAD`` only. Everything else, and every
+write, uses ``default``.
+
+A user who has just written must see their own change, so any request that
+writes pins its user to the primary for ``REPLICA_PIN_SECONDS``. Users are
+identified by the access token, since the API keeps no sessions; pins live
+in the Django cache so that they hold across workers, and the apps refuse
+to load with a replica and a process-local cache (``core.checks``). Within
+a request, reads move to the primary for good once something has been
+written, and reads inside a transaction on the primary stay there.
+
+Dashboard cards are cached; cards rebuilt from a lagging replica can miss a
+change from another user until the next invalidation or
+``DASHBOARD_CACHE_TTL``.
+
+``ReplicaRoutingMiddleware`` (``core.middleware``) sets up the per-request
+state this router reads.
+"""
+import contextvars
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+# App label of the model DatabaseCache queries through.
+CACHE_TABLE_APP_LABEL = 'django_cache'
+
+_request_state = contextvars.ContextVar('replica_request_state', default=None)
+
+
+class RequestState:
+    """Routing decisions for the request being served."""
+
+    def __init__(self, user_id=None):
+        self.user_id = user_id
+        self.use_replica = False
+        self.wrote = False
+
+
+def replica_alias():
+    """The configured replica alias, or ``None`` when there is none."""
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def replica_reads(view):
+    """Mark a function-based view as safe to serve from the replica."""
+    view.replica_reads = True
+    return view
+
+
+def view_reads_from_replica(view_func):
+    """Whether ``view_func`` (as resolved by the URLconf) may use the replica."""
+    if getattr(view_func, 'replica_reads', False):
+        return True
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if getattr(view_class, 'replica_reads', False):
+        return True
+    actions = getattr(view_func, 'actions', None) or {}
+    return actions.get('get') == 'list'
+
+
+def _pin_key(user_id):
+    return f'db:pin-primary:{user_id}'
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(_pin_key(user_id)) is not None
+
+
+def pin_to_primary(user_id):
+    """Send ``user_id``'s reads to the primary for ``REPLICA_PIN_SECONDS``."""
+    if user_id is not None:
+        cache.set(_pin_key(user_id), 1, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+def begin_request(user_id=None):
+    """Start routing state for a request; returns the token for ``end_request``."""
+    return _request_state.set(RequestState(user_id))
+
+
+def end_request(token):
+    _request_state.reset(token)
+
+
+def current_state():
+    return _request_state.get()
+
+
+class ReplicaRouter:
+    """Route the reads of replica-safe requests to ``REPLICA_DATABASE``."""
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or not state.use_replica or state.wrote:
+            return None
+        if model._meta.app_label == CACHE_TABLE_APP_LABEL:
+            # The database cache (and the pins in it) must not lag.
+            return None
+        alias = replica_alias()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and model._meta.app_label != CACHE_TABLE_APP_LABEL:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
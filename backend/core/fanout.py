@@ -0,0 +1,97 @@
+"""
+Concurrent execution of a request's independent queries.
+
+``fan_out`` runs a handful of callables on a process-wide pool of
+``QUERY_FANOUT_WORKERS`` threads and waits for all of them, so a view that
+needs several unrelated counts takes as long as the slowest one rather
+than their sum. Each pool thread keeps its own database connections open
+between tasks; like a request thread, it drops them before a task once they
+are older than ``CONN_MAX_AGE`` or broken. Only queries that reach the
+database are worth fanning out: a task costs a thread hand-off and, when
+its connection has expired, a new connection.
+
+Tasks run in a copy of the caller's context (for ``core.db_routers``) and
+their queries go through the caller's execute wrappers (for
+``RequestMetricsMiddleware``). They run inline, one after another, when the
+pool is disabled, when called from a pool thread, or when the caller is
+inside a transaction, whose uncommitted rows other connections cannot see.
+
+``shutdown`` closes the pool threads' connections and stops the pool; tests
+that use it call it so the test database can be dropped afterwards.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_executor():
+    global _executor, _executor_workers
+    workers = getattr(settings, 'QUERY_FANOUT_WORKERS', 4)
+    if workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='query-fanout')
+            _executor_workers = workers
+        return _executor
+
+
+def shutdown():
+    """Close every pool thread's database connections and stop the pool."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+        workers = _executor_workers
+    if executor is None:
+        return
+    # Each thread holds one task at the barrier, so every thread runs one.
+    barrier = threading.Barrier(workers)
+
+    def close_connections():
+        barrier.wait(timeout=10)
+        connections.close_all()
+
+    for _ in range(workers):
+        executor.submit(close_connections)
+    executor.shutdown(wait=True)
+
+
+def _in_transaction():
+    return any(connections[alias].in_atomic_block for alias in connections)
+
+
+def _run(wrappers, task):
+    _local.in_pool = True
+    # Connections are reused across tasks, as across a worker's requests.
+    close_old_connections()
+    with ExitStack() as stack:
+        for alias, alias_wrappers in wrappers.items():
+            for wrapper in alias_wrappers:
+                stack.enter_context(connections[alias].execute_wrapper(wrapper))
+        return task()
+
+
+def fan_out(**tasks):
+    """Run ``tasks`` (name -> callable) concurrently and return name -> result."""
+    executor = _get_executor()
+    if executor is None or len(tasks) < 2 or getattr(_local, 'in_pool', False) or _in_transaction():
+        return {name: task() for name, task in tasks.items()}
+
+    wrappers = {
+        alias: list(connections[alias].execute_wrappers)
+        for alias in connections if connections[alias].execute_wrappers
+    }
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, _run, wrappers, task)
+        for name, task in tasks.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,332 @@
+"""
+Per-request instrumentation.
+
+``RequestMetricsMiddleware`` wraps every database connection's execute path
+for the duration of a request and records the query count, total SQL time
+and the slowest statement. The figures are returned as ``Server-Timing``
+and ``X-Query-Count`` headers when ``REQUEST_METRICS_HEADERS`` is on and
+logged as one JSON line on the ``core.requests`` logger at INFO. Requests slower than
+``REQUEST_METRICS_SLOW_MS`` are logged as warnings with every statement they
+ran, so misbehaving endpoints can be found in production without ``DEBUG``;
+the default logging configuration only shows those.
+
+``ProfilingMiddleware`` runs selected requests under ``cProfile`` and saves
+the profiles by endpoint; ``manage.py summarize_profiles`` aggregates them.
+
+``ReplicaRoutingMiddleware`` decides which requests ``core.db_routers``
+may serve from the read replica.
+
+``CompressionMiddleware`` compresses large responses with Brotli or gzip.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger('core.requests')
+
+# Statements kept per request for the slow-request log.
+MAX_RECORDED_QUERIES = 500
+
+
+class QueryRecorder:
+    """
+    Execute wrapper accumulating statement timings.
+
+    It can be shared with ``core.fanout`` threads, so SQL time is the sum
+    over connections and may exceed the wall-clock time of the request.
+    """
+
+    def __init__(self, keep_statements=False):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = None
+        self.keep_statements = keep_statements
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.count += 1
+                self.duration += duration
+                if self.slowest is None or duration > self.slowest[1]:
+                    self.slowest = (sql, duration)
+                if self.keep_statements and len(self.statements) < MAX_RECORDED_QUERIES:
+                    self.statements.append((sql, duration))
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class RequestMetricsMiddleware:
+    """Measure SQL and Python time of each request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        slow_ms = getattr(settings, 'REQUEST_METRICS_SLOW_MS', 1000)
+        recorder = QueryRecorder(keep_statements=slow_ms > 0)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+        python = max(total - recorder.duration, 0.0)
+
+        if getattr(settings, 'REQUEST_METRICS_HEADERS', False):
+            response['X-Query-Count'] = str(recorder.count)
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={_ms(recorder.duration)};desc="{recorder.count} queries"',
+                f'app;dur={_ms(python)}',
+                f'total;dur={_ms(total)}',
+            ])
+
+        slow = slow_ms and _ms(total) >= slow_ms
+        if not slow and not logger.isEnabledFor(logging.INFO):
+            return response
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': _ms(total),
+            'python_ms': _ms(python),
+            'sql_ms': _ms(recorder.duration),
+            'queries': recorder.count,
+        }
+        if recorder.slowest:
+            record['slowest_sql_ms'] = _ms(recorder.slowest[1])
+            record['slowest_sql'] = recorder.slowest[0][:1000]
+
+        if slow:
+            record['statements'] = [
+                {'sql': sql, 'ms': _ms(duration)} for sql, duration in recorder.statements
+            ]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests with ``cProfile`` when ``PROFILING_ENABLED`` is set.
+
+    A request is profiled when a staff user asks for it with the
+    ``X-Profile: 1`` header or ``?profile=1``, or at random for a
+    ``PROFILING_SAMPLE_RATE`` fraction of requests under
+    ``PROFILING_SAMPLE_PATHS``. Profiles are written to
+    ``PROFILING_DIR/<endpoint>/<timestamp>-<id>.prof`` and the response names
+    the file in ``X-Profile-Id``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'PROFILING_ENABLED', False) or not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+
+        profile_id = self.save(request, profiler)
+        response['X-Profile-Id'] = profile_id
+        return response
+
+    def should_profile(self, request):
+        if request.headers.get('X-Profile') == '1' or request.GET.get('profile') == '1':
+            return self.is_staff(request)
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        paths = getattr(settings, 'PROFILING_SAMPLE_PATHS', ())
+        if rate <= 0 or (paths and not request.path.startswith(tuple(paths))):
+            return False
+        return random.random() < rate
+
+    @staticmethod
+    def is_staff(request):
+        # Runs before DRF has authenticated the request.
+        from rest_framework.exceptions import APIException
+        from users.authentication import CachedJWTAuthentication
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.is_staff
+        try:
+            result = CachedJWTAuthentication().authenticate(request)
+        except APIException:
+            return False
+        return result is not None and result[0].is_staff
+
+    @staticmethod
+    def endpoint_name(request):
+        match = request.resolver_match
+        route = match.route if match else request.path
+        return re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+
+    def save(self, request, profiler):
+        directory = os.path.join(settings.PROFILING_DIR, self.endpoint_name(request))
+        os.makedirs(directory, exist_ok=True)
+        name = f'{timezone.now():%Y%m%dT%H%M%S}-{request.method.lower()}-{uuid.uuid4().hex[:8]}.prof'
+        profiler.dump_stats(os.path.join(directory, name))
+        return f'{self.endpoint_name(request)}/{name}'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Set up ``core.db_routers`` for each request.
+
+    Reads go to the replica when the view allows it, the request is a
+    ``GET`` or ``HEAD`` and its user is not pinned to the primary. Requests
+    that write pin their user for ``REPLICA_PIN_SECONDS``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from core import db_routers
+
+        user_id = self.token_user_id(request)
+        token = db_routers.begin_request(user_id)
+        try:
+            response = self.get_response(request)
+            state = db_routers.current_state()
+            if state.wrote or request.method not in db_routers.SAFE_METHODS:
+                db_routers.pin_to_primary(state.user_id)
+        finally:
+            db_routers.end_request(token)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        from core import db_routers
+
+        state = db_routers.current_state()
+        if state is None or db_routers.replica_alias() is None:
+            return None
+        state.use_replica = (
+            request.method in db_routers.SAFE_METHODS
+            and db_routers.view_reads_from_replica(view_func)
+            and not db_routers.is_pinned(state.user_id)
+        )
+        return None
+
+    @staticmethod
+    def token_user_id(request):
+        # Only the signature is checked; DRF authenticates the request later.
+        from rest_framework_simplejwt.authentication import JWTAuthentication
+        from rest_framework_simplejwt.exceptions import InvalidToken
+        from rest_framework_simplejwt.settings import api_settings
+
+        authentication = JWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            return authentication.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+        except InvalidToken:
+            return None
+
+
+_encoding_re = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def accepted_encodings(header):
+    """Return the codings of an ``Accept-Encoding`` header with a non-zero q."""
+    accepted = set()
+    for item in header.split(','):
+        match = _encoding_re.match(item)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        if quality > 0:
+            accepted.add(match.group(1).lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Compress responses of at least ``COMPRESSION_MIN_SIZE`` bytes.
+
+    Brotli is used when the client accepts it and the ``brotli`` package is
+    installed, gzip otherwise. Only ``COMPRESSION_CONTENT_TYPES`` are
+    compressed, and streaming responses (file downloads, the notification
+    event stream) are passed through untouched. Like Django's
+    ``GZipMiddleware``, gzip output is padded with random bytes to mitigate
+    BREACH.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not getattr(settings, 'COMPRESSION_ENABLED', True) or not self.compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+            content = brotli.compress(response.content, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5))
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+            content = compress_string(response.content, max_random_bytes=100)
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # The representation changed, so a strong ETag no longer applies.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    @staticmethod
+    def compressible(response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return False
+        if len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return content_type in getattr(settings, 'COMPRESSION_CONTENT_TYPES', ('application/json',))
@@ -0,0 +1,253 @@
+"""
+Reusable viewset mixins shared by the apps.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.signals import status_changed
+from notifications.utils import notification_message
+from outbox.utils import enqueue_many
+
+
+def serializer_joins(serializer, model, prefix=''):
+    """
+    Yield the relation paths ``serializer`` reads through nested serializers.
+
+    A nested serializer whose source is a relation of ``model`` needs that
+    relation joined or prefetched, and so do the relations its own nested
+    serializers read.
+    """
+    for field in serializer.fields.values():
+        if field.write_only or not isinstance(field, serializers.BaseSerializer):
+            continue
+        many = isinstance(field, serializers.ListSerializer)
+        child = field.child if many else field
+        if len(field.source_attrs) != 1:
+            continue
+        try:
+            relation = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not relation.is_relation:
+            continue
+        path = f'{prefix}{field.source}'
+        yield path
+        yield from serializer_joins(child, relation.related_model, f'{path}__')
+
+
+def queryset_covers(queryset, path):
+    """Whether ``path`` is loaded by ``queryset``'s select/prefetch_related."""
+    parts = path.split('__')
+
+    node = queryset.query.select_related
+    for part in parts:
+        if node is True:
+            return True
+        if not isinstance(node, dict) or part not in node:
+            break
+        node = node[part]
+    else:
+        return True
+
+    for lookup in queryset._prefetch_related_lookups:
+        through = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+        lookup_parts = through.split('__')
+        if lookup_parts[:len(parts)] == parts:
+            return True
+        if parts[:len(lookup_parts)] == lookup_parts and isinstance(lookup, Prefetch):
+            inner = lookup.queryset
+            rest = '__'.join(parts[len(lookup_parts):])
+            if inner is not None and queryset_covers(inner, rest):
+                return True
+    return False
+
+
+class RelatedFieldsMixin:
+    """
+    Load the relations a viewset's serializers render in the same queries.
+
+    Subclasses declare ``select_related_fields`` (forward foreign keys) and
+    ``prefetch_related_fields`` (to-many relations, strings or ``Prefetch``
+    objects); ``filter_queryset`` applies them, so list and detail
+    responses cost a fixed number of queries whatever the page size.
+
+    The ``core.E001`` system check compares the nested serializers of every
+    routed action with those joins (``missing_joins``), so a missing one
+    fails ``manage.py check`` and the test run instead of quietly costing a
+    query per row.
+    """
+
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    def filter_queryset(self, queryset):
+        return self.join_related(super().filter_queryset(queryset))
+
+    def join_related(self, queryset):
+        """Apply ``select_related_fields`` and ``prefetch_related_fields`` to ``queryset``."""
+        if self.select_related_fields:
+            queryset = queryset.select_related(*self.select_related_fields)
+        if self.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*self.prefetch_related_fields)
+        return queryset
+
+    @classmethod
+    def missing_joins(cls, action):
+        """
+        Return ``(serializer class, paths)`` for ``action``: the relations its
+        serializer renders that the declared joins do not load.
+        """
+        view = cls(action=action, request=None, format_kwarg=None, args=(), kwargs={})
+        serializer_class = view.get_serializer_class()
+        if cls.queryset is None:
+            return serializer_class, []
+        queryset = view.join_related(cls.queryset.all())
+        serializer = serializer_class(context={'view': view})
+        return serializer_class, [
+            path for path in serializer_joins(serializer, queryset.model)
+            if not queryset_covers(queryset, path)
+        ]
+
+
+class BulkReviewSerializer(serializers.Serializer):
+    """Input of a ``bulk_review`` request."""
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+    decision = serializers.CharField()
+    manager_comments = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate_ids(self, value):
+        max_items = self.context['max_items']
+        if len(value) > max_items:
+            raise serializers.ValidationError(f'At most {max_items} items can be reviewed at once.')
+        return list(dict.fromkeys(value))
+
+    def validate_decision(self, value):
+        if value not in self.context['decisions']:
+            choices = ', '.join(sorted(self.context['decisions']))
+            raise serializers.ValidationError(f'Decision must be one of: {choices}.')
+        return value
+
+
+class BulkReviewMixin:
+    """
+    Add a ``bulk_review`` action that applies one decision to many items.
+
+    Subclasses describe their workflow with ``review_decisions``, mapping a
+    decision to ``(new status, statuses it applies to, notification level)``,
+    and may override ``get_review_verb``. The items a user may review are
+    their ``get_queryset()`` narrowed by ``filter_reviewable``, for
+    ``bulk_review`` and for the single-item actions named like a decision
+    (``approve``, ``reject``, ...). A bulk review checks everything with one
+    query, changes it with one UPDATE and notifies the owners through a
+    single outbox INSERT.
+
+    The response lists an outcome per id: ``updated``, ``not_found`` (absent
+    or not reviewable by this user) or ``invalid_status``.
+    """
+
+    review_decisions = {}
+    review_select_related = ('user',)
+    bulk_review_permission_classes = []
+    bulk_review_max_items = 200
+
+    def get_permissions(self):
+        if self.action == 'bulk_review':
+            return [permission() for permission in self.bulk_review_permission_classes]
+        return super().get_permissions()
+
+    def filter_reviewable(self, queryset):
+        """
+        Narrow ``queryset`` to the items the current user may review.
+
+        Nobody but an admin reviews their own items.
+        """
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.exclude(user=self.request.user)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.review_decisions:
+            # Single-item reviews see the same items as bulk_review.
+            queryset = self.filter_reviewable(queryset)
+        return queryset
+
+    def after_bulk_review(self, reviewed, previous_status):
+        """
+        Hook run inside the review transaction after the UPDATE.
+
+        ``reviewed`` are the updated items, re-read from the database, and
+        ``previous_status`` maps their ids to the status they had before.
+        """
+
+    def get_review_verb(self, obj, status):
+        """Return the notification verb for ``obj`` having moved to ``status``."""
+        return f"{status} your {obj._meta.verbose_name}"
+
+    def get_review_key(self, obj):
+        """Return the outbox idempotency key of a review of ``obj``."""
+        return f'{obj._meta.model_name}:{obj.pk}:{obj.reviewed_at.isoformat()}'
+
+    def notify_owner(self, obj, level):
+        """Queue the notification telling ``obj``'s owner about its review."""
+        enqueue_many([self._review_message(obj, level)])
+
+    def _review_message(self, obj, level):
+        return notification_message(
+            recipient=obj.user,
+            actor=self.request.user,
+            verb=self.get_review_verb(obj, obj.status),
+            target=obj,
+            level=level,
+            key=self.get_review_key(obj)
+        )
+
+    @action(detail=False, methods=['post'])
+    def bulk_review(self, request):
+        """Apply one review decision to a list of items."""
+        serializer = BulkReviewSerializer(data=request.data, context={
+            'decisions': self.review_decisions,
+            'max_items': self.bulk_review_max_items,
+        })
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        new_status, from_statuses, level = self.review_decisions[serializer.validated_data['decision']]
+
+        model = self.get_queryset().model
+        with transaction.atomic():
+            current = dict(
+                self.filter_reviewable(self.get_queryset().filter(pk__in=ids))
+                .select_for_update(of=('self',))
+                .values_list('pk', 'status')
+            )
+            eligible = [pk for pk, item_status in current.items() if item_status in from_statuses]
+
+            reviewed = []
+            if eligible:
+                model.objects.filter(pk__in=eligible, status__in=from_statuses).update(
+                    status=new_status,
+                    reviewed_by=request.user,
+                    reviewed_at=timezone.now(),
+                    manager_comments=serializer.validated_data['manager_comments']
+                )
+                reviewed = list(model.objects.filter(pk__in=eligible).select_related(*self.review_select_related))
+                self.after_bulk_review(reviewed, current)
+                enqueue_many([self._review_message(obj, level) for obj in reviewed])
+                status_changed.send(sender=model, instances=reviewed, previous_status=current)
+
+        results = []
+        for pk in ids:
+            if pk not in current:
+                results.append({'id': pk, 'result': 'not_found'})
+            elif pk in eligible:
+                results.append({'id': pk, 'result': 'updated', 'status': new_status})
+            else:
+                results.append({'id': pk, 'result': 'invalid_status', 'status': current[pk]})
+
+        return Response({'updated': len(reviewed), 'results': results}, status=status.HTTP_200_OK)
@@ -0,0 +1,321 @@
+"""
+Optional monthly partitioning of the date-keyed tables on PostgreSQL.
+
+``DailyCallReport`` and ``ExpenseClaim`` gain a row per MR per working day,
+and every report and analytics query is a range on ``date``. Converted to
+tables declaratively partitioned by month on ``date``, those queries only
+scan the months they ask for, and old months can be detached in one
+statement instead of deleted row by row.
+
+``manage.py manage_partitions --convert`` rebuilds each table as a
+partitioned one (under an exclusive lock, in one transaction): monthly
+partitions from the earliest row, a default partition for dates outside
+them, the rows copied over, then the indexes, constraints and id sequence
+recreated. PostgreSQL requires the primary key to include the partition
+key, so it becomes ``(id, date)``; Django still addresses rows by ``id``
+alone. Unique constraints without ``date`` cannot be kept and are reported.
+
+A foreign key can only reference a unique constraint, and on a partitioned
+table those include ``date``. The visit tables (``DoctorVisit``,
+``ChemistVisit``) therefore carry their report's date and are partitioned
+with the reports (``CO_PARTITIONED_MODELS``): converted, extended,
+and detached together, each with a ``(report id, date)`` foreign key to
+the reports that cascades deletes and date changes. Moving a row between
+partitions through such a key needs PostgreSQL 15. Other foreign keys to a
+converted table are dropped and reported.
+
+Run without ``--convert`` (e.g. daily from cron), the command creates the
+partitions of the next ``PARTITION_MONTHS_AHEAD`` months and, with
+``PARTITION_RETAIN_MONTHS``, detaches months older than that. Detached
+partitions remain as standalone tables for archiving.
+"""
+import re
+from datetime import date
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.utils import timezone
+
+PARTITIONED_MODELS = ('reports.DailyCallReport', 'expenses.ExpenseClaim')
+# Models partitioned along with another: label -> (model label, foreign key
+# to it) of tables whose rows each belong to one of its rows, on its date.
+CO_PARTITIONED_MODELS = {
+    'reports.DailyCallReport': (
+        ('reports.DoctorVisit', 'dailycallreport'),
+        ('reports.ChemistVisit', 'dailycallreport'),
+    ),
+}
+PARTITION_FIELD = 'date'
+# --convert refuses older servers: before PostgreSQL 15, moving a report to
+# another month's partition deletes its visits through the cascading key.
+MIN_POSTGRESQL_VERSION = 150000
+
+
+def add_months(month, count):
+    """First day of the month ``count`` months after ``month``'s."""
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def months_between(first, last):
+    """First days of every month from ``first``'s to ``last``'s, inclusive."""
+    month = first.replace(day=1)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def key_columns(definition):
+    """Column names in the first parenthesised list of a constraint or index."""
+    match = re.search(r'\(([^)]*)\)', definition)
+    if not match:
+        return []
+    return [part.strip().split(' ')[0].strip('"') for part in match.group(1).split(',')]
+
+
+class MonthlyPartitioning:
+    """Create, list and detach the monthly partitions of one model's table."""
+
+    def __init__(self, model, dry_run=False, parent_field=None):
+        self.model = model
+        self.table = model._meta.db_table
+        self.column = model._meta.get_field(PARTITION_FIELD).column
+        self.dry_run = dry_run
+        self.parent_field = parent_field
+        self.statements = []
+        self.children = []
+
+    @classmethod
+    def for_label(cls, label, **kwargs):
+        partitioning = cls(apps.get_model(label), **kwargs)
+        for child_label, parent_field in CO_PARTITIONED_MODELS.get(label, ()):
+            child = cls(apps.get_model(child_label), parent_field=parent_field, **kwargs)
+            child.statements = partitioning.statements
+            partitioning.children.append(child)
+        return partitioning
+
+    @property
+    def group(self):
+        """This table and the ones partitioned with it, parent first."""
+        return [self, *self.children]
+
+    def quote(self, name):
+        return connection.ops.quote_name(name)
+
+    def partition_name(self, month):
+        return f'{self.table}_p{month:%Y%m}'
+
+    @property
+    def default_name(self):
+        return f'{self.table}_default'
+
+    def execute(self, sql):
+        """Run a DDL/DML statement, or only record it in dry-run mode."""
+        self.statements.append(sql)
+        if not self.dry_run:
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+
+    def fetch(self, sql, params=None):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def is_partitioned(self):
+        rows = self.fetch('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [self.table])
+        return bool(rows) and rows[0][0] == 'p'
+
+    def partitions(self):
+        """``{month: partition name}`` of the attached monthly partitions."""
+        rows = self.fetch(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s)', [self.table]
+        )
+        pattern = re.compile(rf'^{re.escape(self.table)}_p(\d{{4}})(\d{{2}})$')
+        found = {}
+        for (name,) in rows:
+            match = pattern.match(name)
+            if match:
+                found[date(int(match.group(1)), int(match.group(2)), 1)] = name
+        return found
+
+    def _bounds(self, month):
+        return f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+    def _in_month(self, month):
+        return (
+            f"{self.quote(self.column)} >= '{month.isoformat()}' "
+            f"AND {self.quote(self.column)} < '{add_months(month, 1).isoformat()}'"
+        )
+
+    def _create_month(self, month):
+        self.execute(
+            f'CREATE TABLE {self.quote(self.partition_name(month))} '
+            f'PARTITION OF {self.quote(self.table)} FOR VALUES {self._bounds(month)}'
+        )
+
+    def create_partition(self, month):
+        """Create ``month``'s partitions, moving matching rows out of the default ones."""
+        group = self.group
+        stray = any(
+            p.fetch(f'SELECT EXISTS (SELECT 1 FROM {p.quote(p.default_name)} WHERE {p._in_month(month)})')[0][0]
+            for p in group
+        )
+        if not stray:
+            for p in group:
+                p._create_month(month)
+            return
+        # Rows for this month sit in the default partitions, which would
+        # otherwise violate the new partitions' bounds: set them aside, then
+        # put them back once the partitions exist. Visits go out before and
+        # come back after their reports, so the foreign keys hold throughout.
+        with transaction.atomic():
+            for p in group:
+                p.execute(
+                    f'CREATE TEMPORARY TABLE {p.quote(p.partition_name(month) + "_moving")} ON COMMIT DROP AS '
+                    f'SELECT * FROM {p.quote(p.default_name)} WHERE {p._in_month(month)}'
+                )
+            for p in reversed(group):
+                p.execute(f'DELETE FROM {p.quote(p.default_name)} WHERE {p._in_month(month)}')
+            for p in group:
+                p._create_month(month)
+                p.execute(
+                    f'INSERT INTO {p.quote(p.table)} '
+                    f'SELECT * FROM {p.quote(p.partition_name(month) + "_moving")}'
+                )
+
+    def ensure_partitions(self, months_ahead, today=None):
+        """Create the missing partitions up to ``months_ahead`` months from now."""
+        current = (today or timezone.now().date()).replace(day=1)
+        existing = self.partitions()
+        first = min(existing, default=current)
+        created = []
+        for month in months_between(min(first, current), add_months(current, months_ahead)):
+            if month not in existing:
+                self.create_partition(month)
+                created.append(self.partition_name(month))
+        return created
+
+    def detach_partitions(self, retain_months, today=None):
+        """Detach partitions entirely older than the last ``retain_months`` months."""
+        cutoff = add_months((today or timezone.now().date()).replace(day=1), -retain_months)
+        detached = []
+        for month, name in sorted(self.partitions().items()):
+            if month < cutoff:
+                # A report partition cannot leave while visits in the
+                # partitioned tables still reference it.
+                for child in self.children:
+                    child.detach_month(month, self.table)
+                self.execute(f'ALTER TABLE {self.quote(self.table)} DETACH PARTITION {self.quote(name)}')
+                detached.append(name)
+        return detached
+
+    def detach_month(self, month, parent_table):
+        """Detach ``month``'s partition and drop its foreign keys to ``parent_table``."""
+        name = self.partition_name(month)
+        self.execute(f'ALTER TABLE {self.quote(self.table)} DETACH PARTITION {self.quote(name)}')
+        # The detached table keeps a copy of the parent table's foreign key.
+        for (constraint,) in self.fetch(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) "
+            "AND confrelid = to_regclass(%s) AND contype = 'f'", [name, parent_table]
+        ):
+            self.execute(f'ALTER TABLE {self.quote(name)} DROP CONSTRAINT {self.quote(constraint)}')
+
+    def convert(self, months_ahead, today=None):
+        """
+        Rebuild the table, and those partitioned with it, as partitioned by month.
+
+        Returns the notes worth reporting (dropped foreign keys, constraints
+        that could not be kept).
+        """
+        today = today or timezone.now().date()
+        current = today.replace(day=1)
+        notes = []
+
+        with transaction.atomic():
+            for partitioning in self.group:
+                partitioning.execute(f'LOCK TABLE {partitioning.quote(partitioning.table)} IN ACCESS EXCLUSIVE MODE')
+            first_date = self.fetch(f'SELECT MIN({self.quote(self.column)}) FROM {self.quote(self.table)}')[0][0]
+            months = list(months_between(min(first_date or current, current), add_months(current, months_ahead)))
+            for partitioning in self.group:
+                notes += partitioning._rebuild(months, self.table, {child.table for child in self.children})
+            for child in self.children:
+                child._add_parent_key(self)
+        return notes
+
+    def _rebuild(self, months, root_table, co_partitioned):
+        table = self.quote(self.table)
+        legacy = self.quote(f'{self.table}_unpartitioned')
+        sequence = self.quote(f'{self.table}_id_seq')
+        notes = []
+
+        referencing = self.fetch(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE confrelid = to_regclass(%s) AND contype = 'f'", [self.table]
+        )
+        # Foreign keys to the root table are dropped with it (and replaced by
+        # _add_parent_key for the tables partitioned with it).
+        constraints = self.fetch(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype <> 'p' "
+            "AND (contype <> 'f' OR confrelid <> to_regclass(%s))", [self.table, root_table]
+        )
+        indexes = self.fetch(
+            'SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() '
+            'AND tablename = %s AND indexname NOT IN '
+            '(SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s))',
+            [self.table, self.table]
+        )
+        max_id = self.fetch(f'SELECT MAX(id) FROM {table}')[0][0]
+
+        for referencing_table, name in referencing:
+            self.execute(f'ALTER TABLE {referencing_table} DROP CONSTRAINT {self.quote(name)}')
+            if referencing_table not in co_partitioned:
+                notes.append(f'dropped foreign key {name} on {referencing_table}')
+
+        self.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+        self.execute(
+            f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE ({self.quote(self.column)})'
+        )
+        # A serial id's default still points at the old table's sequence.
+        self.execute(f'ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT')
+        self.execute(f'CREATE TABLE {self.quote(self.default_name)} PARTITION OF {table} DEFAULT')
+        for month in months:
+            self._create_month(month)
+        self.execute(f'INSERT INTO {table} SELECT * FROM {legacy}')
+        # Dropping the old table also drops its id sequence.
+        self.execute(f'DROP TABLE {legacy}')
+
+        self.execute(f'CREATE SEQUENCE {sequence} OWNED BY {table}.id')
+        self.execute(f"SELECT setval('{self.table}_id_seq', {int(max_id or 0) + 1}, false)")
+        self.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{self.table}_id_seq')")
+        self.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {self.quote(self.table + "_pkey")} '
+            f'PRIMARY KEY (id, {self.quote(self.column)})'
+        )
+
+        for name, kind, definition in constraints:
+            if kind == 'u' and self.column not in key_columns(definition):
+                if self.parent_field is None:
+                    notes.append(f'unique constraint {name} does not include {self.column} and was dropped')
+                    continue
+                # Every row of a parent has its date, so adding it changes nothing.
+                definition = definition.replace(')', f', {self.quote(self.column)})', 1)
+            self.execute(f'ALTER TABLE {table} ADD CONSTRAINT {self.quote(name)} {definition}')
+        for name, definition in indexes:
+            if definition.startswith('CREATE UNIQUE') and self.column not in key_columns(definition):
+                notes.append(f'unique index {name} does not include {self.column} and was dropped')
+                continue
+            self.execute(definition)
+        return notes
+
+    def _add_parent_key(self, parent):
+        """Reference ``parent``'s rows by ``(id, date)``, following their deletes and date changes."""
+        column = self.model._meta.get_field(self.parent_field).column
+        self.execute(
+            f'ALTER TABLE {self.quote(self.table)} ADD CONSTRAINT {self.quote(self.table + "_parent_fk")} '
+            f'FOREIGN KEY ({self.quote(column)}, {self.quote(self.column)}) '
+            f'REFERENCES {self.quote(parent.table)} (id, {self.quote(parent.column)}) '
+            f'ON UPDATE CASCADE ON DELETE CASCADE'
+        )
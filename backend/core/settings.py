@@ -59,15 +59,20 @@ INSTALLED_APPS = [
     'expenses',
     'api',
     'notifications',
+    'outbox',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -103,9 +108,52 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        # Keep connections open between requests (and between the tasks of
+        # core.fanout's pool threads), checked before reuse.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Optional read replica for reports, analytics, the dashboard and list GETs
+# (core.db_routers). Set DB_REPLICA_NAME and/or DB_REPLICA_HOST to enable it;
+# two local databases work for testing. Test runs mirror it onto default.
+if os.getenv('DB_REPLICA_NAME') or os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Shared cache. The reference-data version, dashboard cards and replica pins
+# must be seen by every worker process, so the default is a database table
+# (created by the api migrations); set REDIS_URL to use Redis instead (needs
+# the "redis" package). CACHE_BACKEND=locmem keeps it in process memory,
+# which is only correct with a single process and is refused together with
+# a read replica.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis' if os.getenv('REDIS_URL') else 'database')
+if CACHE_BACKEND == 'redis':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    }}
+elif CACHE_BACKEND == 'database':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+DATABASE_ROUTERS = ['core.db_routers.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+# Seconds a user's reads stay on the primary after they write.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -158,13 +206,17 @@ AUTH_USER_MODEL = 'users.User'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # JWT Settings
@@ -191,4 +243,100 @@ CORS_ALLOWED_ORIGINS = [
     'http://127.0.0.1:5173',
 ]
 
-CORS_ALLOW_CREDENTIALS = True
\ No newline at end of file
+CORS_ALLOW_CREDENTIALS = True
+# Reference master data (specialties, categories, leave/expense types, holidays)
+# is cached in process memory; each process re-checks the shared version (and
+# so sees changes made by other processes) at most once per this many seconds.
+REFERENCE_DATA_CACHE_TTL = int(os.getenv('REFERENCE_DATA_CACHE_TTL', 300))
+
+# Live notification stream. The broker is 'postgres' (LISTEN/NOTIFY across
+# processes), 'memory' (single process) or 'auto' (postgres when available).
+NOTIFICATION_BROKER = os.getenv('NOTIFICATION_BROKER', 'auto')
+NOTIFICATION_STREAM_KEEPALIVE = int(os.getenv('NOTIFICATION_STREAM_KEEPALIVE', 15))
+NOTIFICATION_STREAM_MAX_AGE = int(os.getenv('NOTIFICATION_STREAM_MAX_AGE', 300))
+NOTIFICATION_STREAM_RETRY_MS = 3000
+# Seconds a stream ticket (POST notifications/stream-ticket/) stays valid;
+# the stream itself is only served under ASGI.
+NOTIFICATION_STREAM_TICKET_TTL = int(os.getenv('NOTIFICATION_STREAM_TICKET_TTL', 30))
+
+# Handlers run by the drain_outbox worker, keyed by message topic.
+OUTBOX_HANDLERS = {
+    'notifications.create': 'notifications.utils.handle_outbox_notification',
+    'expenses.preview': 'expenses.previews.generate_preview',
+}
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+# Outbox messages are processed by the "manage.py drain_outbox --loop" worker.
+# For development without a worker, OUTBOX_DRAIN_ON_COMMIT=True processes each
+# request's messages in the request itself, right after it commits.
+OUTBOX_DRAIN_ON_COMMIT = os.getenv('OUTBOX_DRAIN_ON_COMMIT', 'False') == 'True'
+
+# Retention applied by the purge_notifications command, in days.
+NOTIFICATION_RETENTION_READ_DAYS = int(os.getenv('NOTIFICATION_RETENTION_READ_DAYS', 90))
+NOTIFICATION_RETENTION_UNREAD_DAYS = int(os.getenv('NOTIFICATION_RETENTION_UNREAD_DAYS', 365))
+
+# Longest side, in pixels, of the expense attachment previews.
+EXPENSE_PREVIEW_SIZE = int(os.getenv('EXPENSE_PREVIEW_SIZE', 480))
+
+# Seconds the dashboard cards are cached; model signals invalidate them sooner.
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 300))
+
+# Authenticated users are cached per process for JWT_USER_CACHE_TTL seconds.
+# With JWT_TRUST_TOKEN_CLAIMS, role and flags are read from the access token
+# instead, so changes (including deactivation) apply when it expires
+# (ACCESS_TOKEN_LIFETIME); each refresh re-reads the user.
+JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', 60))
+JWT_USER_CACHE_SIZE = int(os.getenv('JWT_USER_CACHE_SIZE', 1024))
+JWT_TRUST_TOKEN_CLAIMS = os.getenv('JWT_TRUST_TOKEN_CLAIMS', 'False') == 'True'
+
+# Per-request SQL/timing metrics (core.middleware). Requests slower than
+# REQUEST_METRICS_SLOW_MS (0 = off) log every statement they ran as a
+# warning; the one-line summary of every request is logged at INFO, which
+# REQUEST_METRICS_LOG_LEVEL=INFO turns on. REQUEST_METRICS_HEADERS adds the
+# Server-Timing and X-Query-Count headers (and exposes them to the frontend).
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'True') == 'True'
+REQUEST_METRICS_HEADERS = os.getenv('REQUEST_METRICS_HEADERS', 'False') == 'True'
+REQUEST_METRICS_SLOW_MS = int(os.getenv('REQUEST_METRICS_SLOW_MS', 1000))
+if REQUEST_METRICS_HEADERS:
+    CORS_EXPOSE_HEADERS = ['Server-Timing', 'X-Query-Count']
+
+# On-demand cProfile capture (core.middleware.ProfilingMiddleware). Staff can
+# ask for a profile with "X-Profile: 1" or ?profile=1; a fraction of requests
+# under PROFILING_SAMPLE_PATHS (comma separated, empty = all) is sampled.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_SAMPLE_PATHS = [path for path in os.getenv('PROFILING_SAMPLE_PATHS', '').split(',') if path]
+
+# Threads per process running a view's independent queries concurrently
+# (core.fanout). Each keeps its own connection to every database it reads,
+# so a process can hold up to this many more per alias. 0 disables it.
+QUERY_FANOUT_WORKERS = int(os.getenv('QUERY_FANOUT_WORKERS', 4))
+
+# Monthly partitions of the DCR and expense claim tables (PostgreSQL only,
+# after "manage.py manage_partitions --convert"). The command creates the
+# partitions of the next PARTITION_MONTHS_AHEAD months and detaches those
+# older than PARTITION_RETAIN_MONTHS (0 = keep everything attached).
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))
+PARTITION_RETAIN_MONTHS = int(os.getenv('PARTITION_RETAIN_MONTHS', 0))
+
+# Response compression (core.middleware.CompressionMiddleware). Brotli is
+# used when the optional "brotli" package is installed, gzip otherwise.
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+COMPRESSION_CONTENT_TYPES = ('application/json', 'text/html', 'text/plain', 'text/csv', 'application/javascript')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
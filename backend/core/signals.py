@@ -0,0 +1,9 @@
+"""
+Signals shared by the apps.
+"""
+from django.dispatch import Signal
+
+# Sent after a queryset UPDATE changed the status of many rows at once,
+# which bypasses ``post_save``. Receivers get ``instances`` (the updated
+# rows, re-read) and ``previous_status`` mapping their ids to the old status.
+status_changed = Signal()
@@ -0,0 +1,16 @@
+"""
+Cache settings shared by the apps' test suites.
+
+The suites run against the configured cache, the database table by default,
+and their query counts include that cache's own queries. These settings are
+for the tests of the checks that depend on the cache backend.
+"""
+
+# A per-process cache, refused in production and alongside a replica.
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# The shared database cache the settings default to.
+DATABASE_CACHE = {'default': {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+    'LOCATION': 'django_cache',
+}}
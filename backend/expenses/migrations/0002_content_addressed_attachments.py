@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:11
+
+import expenses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expenseclaim',
+            name='attachment',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=expenses.storage.attachment_storage, upload_to='expense_attachments/', verbose_name='Attachment'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+from django.db import migrations, models
+
+
+def mark_existing_previews(apps, schema_editor):
+    """Flag the claims whose attachment already has a thumbnail."""
+    from expenses.storage import attachment_storage
+
+    ExpenseClaim = apps.get_model('expenses', 'ExpenseClaim')
+    storage = attachment_storage()
+    names = (
+        ExpenseClaim.objects.exclude(attachment__isnull=True).exclude(attachment='')
+        .values_list('attachment', flat=True).order_by().distinct()
+    )
+    with_preview = [name for name in names.iterator() if storage.exists(storage.preview_name(name))]
+    for start in range(0, len(with_preview), 500):
+        ExpenseClaim.objects.filter(attachment__in=with_preview[start:start + 500]).update(
+            has_attachment_preview=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0002_content_addressed_attachments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expenseclaim',
+            name='has_attachment_preview',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Has Attachment Preview'),
+        ),
+        migrations.RunPython(mark_existing_previews, migrations.RunPython.noop),
+    ]
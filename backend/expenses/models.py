@@ -1,7 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from masters.models import ExpenseType, BaseModel
+from .storage import attachment_storage
 
 
 class ExpenseClaim(BaseModel):
@@ -53,9 +54,13 @@ class ExpenseClaim(BaseModel):
     attachment = models.FileField(
         _('Attachment'),
         upload_to='expense_attachments/',
+        storage=attachment_storage,
+        max_length=255,
         null=True,
         blank=True
     )
+    # Set once the attachment's thumbnail exists (see expenses.previews).
+    has_attachment_preview = models.BooleanField(_('Has Attachment Preview'), default=False, editable=False)
 
     class Meta:
         verbose_name = _('Expense Claim')
@@ -64,3 +69,15 @@ class ExpenseClaim(BaseModel):
 
     def __str__(self):
         return f"{self.user} - {self.expense_type} ({self.date}) - {self.amount}"
+
+    def save(self, *args, **kwargs):
+        """Save the claim and queue a preview for a newly uploaded attachment."""
+        from .previews import schedule_preview
+
+        uploaded = bool(self.attachment) and not self.attachment._committed
+        if uploaded or not self.attachment:
+            self.has_attachment_preview = False
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if uploaded:
+                schedule_preview(self)
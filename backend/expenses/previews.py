@@ -0,0 +1,69 @@
+"""
+Preview generation for expense attachments.
+
+Saving a claim with a new attachment queues an ``expenses.preview`` outbox
+message keyed by the receipt's content hash, so each distinct receipt is
+processed once, after the request has returned, and marks every claim
+with that receipt as having a preview. The handler needs Pillow;
+without it, or for files Pillow cannot read (PDFs), no preview is made and
+reviewers get the original file.
+"""
+import logging
+from io import BytesIO
+
+from django.conf import settings
+
+from outbox.utils import enqueue
+from .storage import attachment_storage
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_TOPIC = 'expenses.preview'
+
+
+def preview_exists(name):
+    storage = attachment_storage()
+    return storage.exists(storage.preview_name(name))
+
+
+def schedule_preview(claim):
+    """Queue a preview for the claim's attachment, or mark it if one exists."""
+    name = claim.attachment.name
+    if not name:
+        return
+    if preview_exists(name):
+        type(claim).objects.filter(pk=claim.pk).update(has_attachment_preview=True)
+        claim.has_attachment_preview = True
+        return
+    digest = attachment_storage().digest_of(name)
+    enqueue(PREVIEW_TOPIC, {'name': name}, key=f'preview:{digest}')
+
+
+def generate_preview(payload, key):
+    """Outbox handler: write a JPEG thumbnail of ``payload['name']``."""
+    from .models import ExpenseClaim
+
+    try:
+        from PIL import Image, ImageOps, UnidentifiedImageError
+    except ImportError:
+        logger.info('Pillow is not installed; skipping attachment preview')
+        return
+
+    storage = attachment_storage()
+    name = payload['name']
+    if not storage.exists(name):
+        return
+
+    size = getattr(settings, 'EXPENSE_PREVIEW_SIZE', 480)
+    try:
+        with storage.open(name, 'rb') as source, Image.open(source) as image:
+            image.draft('RGB', (size, size))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((size, size))
+            output = BytesIO()
+            image.convert('RGB').save(output, 'JPEG', quality=80, optimize=True)
+    except UnidentifiedImageError:
+        return
+
+    storage.write_exact(storage.preview_name(name), output.getvalue())
+    ExpenseClaim.objects.filter(attachment=name).update(has_attachment_preview=True)
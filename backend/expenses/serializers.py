@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from django.utils import timezone
 from .models import ExpenseClaim
+from .storage import attachment_storage
 from users.serializers import UserSerializer
 from masters.models import ExpenseType
+from masters.cache import get_expense_type_rules
 
 
 class ExpenseTypeSerializer(serializers.ModelSerializer):
@@ -20,6 +22,7 @@ class ExpenseClaimSerializer(serializers.ModelSerializer):
     expense_type_details = ExpenseTypeSerializer(source='expense_type', read_only=True)
     reviewed_by_details = UserSerializer(source='reviewed_by', read_only=True)
     attachment_url = serializers.SerializerMethodField()
+    attachment_preview_url = serializers.SerializerMethodField()
 
     class Meta:
         model = ExpenseClaim
@@ -27,7 +30,7 @@ class ExpenseClaimSerializer(serializers.ModelSerializer):
             'id', 'user', 'user_details', 'expense_type', 'expense_type_details',
             'amount', 'date', 'description', 'status', 'submitted_at',
             'reviewed_by', 'reviewed_by_details', 'reviewed_at', 'manager_comments', 'attachment',
-            'attachment_url', 'is_active', 'created_at', 'updated_at'
+            'attachment_url', 'attachment_preview_url', 'is_active', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'user', 'status', 'submitted_at', 'reviewed_by',
@@ -43,6 +46,17 @@ class ExpenseClaimSerializer(serializers.ModelSerializer):
             return obj.attachment.url
         return None
 
+    def get_attachment_preview_url(self, obj):
+        """Get the URL for the attachment's thumbnail, once it is generated."""
+        if not (obj.attachment and obj.has_attachment_preview):
+            return None
+        storage = attachment_storage()
+        preview_name = storage.preview_name(obj.attachment.name)
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(storage.url(preview_name))
+        return storage.url(preview_name)
+
 
 class ExpenseClaimCreateSerializer(ExpenseClaimSerializer):
     """Serializer for creating a new expense claim."""
@@ -58,17 +72,18 @@ class ExpenseClaimCreateSerializer(ExpenseClaimSerializer):
         # Check if the expense type requires a receipt
         expense_type = attrs.get('expense_type')
         attachment = attrs.get('attachment')
+        rules = get_expense_type_rules(expense_type.pk) if expense_type else None
 
-        if expense_type and expense_type.requires_receipt and not attachment:
+        if rules and rules['requires_receipt'] and not attachment:
             raise serializers.ValidationError(
-                {"attachment": f"Receipt is required for expense type '{expense_type.name}'"}
+                {"attachment": f"Receipt is required for expense type '{rules['name']}'"}
             )
 
         # Check if the amount exceeds the maximum allowed
         amount = attrs.get('amount')
-        if expense_type and expense_type.max_amount > 0 and amount > expense_type.max_amount:
+        if rules and rules['max_amount'] > 0 and amount > rules['max_amount']:
             raise serializers.ValidationError(
-                {"amount": f"Amount exceeds maximum allowed ({expense_type.max_amount}) for this expense type"}
+                {"amount": f"Amount exceeds maximum allowed ({rules['max_amount']}) for this expense type"}
             )
 
         return attrs
@@ -95,18 +110,19 @@ class ExpenseClaimUpdateSerializer(ExpenseClaimSerializer):
             )
 
         # Validate expense type and amount
-        expense_type = attrs.get('expense_type', instance.expense_type)
+        expense_type_id = attrs['expense_type'].pk if 'expense_type' in attrs else instance.expense_type_id
         amount = attrs.get('amount', instance.amount)
         attachment = attrs.get('attachment', instance.attachment)
+        rules = get_expense_type_rules(expense_type_id)
 
-        if expense_type.requires_receipt and not attachment:
+        if rules['requires_receipt'] and not attachment:
             raise serializers.ValidationError(
-                {"attachment": f"Receipt is required for expense type '{expense_type.name}'"}
+                {"attachment": f"Receipt is required for expense type '{rules['name']}'"}
             )
 
-        if expense_type.max_amount > 0 and amount > expense_type.max_amount:
+        if rules['max_amount'] > 0 and amount > rules['max_amount']:
             raise serializers.ValidationError(
-                {"amount": f"Amount exceeds maximum allowed ({expense_type.max_amount}) for this expense type"}
+                {"amount": f"Amount exceeds maximum allowed ({rules['max_amount']}) for this expense type"}
             )
 
         return super().validate(attrs)
@@ -0,0 +1,92 @@
+"""
+Content-addressed storage for expense attachments.
+
+Uploads are streamed to a temporary file in chunks while being hashed, then
+moved to ``<upload_to>/<aa>/<bb>/<sha256><ext>``. A receipt that is uploaded
+again, on an edit or a resubmission, resolves to the file already stored
+and the copy is discarded, so every distinct receipt is kept once.
+
+Previews (small JPEG thumbnails reviewers can open instead of the full scan)
+live next to the originals under ``PREVIEW_DIR`` and are named after the
+same hash, so they are shared by every claim pointing at the receipt.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+PREVIEW_DIR = 'expense_previews'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that names files after their SHA-256 digest."""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content has been hashed.
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        os.makedirs(self.location, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.location, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+
+            name = self.hashed_name(directory, digest.hexdigest(), extension)
+            path = self.path(name)
+            if os.path.exists(path):
+                return name
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, path)
+            return name
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def hashed_name(directory, digest, extension=''):
+        return '/'.join(
+            part for part in (directory, digest[:2], digest[2:4], f'{digest}{extension}') if part
+        )
+
+    @staticmethod
+    def digest_of(name):
+        """Return the content hash encoded in a stored file's name."""
+        return os.path.splitext(os.path.basename(name))[0]
+
+    def preview_name(self, name):
+        return self.hashed_name(PREVIEW_DIR, self.digest_of(name), '.jpg')
+
+    def write_exact(self, name, data):
+        """Atomically write ``data`` to ``name`` without renaming it."""
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.preview-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(data)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+
+def attachment_storage():
+    return ContentAddressedStorage()
@@ -1,3 +1,144 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from masters.models import ExpenseType
+from outbox.models import OutboxMessage
+from outbox.utils import drain_outbox
+from .models import ExpenseClaim
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+User = get_user_model()
+
+class BulkReviewTestCase(APITestCase):
+    """Test cases for bulk review of expense claims."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(email='manager@test.com', role='manager')
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr', manager=self.manager)
+        self.expense_type = ExpenseType.objects.create(name='Travel', code='TR')
+        self.claims = [self.create_claim(self.mr) for _ in range(3)]
+        self.url = '/api/expenses/expense-claims/bulk_review/'
+        self.client.force_authenticate(user=self.manager)
+        # Content types are cached per process; don't count the first lookup.
+        ContentType.objects.get_for_models(ExpenseClaim, User)
+
+    def create_claim(self, user, **kwargs):
+        return ExpenseClaim.objects.create(
+            user=user, expense_type=self.expense_type, amount=Decimal('10.00'),
+            date=date(2030, 1, 1), description='Taxi', **kwargs
+        )
+
+    def test_bulk_approve_reports_each_outcome(self):
+        """Test per-id outcomes for updated, wrong-status, forbidden and missing items."""
+        self.claims[2].status = 'approved'
+        self.claims[2].save()
+        own_claim = self.create_claim(self.manager)
+        ids = [claim.pk for claim in self.claims] + [own_claim.pk, 9999]
+
+        # The last query drops the affected dashboards from the database cache.
+        with self.assertNumQueries(8):
+            response = self.client.post(self.url, {'ids': ids, 'decision': 'approve'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual([r['result'] for r in response.data['results']], [
+            'updated', 'updated', 'invalid_status', 'not_found', 'not_found'
+        ])
+        self.assertEqual(
+            ExpenseClaim.objects.filter(status='approved', reviewed_by=self.manager).count(), 2
+        )
+        own_claim.refresh_from_db()
+        self.assertEqual(own_claim.status, 'pending')
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_invalid_decision_is_rejected(self):
+        """Test that unknown decisions fail validation."""
+        response = self.client.post(self.url, {'ids': [self.claims[0].pk], 'decision': 'cancel'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_mr_cannot_bulk_review(self):
+        """Test that MRs are refused."""
+        self.client.force_authenticate(user=self.mr)
+        response = self.client.post(self.url, {'ids': [self.claims[0].pk], 'decision': 'approve'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AttachmentStorageTestCase(APITestCase):
+    """Test cases for content-addressed attachments and their previews."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr')
+        self.expense_type = ExpenseType.objects.create(name='Travel', code='TR')
+        self.client.force_authenticate(user=self.mr)
+
+    def upload(self, content, name):
+        return self.client.post('/api/expenses/expense-claims/', {
+            'expense_type': self.expense_type.pk, 'amount': '10.00', 'date': '2030-01-01',
+            'description': 'Taxi', 'attachment': SimpleUploadedFile(name, content),
+        }, format='multipart')
+
+    def stored_files(self, directory):
+        return [
+            name for _, _, names in os.walk(os.path.join(self.media_root, directory)) for name in names
+        ]
+
+    def test_identical_uploads_are_stored_once(self):
+        """Test that re-uploading a receipt reuses the stored file and queues one preview."""
+        first = self.upload(b'%PDF-1.4 receipt', 'receipt.pdf')
+        second = self.upload(b'%PDF-1.4 receipt', 'scan (1).PDF')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        names = set(ExpenseClaim.objects.values_list('attachment', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertRegex(names.pop(), r'^expense_attachments/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual(len(self.stored_files('expense_attachments')), 1)
+        self.assertEqual(OutboxMessage.objects.filter(topic='expenses.preview').count(), 1)
+
+        # PDFs get no preview; reviewers fall back to the original.
+        self.assertEqual(drain_outbox(), (1, 0))
+        response = self.client.get(f"/api/expenses/expense-claims/{second.data['id']}/preview/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_preview_is_generated_off_the_request(self):
+        """Test that the outbox worker writes a thumbnail the API then serves."""
+        scan = BytesIO()
+        Image.new('RGB', (2400, 1200), 'white').save(scan, 'PNG')
+        claim_id = self.upload(scan.getvalue(), 'receipt.png').data['id']
+        self.assertIsNone(self.client.get(f'/api/expenses/expense-claims/{claim_id}/').data['attachment_preview_url'])
+
+        drain_outbox()
+
+        data = self.client.get(f'/api/expenses/expense-claims/{claim_id}/').data
+        self.assertRegex(data['attachment_preview_url'], r'/media/expense_previews/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        response = self.client.get(f'/api/expenses/expense-claims/{claim_id}/preview/')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        with Image.open(BytesIO(b''.join(response.streaming_content))) as preview:
+            self.assertEqual(preview.size, (480, 240))
+
+        # The same receipt again already has its thumbnail; nothing is queued.
+        again = self.upload(scan.getvalue(), 'receipt-copy.png').data
+        self.assertEqual(again['attachment_preview_url'], data['attachment_preview_url'])
+        self.assertEqual(OutboxMessage.objects.filter(status='pending').count(), 0)
@@ -1,9 +1,12 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
+from django.http import FileResponse
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import ExpenseClaim
+from .storage import attachment_storage
 from .serializers import (
     ExpenseClaimSerializer, ExpenseClaimCreateSerializer,
     ExpenseClaimUpdateSerializer, ExpenseClaimReviewSerializer,
@@ -11,10 +14,12 @@ from .serializers import (
 )
 from .permissions import IsOwnerOrManager, IsOwner, IsManager, CanApproveExpense
 from masters.models import ExpenseType
-from notifications.utils import create_notification
+from masters.cache import ReferenceDataCacheMixin
+from core.mixins import BulkReviewMixin, RelatedFieldsMixin
+from notifications.utils import create_notifications_bulk, get_manager_recipients
 
 
-class ExpenseTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class ExpenseTypeViewSet(ReferenceDataCacheMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing expense types."""
 
     queryset = ExpenseType.objects.filter(is_active=True)
@@ -26,7 +31,7 @@ class ExpenseTypeViewSet(viewsets.ReadOnlyModelViewSet):
     ordering = ['name']
 
 
-class ExpenseClaimViewSet(viewsets.ModelViewSet):
+class ExpenseClaimViewSet(RelatedFieldsMixin, BulkReviewMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing ExpenseClaim instances."""
 
     queryset = ExpenseClaim.objects.all()
@@ -37,12 +42,20 @@ class ExpenseClaimViewSet(viewsets.ModelViewSet):
     search_fields = ['description', 'expense_type__name']
     ordering_fields = ['date', 'amount', 'submitted_at', 'status']
     ordering = ['-submitted_at']
+    select_related_fields = ('user', 'expense_type', 'reviewed_by')
+    review_decisions = {
+        'approve': ('approved', ('pending', 'queried'), 'success'),
+        'reject': ('rejected', ('pending', 'queried'), 'warning'),
+        'query': ('queried', ('pending',), 'info'),
+    }
+    review_select_related = ('user', 'expense_type')
+    bulk_review_permission_classes = [permissions.IsAuthenticated, CanApproveExpense]
 
     def get_queryset(self):
         """
         Filter queryset based on user role:
         - MRs can only see their own expense claims
-        - Managers can see all expense claims
+        - Managers can see their own and their team's expense claims
         - Admins can see all expense claims
         """
         user = self.request.user
@@ -51,12 +64,26 @@ class ExpenseClaimViewSet(viewsets.ModelViewSet):
             return ExpenseClaim.objects.all()
 
         if user.role == 'manager':
-            # Managers can see all expense claims
-            return ExpenseClaim.objects.all()
+            # Managers can see their own and their team's expense claims
+            return ExpenseClaim.objects.filter(user__in=user.team_user_ids())
 
         # Regular users can only see their own expense claims
         return ExpenseClaim.objects.filter(user=user)
 
+    def filter_reviewable(self, queryset):
+        """Claims submitted by managers can only be reviewed by admins."""
+        user = self.request.user
+        if user.is_superuser or user.is_staff:
+            return queryset
+        return super().filter_reviewable(queryset).exclude(user__role='manager')
+
+    def get_review_verb(self, obj, status):
+        """Describe a review of an expense claim to its owner."""
+        description = f"{obj.amount} ({obj.expense_type.name})"
+        if status == 'queried':
+            return f"requested more information about your expense claim for {description}"
+        return f"{status} your expense claim for {description}"
+
     def get_serializer_class(self):
         """Return appropriate serializer class based on the action."""
         if self.action == 'create':
@@ -73,17 +100,13 @@ class ExpenseClaimViewSet(viewsets.ModelViewSet):
         
         # Create notification for managers
         user = self.request.user
-        managers = [u for u in user._meta.model.objects.filter(role='manager') if u.is_active]
-        
-        # If there are managers, notify them
-        for manager in managers:
-            create_notification(
-                recipient=manager,
-                actor=user,
-                verb=f"submitted an expense claim for {expense_claim.amount} ({expense_claim.expense_type.name})",
-                target=expense_claim,
-                level='info'
-            )
+        create_notifications_bulk(
+            get_manager_recipients(user),
+            actor=user,
+            verb=f"submitted an expense claim for {expense_claim.amount} ({expense_claim.expense_type.name})",
+            target=expense_claim,
+            level='info'
+        )
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, CanApproveExpense])
     def approve(self, request, pk=None):
@@ -103,19 +126,14 @@ class ExpenseClaimViewSet(viewsets.ModelViewSet):
             'manager_comments': request.data.get('manager_comments', '')
         })
         serializer.is_valid(raise_exception=True)
-        expense_claim = serializer.save(
-            reviewed_by=request.user,
-            reviewed_at=timezone.now()
-        )
-        
-        # Create notification for the expense claim owner
-        create_notification(
-            recipient=expense_claim.user,
-            actor=request.user,
-            verb=f"approved your expense claim for {expense_claim.amount} ({expense_claim.expense_type.name})",
-            target=expense_claim,
-            level='success'
-        )
+        with transaction.atomic():
+            expense_claim = serializer.save(
+                reviewed_by=request.user,
+                reviewed_at=timezone.now()
+            )
+
+            # Queue a notification for the expense claim owner
+            self.notify_owner(expense_claim, 'success')
 
         return Response(serializer.data)
 
@@ -137,19 +155,14 @@ class ExpenseClaimViewSet(viewsets.ModelViewSet):
             'manager_comments': request.data.get('manager_comments', '')
         })
         serializer.is_valid(raise_exception=True)
-        expense_claim = serializer.save(
-            reviewed_by=request.user,
-            reviewed_at=timezone.now()
-        )
-        
-        # Create notification for the expense claim owner
-        create_notification(
-            recipient=expense_claim.user,
-            actor=request.user,
-            verb=f"rejected your expense claim for {expense_claim.amount} ({expense_claim.expense_type.name})",
-            target=expense_claim,
-            level='warning'
-        )
+        with transaction.atomic():
+            expense_claim = serializer.save(
+                reviewed_by=request.user,
+                reviewed_at=timezone.now()
+            )
+
+            # Queue a notification for the expense claim owner
+            self.notify_owner(expense_claim, 'warning')
 
         return Response(serializer.data)
 
@@ -171,19 +184,14 @@ class ExpenseClaimViewSet(viewsets.ModelViewSet):
             'manager_comments': request.data.get('manager_comments', '')
         })
         serializer.is_valid(raise_exception=True)
-        expense_claim = serializer.save(
-            reviewed_by=request.user,
-            reviewed_at=timezone.now()
-        )
-        
-        # Create notification for the expense claim owner
-        create_notification(
-            recipient=expense_claim.user,
-            actor=request.user,
-            verb=f"requested more information about your expense claim for {expense_claim.amount} ({expense_claim.expense_type.name})",
-            target=expense_claim,
-            level='info'
-        )
+        with transaction.atomic():
+            expense_claim = serializer.save(
+                reviewed_by=request.user,
+                reviewed_at=timezone.now()
+            )
+
+            # Queue a notification for the expense claim owner
+            self.notify_owner(expense_claim, 'info')
 
         return Response(serializer.data)
 
@@ -205,3 +213,23 @@ class ExpenseClaimViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(expense_claim)
         return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        """Serve the thumbnail of the claim's attachment."""
+        expense_claim = self.get_object()
+        if not expense_claim.attachment:
+            return Response({"detail": "This expense claim has no attachment."}, status=status.HTTP_404_NOT_FOUND)
+
+        if not expense_claim.has_attachment_preview:
+            return Response(
+                {"detail": "No preview is available for this attachment."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        storage = attachment_storage()
+        preview_name = storage.preview_name(expense_claim.attachment.name)
+
+        response = FileResponse(storage.open(preview_name, 'rb'), content_type='image/jpeg')
+        # Previews are named after the receipt's content, so they never change.
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
-from .models import LeaveRequest
+from .models import LeaveBalance, LeaveRequest
 
 
 @admin.register(LeaveRequest)
@@ -31,4 +31,13 @@ class LeaveRequestAdmin(admin.ModelAdmin):
     def days_count(self, obj):
         """Return the number of days requested."""
         return obj.days_count
-    days_count.short_description = _('Days')
\ No newline at end of file
+    days_count.short_description = _('Days')
+
+
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    """Admin for LeaveBalance model."""
+    list_display = ('user', 'leave_type', 'year', 'used_days', 'pending_days', 'updated_at')
+    list_filter = ('year', 'leave_type')
+    search_fields = ('user__email', 'user__first_name', 'user__last_name')
+    readonly_fields = ('updated_at',)
@@ -4,4 +4,6 @@ from django.apps import AppConfig
 class LeavesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'leaves'
-    verbose_name = 'Leave Management'
\ No newline at end of file
+    verbose_name = 'Leave Management'
+    def ready(self):
+        from . import signals  # noqa: F401
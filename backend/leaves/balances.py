@@ -0,0 +1,81 @@
+"""
+Leave balance ledger maintenance.
+
+Every pending or approved ``LeaveRequest`` books its days in one
+``LeaveBalance`` row; these helpers move days between rows as requests are
+created, reviewed, edited, cancelled or deleted.
+"""
+from collections import defaultdict
+
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import LeaveBalance
+
+
+def lock_balance(user_id, leave_type_id, year):
+    """
+    Return the ledger row for a user, leave type and year, locked for update.
+
+    Must be called inside a transaction; the row is created if missing.
+    """
+    lookup = {'user_id': user_id, 'leave_type_id': leave_type_id, 'year': year}
+    balance = LeaveBalance.objects.select_for_update().filter(**lookup).select_related('leave_type').first()
+    if balance is None:
+        LeaveBalance.objects.bulk_create([LeaveBalance(**lookup)], ignore_conflicts=True)
+        balance = LeaveBalance.objects.select_for_update().select_related('leave_type').get(**lookup)
+    return balance
+
+
+def _adjust(user_id, leave_type_id, year, field, days):
+    lookup = {'user_id': user_id, 'leave_type_id': leave_type_id, 'year': year}
+    updated = LeaveBalance.objects.filter(**lookup).update(
+        **{field: Greatest(F(field) + days, Value(0))}, updated_at=timezone.now()
+    )
+    if not updated and days > 0:
+        LeaveBalance.objects.bulk_create([LeaveBalance(**lookup)], ignore_conflicts=True)
+        LeaveBalance.objects.filter(**lookup).update(**{field: F(field) + days}, updated_at=timezone.now())
+
+
+def _book(changes, previous, current):
+    if previous:
+        changes[previous[:4]] -= previous[4]
+    if current:
+        changes[current[:4]] += current[4]
+
+
+def _apply(changes):
+    for key, days in changes.items():
+        if days:
+            _adjust(*key, days)
+
+
+def move_balance(previous, current):
+    """
+    Replace the ledger booking ``previous`` with ``current``.
+
+    Both are ``LeaveRequest.balance_entry()`` tuples or ``None``.
+    """
+    changes = defaultdict(int)
+    _book(changes, previous, current)
+    _apply(changes)
+
+
+def move_balances(leave_requests, previous_status):
+    """
+    Update the ledger after ``leave_requests`` changed status with a queryset
+    ``update()``, which bypasses ``LeaveRequest.save``.
+
+    ``previous_status`` maps each request id to its status before the update.
+    """
+    changes = defaultdict(int)
+    for leave_request in leave_requests:
+        new_status = leave_request.status
+        leave_request.status = previous_status[leave_request.pk]
+        previous = leave_request.balance_entry()
+        leave_request.status = new_status
+        current = leave_request.balance_entry()
+        _book(changes, previous, current)
+        leave_request._saved_balance_entry = current
+    _apply(changes)
@@ -0,0 +1,150 @@
+"""
+Interval queries over leave requests.
+
+On Postgres, every pending or approved request is covered by the
+``leaves_no_overlap`` exclusion constraint (``LeaveRequest.Meta``), whose GiST
+index over ``(user_id, daterange(start_date, end_date, '[]'))`` serves
+overlap queries and rejects overlapping requests of the same user. Other
+databases fall back to B-tree comparisons on the dates in the database and
+``IntervalIndex`` for work on the fetched rows.
+"""
+from bisect import bisect_right
+from datetime import timedelta
+
+from django.db import connections, models
+from django.db.models import F, Func, Value
+
+# Statuses that hold days on the calendar; only these may not overlap.
+BLOCKING_STATUSES = ('pending', 'approved')
+
+OVERLAP_CONSTRAINT = 'leaves_no_overlap'
+
+
+class DateRangeFunc(Func):
+    """``daterange(start, end, '[]')``: an inclusive Postgres date range."""
+
+    function = 'daterange'
+
+    def __init__(self, start, end, **extra):
+        from django.contrib.postgres.fields import DateRangeField
+
+        super().__init__(start, end, Value('[]'), output_field=DateRangeField(), **extra)
+
+
+class LeaveRequestQuerySet(models.QuerySet):
+    """Query helpers for leave requests."""
+
+    def blocking(self):
+        """Requests that hold days on the calendar."""
+        return self.filter(status__in=BLOCKING_STATUSES)
+
+    def approved(self):
+        return self.filter(status='approved')
+
+    def overlapping(self, start_date, end_date):
+        """Requests sharing at least one day with ``start_date``..``end_date``."""
+        if connections[self.db].vendor == 'postgresql':
+            from django.db.backends.postgresql.psycopg_any import DateRange
+
+            return self.alias(
+                period=DateRangeFunc(F('start_date'), F('end_date'))
+            ).filter(period__overlap=DateRange(start_date, end_date, '[]'))
+        return self.filter(start_date__lte=end_date, end_date__gte=start_date)
+
+    def on_leave_between(self, start_date, end_date):
+        """Ids of users with approved leave between two dates (inclusive)."""
+        return (
+            self.approved().overlapping(start_date, end_date)
+            .values_list('user_id', flat=True).distinct()
+        )
+
+
+class IntervalIndex:
+    """
+    Closed date intervals sorted by start, answering overlap queries.
+
+    Alongside the sorted starts it keeps the running maximum of the ends, so
+    a query bisects to the last interval starting on or before its end and
+    walks back only while earlier intervals can still reach its start.
+    """
+
+    def __init__(self, intervals):
+        self._intervals = sorted(intervals, key=lambda interval: interval[0])
+        self._starts = [interval[0] for interval in self._intervals]
+        self._max_ends = []
+        max_end = None
+        for interval in self._intervals:
+            max_end = interval[1] if max_end is None or interval[1] > max_end else max_end
+            self._max_ends.append(max_end)
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def overlapping(self, start, end):
+        """Return the intervals sharing at least one day with ``start``..``end``."""
+        found = []
+        i = bisect_right(self._starts, end) - 1
+        while i >= 0 and self._max_ends[i] >= start:
+            if self._intervals[i][1] >= start:
+                found.append(self._intervals[i])
+            i -= 1
+        found.reverse()
+        return found
+
+    def covered_days(self, start, end):
+        """Count the days in ``start``..``end`` covered by any interval."""
+        days = 0
+        current_start = current_end = None
+        for interval in self.overlapping(start, end):
+            lo, hi = max(interval[0], start), min(interval[1], end)
+            if current_end is not None and lo <= current_end + timedelta(days=1):
+                current_end = max(current_end, hi)
+                continue
+            if current_end is not None:
+                days += (current_end - current_start).days + 1
+            current_start, current_end = lo, hi
+        if current_end is not None:
+            days += (current_end - current_start).days + 1
+        return days
+
+
+def availability_matrix(users, leaves, first_day, last_day, holidays=()):
+    """
+    Build a user x day availability grid.
+
+    ``leaves`` are ``(user_id, start_date, end_date, status, leave_type_code)``
+    rows. Each cell is ``'weekend'``, ``'holiday'``, ``'leave'`` (approved),
+    ``'pending'`` or ``'available'``.
+    """
+    days = [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+    holidays = set(holidays)
+
+    by_user = {}
+    for user_id, start_date, end_date, status, code in leaves:
+        by_user.setdefault(user_id, []).append((start_date, end_date, status, code))
+    indexes = {user_id: IntervalIndex(rows) for user_id, rows in by_user.items()}
+
+    rows = []
+    for user in users:
+        index = indexes.get(user.pk)
+        cells = []
+        for day in days:
+            if day.weekday() >= 5:
+                cells.append('weekend')
+            elif day in holidays:
+                cells.append('holiday')
+            else:
+                covering = index.overlapping(day, day) if index else []
+                if any(interval[2] == 'approved' for interval in covering):
+                    cells.append('leave')
+                elif covering:
+                    cells.append('pending')
+                else:
+                    cells.append('available')
+        rows.append({
+            'id': user.pk,
+            'name': user.full_name,
+            'days': cells,
+            'leave_days': cells.count('leave'),
+        })
+    return {'days': [day.isoformat() for day in days], 'users': rows}
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:04
+
+import django.db.models.deletion
+from collections import defaultdict
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_balances(apps, schema_editor):
+    """Book existing pending and approved leave requests in the ledger."""
+    LeaveRequest = apps.get_model('leaves', 'LeaveRequest')
+    LeaveBalance = apps.get_model('leaves', 'LeaveBalance')
+    fields = {'pending': 'pending_days', 'approved': 'used_days'}
+    totals = defaultdict(lambda: {'pending_days': 0, 'used_days': 0})
+
+    requests = LeaveRequest.objects.filter(status__in=fields).values_list(
+        'user_id', 'leave_type_id', 'start_date', 'end_date', 'status'
+    )
+    for user_id, leave_type_id, start_date, end_date, status in requests.iterator():
+        key = (user_id, leave_type_id, start_date.year)
+        totals[key][fields[status]] += (end_date - start_date).days + 1
+
+    LeaveBalance.objects.bulk_create([
+        LeaveBalance(user_id=user_id, leave_type_id=leave_type_id, year=year, **days)
+        for (user_id, leave_type_id, year), days in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0001_initial'),
+        ('masters', '0003_territory_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Year')),
+                ('used_days', models.PositiveIntegerField(default=0, verbose_name='Used Days')),
+                ('pending_days', models.PositiveIntegerField(default=0, verbose_name='Pending Days')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('leave_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='masters.leavetype', verbose_name='Leave Type')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Leave Balance',
+                'verbose_name_plural': 'Leave Balances',
+                'ordering': ['-year', 'leave_type__name'],
+                'unique_together': {('user', 'leave_type', 'year')},
+            },
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:06
+
+import django.contrib.postgres.constraints
+import django.db.models.expressions
+import leaves.intervals
+import logging
+from collections import defaultdict
+from django.conf import settings
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+from django.db.models.functions import Greatest
+
+RESOLUTION_COMMENT = 'Cancelled automatically: overlapped another pending or approved leave request.'
+
+logger = logging.getLogger('leaves.migrations')
+
+
+def cancel_overlapping_requests(apps, schema_editor):
+    """
+    Resolve overlaps the exclusion constraint would reject (Postgres only).
+
+    Per user, approved requests are kept first, then pending ones in the
+    order they were made; a pending request overlapping one already kept is
+    cancelled and its days released from the balance ledger; the cancelled
+    requests are logged and carry ``RESOLUTION_COMMENT``. Overlapping
+    approved requests need a decision from a person, so they stop the
+    migration with a list of the ids involved.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    LeaveRequest = apps.get_model('leaves', 'LeaveRequest')
+    LeaveBalance = apps.get_model('leaves', 'LeaveBalance')
+
+    requests = LeaveRequest.objects.filter(status__in=('pending', 'approved')).order_by(
+        'user_id', models.Case(models.When(status='approved', then=0), default=1), 'requested_at', 'id'
+    ).values_list('id', 'user_id', 'leave_type_id', 'start_date', 'end_date', 'status')
+
+    kept = defaultdict(list)
+    cancelled, conflicts = [], []
+    for pk, user_id, leave_type_id, start_date, end_date, status in requests.iterator():
+        clash = next((other for other in kept[user_id] if other[1] <= end_date and other[2] >= start_date), None)
+        if clash is None:
+            kept[user_id].append((pk, start_date, end_date))
+        elif status == 'pending':
+            cancelled.append((pk, user_id, leave_type_id, start_date, end_date))
+        else:
+            conflicts.append((clash[0], pk))
+
+    if conflicts:
+        pairs = ', '.join(f'{first} and {second}' for first, second in conflicts)
+        raise RuntimeError(
+            f'Approved leave requests overlap ({pairs}); cancel or shorten one of each pair, then migrate again.'
+        )
+
+    for pk, user_id, leave_type_id, start_date, end_date in cancelled:
+        LeaveRequest.objects.filter(pk=pk).update(status='cancelled', manager_comments=RESOLUTION_COMMENT)
+        LeaveBalance.objects.filter(user_id=user_id, leave_type_id=leave_type_id, year=start_date.year).update(
+            pending_days=Greatest(models.F('pending_days') - ((end_date - start_date).days + 1), 0)
+        )
+        logger.warning(
+            'Cancelled leave request %s of user %s (%s to %s): it overlapped a request that was kept.',
+            pk, user_id, start_date, end_date
+        )
+    if cancelled:
+        logger.warning('Cancelled %d overlapping pending leave requests.', len(cancelled))
+
+
+class AddPostgresConstraint(migrations.AddConstraint):
+    """``AddConstraint`` whose DDL only runs on PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0002_leave_balance'),
+        ('masters', '0003_territory_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['user', 'start_date', 'end_date'], name='leave_user_dates_idx'),
+        ),
+        migrations.RunPython(cancel_overlapping_requests, migrations.RunPython.noop),
+        BtreeGistExtension(),
+        AddPostgresConstraint(
+            model_name='leaverequest',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(('status__in', ('pending', 'approved'))),
+                expressions=[
+                    ('user', '='),
+                    (leaves.intervals.DateRangeFunc(
+                        django.db.models.expressions.F('start_date'), django.db.models.expressions.F('end_date')
+                    ), '&&'),
+                ],
+                name='leaves_no_overlap',
+                violation_error_message='These dates overlap another pending or approved leave request.',
+            ),
+        ),
+    ]
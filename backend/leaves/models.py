@@ -1,7 +1,19 @@
-from django.db import models
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import RangeOperators
+from django.db import models, transaction
+from django.db.models import DEFERRED, F, Q
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from masters.models import LeaveType, BaseModel
+from .intervals import BLOCKING_STATUSES, OVERLAP_CONSTRAINT, DateRangeFunc, LeaveRequestQuerySet
+
+# Statuses that count against a leave balance, and the ledger column each
+# one is booked in.
+BALANCE_FIELDS = {
+    'pending': 'pending_days',
+    'approved': 'used_days',
+}
+BALANCE_SOURCE_FIELDS = ('user_id', 'leave_type_id', 'start_date', 'end_date', 'status')
 
 
 class LeaveRequest(BaseModel):
@@ -47,10 +59,31 @@ class LeaveRequest(BaseModel):
     reviewed_at = models.DateTimeField(_('Reviewed At'), null=True, blank=True)
     manager_comments = models.TextField(_('Manager Comments'), null=True, blank=True)
     
+    objects = LeaveRequestQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('Leave Request')
         verbose_name_plural = _('Leave Requests')
         ordering = ['-requested_at']
+        indexes = [
+            models.Index(fields=['user', 'start_date', 'end_date'], name='leave_user_dates_idx'),
+        ]
+        constraints = [
+            # PostgreSQL only (needs btree_gist); see migration 0003.
+            ExclusionConstraint(
+                name=OVERLAP_CONSTRAINT,
+                expressions=[
+                    ('user', RangeOperators.EQUAL),
+                    (DateRangeFunc(F('start_date'), F('end_date')), RangeOperators.OVERLAPS),
+                ],
+                condition=Q(status__in=BLOCKING_STATUSES),
+                violation_error_message=_('These dates overlap another pending or approved leave request.'),
+            ),
+        ]
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saved_balance_entry = self._loaded_balance_entry()
     
     def __str__(self):
         return f"{self.user} - {self.leave_type} ({self.start_date} to {self.end_date})"
@@ -59,4 +92,87 @@ class LeaveRequest(BaseModel):
     def days_count(self):
         """Calculate the number of days requested."""
         delta = self.end_date - self.start_date
-        return delta.days + 1  # Include both start and end dates
\ No newline at end of file
+        return delta.days + 1  # Include both start and end dates
+    
+    def balance_entry(self):
+        """
+        Return what this request books in the leave balance ledger, as
+        ``(user_id, leave_type_id, year, ledger column, days)``, or ``None``
+        if its status does not count. Requests count in the year they start.
+        """
+        field = BALANCE_FIELDS.get(self.status)
+        if field is None:
+            return None
+        return (self.user_id, self.leave_type_id, self.start_date.year, field, self.days_count)
+    
+    def _loaded_balance_entry(self):
+        # Model.from_db() only marks instances as loaded after __init__, so
+        # a missing primary key is what tells new requests apart.
+        if self.pk is None:
+            return None
+        if any(name not in self.__dict__ for name in BALANCE_SOURCE_FIELDS):
+            return DEFERRED
+        return self.balance_entry()
+    
+    def save(self, *args, **kwargs):
+        """Save the request and move its days between ledger rows as needed."""
+        from .balances import move_balance
+        
+        with transaction.atomic():
+            previous = self._saved_balance_entry
+            if previous is DEFERRED:
+                previous = LeaveRequest.objects.get(pk=self.pk).balance_entry()
+            super().save(*args, **kwargs)
+            current = self.balance_entry()
+            if previous != current:
+                move_balance(previous, current)
+            self._saved_balance_entry = current
+
+
+class LeaveBalance(models.Model):
+    """
+    Days booked per user, leave type and year.
+
+    Maintained by ``LeaveRequest.save`` (and ``leaves.balances`` for bulk
+    changes) so validation reads one row instead of summing requests.
+    ``pending_days`` holds requests awaiting review, ``used_days`` approved
+    ones.
+    """
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='leave_balances',
+        verbose_name=_('User')
+    )
+    leave_type = models.ForeignKey(
+        LeaveType,
+        on_delete=models.CASCADE,
+        related_name='balances',
+        verbose_name=_('Leave Type')
+    )
+    year = models.PositiveSmallIntegerField(_('Year'))
+    used_days = models.PositiveIntegerField(_('Used Days'), default=0)
+    pending_days = models.PositiveIntegerField(_('Pending Days'), default=0)
+    updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Leave Balance')
+        verbose_name_plural = _('Leave Balances')
+        ordering = ['-year', 'leave_type__name']
+        unique_together = ['user', 'leave_type', 'year']
+    
+    def __str__(self):
+        return f"{self.user} - {self.leave_type} {self.year}: {self.used_days} used, {self.pending_days} pending"
+    
+    @property
+    def booked_days(self):
+        """Days used or awaiting approval."""
+        return self.used_days + self.pending_days
+    
+    @property
+    def remaining_days(self):
+        """Days still available, or ``None`` for unlimited leave types."""
+        if not self.leave_type.max_days_per_year:
+            return None
+        return max(self.leave_type.max_days_per_year - self.booked_days, 0)
\ No newline at end of file
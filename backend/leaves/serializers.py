@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import LeaveRequest
+from .balances import lock_balance
+from .intervals import BLOCKING_STATUSES
+from .models import LeaveBalance, LeaveRequest
 from users.serializers import UserSerializer
 from masters.models import LeaveType
 
@@ -13,6 +15,21 @@ class LeaveTypeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'code', 'is_paid', 'max_days_per_year']
 
 
+class LeaveBalanceSerializer(serializers.ModelSerializer):
+    """Serializer for the LeaveBalance model."""
+
+    leave_type_details = LeaveTypeSerializer(source='leave_type', read_only=True)
+    remaining_days = serializers.IntegerField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = LeaveBalance
+        fields = [
+            'leave_type', 'leave_type_details', 'year', 'used_days',
+            'pending_days', 'remaining_days'
+        ]
+        read_only_fields = fields
+
+
 class LeaveRequestSerializer(serializers.ModelSerializer):
     """Serializer for the LeaveRequest model."""
 
@@ -59,49 +76,44 @@ class LeaveRequestSerializer(serializers.ModelSerializer):
                 {"start_date": "Start date cannot be in the past."}
             )
 
-        # Calculate days count
-        if start_date and end_date:
+        leave_type = attrs.get('leave_type') or getattr(self.instance, 'leave_type', None)
+        start_date = start_date or getattr(self.instance, 'start_date', None)
+        end_date = end_date or getattr(self.instance, 'end_date', None)
+        owner_id = self.instance.user_id if self.instance else attrs['user'].pk
+        leave_status = attrs.get('status', getattr(self.instance, 'status', 'pending'))
+
+        # Reject requests overlapping the user's other pending or approved leave
+        if start_date and end_date and leave_status in BLOCKING_STATUSES:
+            overlapping = LeaveRequest.objects.blocking().filter(user_id=owner_id).overlapping(start_date, end_date)
+            if self.instance:
+                overlapping = overlapping.exclude(pk=self.instance.pk)
+            if overlapping.exists():
+                raise serializers.ValidationError(
+                    {"start_date": "These dates overlap another pending or approved leave request."}
+                )
+
+        # Check the leave type's yearly allowance against the balance ledger
+        if leave_type and start_date and end_date and leave_type.max_days_per_year > 0:
             days_count = (end_date - start_date).days + 1
-
-            # Validate against leave type max_days_per_year if applicable
-            leave_type = attrs.get('leave_type')
-            if leave_type and leave_type.max_days_per_year > 0:
-                # Get all approved leave requests for this user and leave type in the current year
-                current_year = timezone.now().year
-                user = self.context['request'].user
-
-                # If we're updating an existing leave request, exclude it from the count
-                instance = self.instance
-                if instance:
-                    approved_leaves = LeaveRequest.objects.filter(
-                        user=user,
-                        leave_type=leave_type,
-                        status='approved',
-                        start_date__year=current_year
-                    ).exclude(id=instance.id)
-                else:
-                    approved_leaves = LeaveRequest.objects.filter(
-                        user=user,
-                        leave_type=leave_type,
-                        status='approved',
-                        start_date__year=current_year
-                    )
-
-                # Calculate days for each leave request
-                used_days = [
-                    (leave.end_date - leave.start_date).days + 1
-                    for leave in approved_leaves
-                ]
-
-                total_used_days = sum(used_days)
-
-                if total_used_days + days_count > leave_type.max_days_per_year:
-                    remaining_days = leave_type.max_days_per_year - total_used_days
-                    raise serializers.ValidationError(
-                        {
-                            "leave_type": f"You have only {remaining_days} days remaining for this leave type in the current year."
-                        }
-                    )
+            year = start_date.year
+
+            # Locked until the surrounding request transaction commits, so
+            # concurrent requests cannot both book the last days.
+            balance = lock_balance(owner_id, leave_type.pk, year)
+            booked_days = balance.booked_days
+
+            # If we're updating an existing leave request, don't count it twice
+            own_entry = self.instance.balance_entry() if self.instance else None
+            if own_entry and own_entry[:3] == (owner_id, leave_type.pk, year):
+                booked_days -= own_entry[4]
+
+            if booked_days + days_count > leave_type.max_days_per_year:
+                remaining_days = max(leave_type.max_days_per_year - booked_days, 0)
+                raise serializers.ValidationError(
+                    {
+                        "leave_type": f"You have only {remaining_days} days remaining for this leave type in {year}."
+                    }
+                )
 
         return attrs
 
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .balances import move_balance
+from .models import LeaveRequest
+
+
+@receiver(post_delete, sender=LeaveRequest)
+def release_deleted_leave(sender, instance, **kwargs):
+    """Give back the days a deleted leave request had booked."""
+    move_balance(instance.balance_entry(), None)
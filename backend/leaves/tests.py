@@ -1,3 +1,249 @@
-from django.test import TestCase
+from datetime import date
+from importlib import import_module
+from types import SimpleNamespace
+from unittest import skipUnless
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from masters.models import Holiday, LeaveType
+from .intervals import IntervalIndex
+from .models import LeaveBalance, LeaveRequest
+
+User = get_user_model()
+
+
+class LeaveBalanceTestCase(APITestCase):
+    """Test cases for the leave balance ledger."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(email='manager@test.com', role='manager')
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr', manager=self.manager)
+        self.leave_type = LeaveType.objects.create(name='Casual Leave', code='CL', max_days_per_year=5)
+        self.url = '/api/leaves/leave-requests/'
+        self.client.force_authenticate(user=self.mr)
+
+    def request_leave(self, start_day, end_day):
+        return self.client.post(self.url, {
+            'leave_type': self.leave_type.pk,
+            'start_date': date(2030, 3, start_day),
+            'end_date': date(2030, 3, end_day),
+            'reason': 'Family function',
+        })
+
+    def balance(self):
+        return LeaveBalance.objects.get(user=self.mr, leave_type=self.leave_type, year=2030)
+
+    def test_ledger_follows_transitions(self):
+        """Test that creating, approving, cancelling and deleting move the booked days."""
+        first = self.request_leave(1, 2).data['id']
+        second = self.request_leave(10, 10).data['id']
+        self.assertEqual((self.balance().used_days, self.balance().pending_days), (0, 3))
+
+        self.client.force_authenticate(user=self.manager)
+        self.client.post(f'{self.url}{first}/approve/')
+        self.assertEqual((self.balance().used_days, self.balance().pending_days), (2, 1))
+
+        self.client.force_authenticate(user=self.mr)
+        self.client.post(f'{self.url}{second}/cancel/')
+        self.assertEqual((self.balance().used_days, self.balance().pending_days), (2, 0))
+
+        LeaveRequest.objects.get(pk=first).delete()
+        self.assertEqual((self.balance().used_days, self.balance().pending_days), (0, 0))
+
+    def test_bulk_review_updates_ledger(self):
+        """Test that bulk approval moves days from pending to used."""
+        ids = [self.request_leave(1, 1).data['id'], self.request_leave(5, 6).data['id']]
+        self.client.force_authenticate(user=self.manager)
+        self.client.post(f'{self.url}bulk_review/', {'ids': ids, 'decision': 'approve'}, format='json')
+        self.assertEqual((self.balance().used_days, self.balance().pending_days), (3, 0))
+
+    def test_managers_cannot_review_their_own_requests(self):
+        """Test that a manager's own leave is not reviewable by them, in bulk or one by one."""
+        self.client.force_authenticate(user=self.manager)
+        own = self.request_leave(1, 1).data['id']
+        response = self.client.post(f'{self.url}bulk_review/', {'ids': [own], 'decision': 'approve'}, format='json')
+        self.assertEqual(response.data['results'], [{'id': own, 'result': 'not_found'}])
+        for decision in ('approve', 'reject'):
+            response = self.client.post(f'{self.url}{own}/{decision}/')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(LeaveRequest.objects.get(pk=own).status, 'pending')
+        self.assertEqual(self.client.get(f'{self.url}{own}/').status_code, status.HTTP_200_OK)
+
+    def test_allowance_counts_pending_requests(self):
+        """Test that pending requests count against the allowance."""
+        self.assertEqual(self.request_leave(1, 4).status_code, status.HTTP_201_CREATED)
+        response = self.request_leave(10, 11)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('only 1 days remaining', str(response.data['leave_type']))
+
+    def test_balances_endpoint(self):
+        """Test the balances served to the leave screen."""
+        LeaveType.objects.create(name='Sick Leave', code='SL')
+        self.request_leave(1, 2)
+
+        response = self.client.get(f'{self.url}balances/', {'year': 2030})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        casual, sick = response.data
+        self.assertEqual((casual['pending_days'], casual['remaining_days']), (2, 3))
+        self.assertEqual((sick['used_days'], sick['remaining_days']), (0, None))
+
+
+class IntervalIndexTestCase(SimpleTestCase):
+    """Test cases for the sorted-interval index."""
+
+    def test_overlap_and_covered_days(self):
+        """Test overlap lookups and merged day counts."""
+        index = IntervalIndex([
+            (date(2030, 3, 10), date(2030, 3, 12)),
+            (date(2030, 3, 1), date(2030, 3, 20)),
+            (date(2030, 3, 25), date(2030, 3, 26)),
+        ])
+        self.assertEqual(len(index.overlapping(date(2030, 3, 21), date(2030, 3, 24))), 0)
+        self.assertEqual(len(index.overlapping(date(2030, 3, 12), date(2030, 3, 25))), 3)
+        self.assertEqual(index.covered_days(date(2030, 3, 15), date(2030, 3, 31)), 8)
+
+
+class LeaveOverlapTestCase(APITestCase):
+    """Test cases for overlap rejection and team availability."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(email='manager@test.com', role='manager')
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr', manager=self.manager)
+        self.other_mr = User.objects.create_user(email='other@test.com', role='mr')
+        self.leave_type = LeaveType.objects.create(name='Casual Leave', code='CL')
+        self.url = '/api/leaves/leave-requests/'
+
+    def request_leave(self, user, start, end):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.url, {
+            'leave_type': self.leave_type.pk, 'start_date': start, 'end_date': end, 'reason': 'Travel',
+        })
+
+    def test_overlapping_requests_are_rejected(self):
+        """Test that a user cannot book overlapping leave, unless the first was cancelled."""
+        first = self.request_leave(self.mr, date(2030, 3, 4), date(2030, 3, 6)).data['id']
+        response = self.request_leave(self.mr, date(2030, 3, 6), date(2030, 3, 8))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('start_date', response.data)
+
+        self.assertEqual(
+            self.request_leave(self.other_mr, date(2030, 3, 6), date(2030, 3, 8)).status_code,
+            status.HTTP_201_CREATED
+        )
+        self.client.force_authenticate(user=self.mr)
+        self.client.post(f'{self.url}{first}/cancel/')
+        self.assertEqual(
+            self.request_leave(self.mr, date(2030, 3, 6), date(2030, 3, 8)).status_code,
+            status.HTTP_201_CREATED
+        )
+
+    def test_migration_cancels_overlapping_pending_requests(self):
+        """Test the pre-constraint data step: approved requests win, later pending ones are cancelled."""
+        migration = import_module('leaves.migrations.0003_leave_intervals')
+        postgres = SimpleNamespace(connection=SimpleNamespace(vendor='postgresql'))
+
+        def make(start, end, leave_status):
+            return LeaveRequest.objects.create(
+                user=self.mr, leave_type=self.leave_type, start_date=start, end_date=end,
+                reason='Travel', status=leave_status,
+            )
+
+        if connection.vendor == 'postgresql':
+            # Rows from before the constraint existed can clash; drop it for
+            # this test's transaction.
+            with connection.schema_editor() as editor:
+                editor.remove_constraint(LeaveRequest, LeaveRequest._meta.constraints[0])
+        pending = make(date(2030, 3, 4), date(2030, 3, 6), 'pending')
+        approved = make(date(2030, 3, 1), date(2030, 3, 3), 'approved')
+        # Rows from before the overlap check existed can clash.
+        LeaveRequest.objects.filter(pk=pending.pk).update(start_date=date(2030, 3, 2))
+
+        with self.assertLogs('leaves.migrations', 'WARNING') as logs:
+            migration.cancel_overlapping_requests(django_apps, postgres)
+        self.assertIn(f'Cancelled leave request {pending.pk} of user {self.mr.pk}', logs.output[0])
+        self.assertEqual(LeaveRequest.objects.get(pk=pending.pk).status, 'cancelled')
+        self.assertEqual(LeaveRequest.objects.get(pk=approved.pk).status, 'approved')
+
+        other = make(date(2030, 4, 1), date(2030, 4, 1), 'approved')
+        LeaveRequest.objects.filter(pk=other.pk).update(start_date=date(2030, 3, 3))
+        with self.assertRaisesMessage(RuntimeError, f'{approved.pk} and {other.pk}'):
+            migration.cancel_overlapping_requests(django_apps, postgres)
+
+    def test_team_availability_matrix(self):
+        """Test the user x day grid returned to managers."""
+        leave_id = self.request_leave(self.mr, date(2030, 3, 4), date(2030, 3, 5)).data['id']
+        self.request_leave(self.mr, date(2030, 3, 7), date(2030, 3, 7))
+        self.request_leave(self.other_mr, date(2030, 3, 4), date(2030, 3, 4))
+        LeaveRequest.objects.filter(pk=leave_id).update(status='approved')
+        Holiday.objects.create(name='Festival', date=date(2030, 3, 6))
+
+        self.client.force_authenticate(user=self.manager)
+        with self.assertNumQueries(3):
+            response = self.client.get(f'{self.url}team_availability/', {'month': '2030-03'})
+
+        self.assertEqual(response.data['month'], '2030-03')
+        self.assertEqual(len(response.data['days']), 31)
+        rows = {row['id']: row['days'] for row in response.data['users']}
+        self.assertEqual(set(rows), {self.manager.pk, self.mr.pk})
+        self.assertEqual(rows[self.mr.pk][2:7], ['weekend', 'leave', 'leave', 'holiday', 'pending'])
+        self.assertEqual(rows[self.manager.pk][3], 'available')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'The overlap constraint is PostgreSQL only.')
+class LeaveIntervalsMigrationTestCase(TransactionTestCase):
+    """Test migration 0003 on PostgreSQL with overlapping rows already stored."""
+
+    migrate_from = [('leaves', '0002_leave_balance')]
+    migrate_to = [('leaves', '0003_leave_intervals')]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.migrate_from)
+        self.addCleanup(self.migrate_to_latest)
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_overlapping_pending_requests_are_cancelled_before_the_constraint(self):
+        """Test that the migration cancels the clashing pending request and then adds the constraint."""
+        old_apps = self.executor.loader.project_state(self.migrate_from).apps
+        user = old_apps.get_model('users', 'User').objects.create(email='mr@test.com', role='mr')
+        leave_type = old_apps.get_model('masters', 'LeaveType').objects.create(
+            name='Casual Leave', code='CL', max_days_per_year=5
+        )
+        OldLeaveRequest = old_apps.get_model('leaves', 'LeaveRequest')
+        old_apps.get_model('leaves', 'LeaveBalance').objects.create(
+            user=user, leave_type=leave_type, year=2030, pending_days=4, used_days=3
+        )
+
+        def make(start_day, end_day, leave_status):
+            return OldLeaveRequest.objects.create(
+                user=user, leave_type=leave_type, start_date=date(2030, 3, start_day),
+                end_date=date(2030, 3, end_day), reason='Travel', status=leave_status,
+            ).pk
+
+        approved = make(1, 3, 'approved')
+        clashing = make(2, 4, 'pending')
+        separate = make(10, 10, 'pending')
+
+        with self.assertLogs('leaves.migrations', 'WARNING') as logs:
+            self.executor = MigrationExecutor(connection)
+            self.executor.migrate(self.migrate_to)
+        self.assertIn(f'Cancelled leave request {clashing}', logs.output[0])
+
+        new_apps = self.executor.loader.project_state(self.migrate_to).apps
+        LeaveRequest = new_apps.get_model('leaves', 'LeaveRequest')
+        self.assertEqual(
+            dict(LeaveRequest.objects.values_list('pk', 'status')),
+            {approved: 'approved', clashing: 'cancelled', separate: 'pending'}
+        )
+        self.assertEqual(new_apps.get_model('leaves', 'LeaveBalance').objects.get().pending_days, 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            make(3, 5, 'pending')
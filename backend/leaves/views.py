@@ -1,22 +1,32 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+import calendar
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 
-from .models import LeaveRequest
+from .models import LeaveBalance, LeaveRequest
+from .balances import move_balances
+from .intervals import OVERLAP_CONSTRAINT, availability_matrix
 from .serializers import (
     LeaveRequestSerializer, LeaveRequestCreateSerializer,
     LeaveRequestUpdateSerializer, LeaveRequestReviewSerializer,
-    LeaveTypeSerializer
+    LeaveTypeSerializer, LeaveBalanceSerializer
 )
 from .permissions import IsOwnerOrManager, IsOwner, IsManager
 from masters.models import LeaveType
-from notifications.utils import create_notification
+from masters.cache import ReferenceDataCacheMixin, get_holidays_between
+from core.mixins import BulkReviewMixin, RelatedFieldsMixin
+from notifications.utils import create_notifications_bulk, get_manager_recipients
 
 
-class LeaveTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class LeaveTypeViewSet(ReferenceDataCacheMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing LeaveType instances."""
     
     queryset = LeaveType.objects.filter(is_active=True)
@@ -28,7 +38,7 @@ class LeaveTypeViewSet(viewsets.ReadOnlyModelViewSet):
     ordering = ['name']
 
 
-class LeaveRequestViewSet(viewsets.ModelViewSet):
+class LeaveRequestViewSet(RelatedFieldsMixin, BulkReviewMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing LeaveRequest instances."""
     
     queryset = LeaveRequest.objects.all()
@@ -39,12 +49,18 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
     search_fields = ['reason', 'manager_comments']
     ordering_fields = ['start_date', 'end_date', 'requested_at', 'reviewed_at']
     ordering = ['-requested_at']
+    select_related_fields = ('user', 'leave_type')
+    review_decisions = {
+        'approve': ('approved', ('pending',), 'success'),
+        'reject': ('rejected', ('pending',), 'warning'),
+    }
+    bulk_review_permission_classes = [permissions.IsAuthenticated, IsManager]
     
     def get_queryset(self):
         """
         This view should return a list of all leave requests
-        for the currently authenticated user or all leave requests
-        if the user is a manager or admin.
+        for the currently authenticated user, their team's leave requests
+        if the user is a manager, or all leave requests if the user is an admin.
         """
         user = self.request.user
         
@@ -52,13 +68,91 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
         if user.is_staff:
             return LeaveRequest.objects.all()
         
-        # Managers can see all leave requests
+        # Managers can see their own and their team's leave requests
         if user.role == 'manager':
-            return LeaveRequest.objects.all()
+            return LeaveRequest.objects.filter(user__in=user.team_user_ids())
         
         # Regular users can only see their own leave requests
         return LeaveRequest.objects.filter(user=user)
     
+    def get_review_verb(self, obj, status):
+        """Describe a review of a leave request to its owner."""
+        return f"{status} your leave request from {obj.start_date} to {obj.end_date}"
+    
+    def after_bulk_review(self, reviewed, previous_status):
+        """Move the reviewed requests' days in the balance ledger."""
+        move_balances(reviewed, previous_status)
+    
+    @transaction.atomic
+    def create(self, request, *args, **kwargs):
+        """Create a leave request; validation locks the balance row until commit."""
+        return super().create(request, *args, **kwargs)
+    
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        """Update a leave request; validation locks the balance row until commit."""
+        return super().update(request, *args, **kwargs)
+    
+    def perform_update(self, serializer):
+        """Save an edited leave request."""
+        self.save_without_overlap(serializer)
+    
+    @action(detail=False, methods=['get'])
+    def team_availability(self, request):
+        """
+        Return a user x day availability grid for a month.
+
+        Pass ``month`` as ``YYYY-MM`` (defaults to the current month).
+        Managers see their team, admins everyone and other users themselves.
+        """
+        today = timezone.now().date()
+        try:
+            year, month = (int(part) for part in request.query_params.get('month', '').split('-'))
+            first_day = date(year, month, 1)
+        except ValueError:
+            first_day = today.replace(day=1)
+        last_day = first_day.replace(day=calendar.monthrange(first_day.year, first_day.month)[1])
+        
+        user = request.user
+        users = get_user_model().objects.filter(is_active=True)
+        if not user.is_staff:
+            users = users.filter(pk__in=user.team_user_ids()) if user.role == 'manager' else users.filter(pk=user.pk)
+        users = list(users.order_by('first_name', 'last_name', 'email'))
+        
+        leaves = (
+            LeaveRequest.objects.blocking()
+            .filter(user__in=[u.pk for u in users])
+            .overlapping(first_day, last_day)
+            .values_list('user_id', 'start_date', 'end_date', 'status', 'leave_type__code')
+        )
+        holidays = [day for day, _ in get_holidays_between(first_day, last_day)]
+        
+        data = availability_matrix(users, leaves, first_day, last_day, holidays)
+        data['month'] = first_day.strftime('%Y-%m')
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def balances(self, request):
+        """
+        Return the current user's balance for every active leave type.
+
+        Defaults to the current year; pass ``year`` for another one.
+        """
+        year = request.query_params.get('year', '')
+        year = int(year) if year.isdigit() else timezone.now().year
+        
+        booked = {
+            balance.leave_type_id: balance
+            for balance in LeaveBalance.objects.filter(user=request.user, year=year)
+        }
+        balances = []
+        for leave_type in LeaveType.objects.filter(is_active=True).order_by('name'):
+            balance = booked.get(leave_type.pk) or LeaveBalance(user=request.user, year=year)
+            balance.leave_type = leave_type
+            balances.append(balance)
+        
+        return Response(LeaveBalanceSerializer(balances, many=True).data)
+    
     def get_serializer_class(self):
         """Return appropriate serializer class based on the action."""
         if self.action == 'create':
@@ -69,23 +163,34 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
             return LeaveRequestReviewSerializer
         return LeaveRequestSerializer
     
+    def save_without_overlap(self, serializer, **kwargs):
+        """
+        Save the serializer, reporting a concurrent overlapping request
+        caught by the database constraint as a validation error.
+        """
+        try:
+            with transaction.atomic():
+                return serializer.save(**kwargs)
+        except IntegrityError as exc:
+            if OVERLAP_CONSTRAINT in str(exc):
+                raise ValidationError(
+                    {"start_date": "These dates overlap another pending or approved leave request."}
+                )
+            raise
+    
     def perform_create(self, serializer):
         """Set the user when creating a leave request and create notification."""
-        leave_request = serializer.save(user=self.request.user)
+        leave_request = self.save_without_overlap(serializer, user=self.request.user)
         
         # Create notification for manager
         user = self.request.user
-        managers = [u for u in user._meta.model.objects.filter(role='manager') if u.is_active]
-        
-        # If there are managers, notify them
-        for manager in managers:
-            create_notification(
-                recipient=manager,
-                actor=user,
-                verb=f"submitted a leave request from {leave_request.start_date} to {leave_request.end_date}",
-                target=leave_request,
-                level='info'
-            )
+        create_notifications_bulk(
+            get_manager_recipients(user),
+            actor=user,
+            verb=f"submitted a leave request from {leave_request.start_date} to {leave_request.end_date}",
+            target=leave_request,
+            level='info'
+        )
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsManager])
     def approve(self, request, pk=None):
@@ -105,19 +210,14 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
             'manager_comments': request.data.get('manager_comments', '')
         })
         serializer.is_valid(raise_exception=True)
-        leave_request = serializer.save(
-            reviewed_by=request.user,
-            reviewed_at=timezone.now()
-        )
-        
-        # Create notification for the leave request owner
-        create_notification(
-            recipient=leave_request.user,
-            actor=request.user,
-            verb=f"approved your leave request from {leave_request.start_date} to {leave_request.end_date}",
-            target=leave_request,
-            level='success'
-        )
+        with transaction.atomic():
+            leave_request = serializer.save(
+                reviewed_by=request.user,
+                reviewed_at=timezone.now()
+            )
+
+            # Queue a notification for the leave request owner
+            self.notify_owner(leave_request, 'success')
         
         return Response(serializer.data)
     
@@ -139,19 +239,14 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
             'manager_comments': request.data.get('manager_comments', '')
         })
         serializer.is_valid(raise_exception=True)
-        leave_request = serializer.save(
-            reviewed_by=request.user,
-            reviewed_at=timezone.now()
-        )
-        
-        # Create notification for the leave request owner
-        create_notification(
-            recipient=leave_request.user,
-            actor=request.user,
-            verb=f"rejected your leave request from {leave_request.start_date} to {leave_request.end_date}",
-            target=leave_request,
-            level='warning'
-        )
+        with transaction.atomic():
+            leave_request = serializer.save(
+                reviewed_by=request.user,
+                reviewed_at=timezone.now()
+            )
+
+            # Queue a notification for the leave request owner
+            self.notify_owner(leave_request, 'warning')
         
         return Response(serializer.data)
     
@@ -0,0 +1,202 @@
+"""
+Versioned in-process cache for reference master data.
+
+Doctor specialties, chemist categories, leave types, expense types and
+holidays change a few times a year but are read on almost every request.
+Each process keeps the built values in memory, tagged with a global version
+counter stored in the shared Django cache (see ``CACHES``). Saving or
+deleting any of those models bumps the counter (see ``masters.signals``).
+A process reads the shared counter at most once per
+``REFERENCE_DATA_CACHE_TTL`` and serves every read in between from memory,
+without touching the cache backend (a table by default), so other
+processes rebuild their copies within that window; the process that made
+the change does so at once. A new counter starts from the clock rather
+than 1, so versions (and the ETags made from them) never repeat after the
+cache is flushed.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = 'masters:reference-data:version'
+
+# Upper bound on entries per process; list URLs with search terms vary freely.
+MAX_ENTRIES = 256
+
+_entries = {}
+_lock = threading.Lock()
+# (version, monotonic time until which it is trusted) as last read here.
+_version = None
+
+
+def _local_ttl():
+    """Seconds a process may serve its copies before re-checking the shared version."""
+    return getattr(settings, 'REFERENCE_DATA_CACHE_TTL', 300)
+
+
+def _new_version():
+    # Nanoseconds since the epoch: later than any version handed out before.
+    return time.time_ns()
+
+
+def _remember(version):
+    global _version
+    _version = (version, time.monotonic() + _local_ttl())
+    return version
+
+
+def get_version():
+    """Return the reference-data version, reading the shared counter at most once per TTL."""
+    remembered = _version
+    if remembered and remembered[1] > time.monotonic():
+        return remembered[0]
+
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = _new_version()
+        if not cache.add(VERSION_KEY, version, timeout=None):
+            # Another process started the counter first.
+            version = cache.get(VERSION_KEY, version)
+    return _remember(version)
+
+
+def bump_version():
+    """Invalidate every cached reference-data entry in every process."""
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        # The key was evicted; start a new sequence that cannot collide
+        # with versions still held in process memory.
+        version = _new_version()
+        cache.set(VERSION_KEY, version, timeout=None)
+    return _remember(version)
+
+
+def get_cached(key, builder):
+    """
+    Return ``(version, value)`` for ``key``, calling ``builder`` on a miss.
+
+    Entries are only reused while the global version is unchanged and the
+    local TTL has not expired.
+    """
+    version = get_version()
+    now = time.monotonic()
+    entry = _entries.get(key)
+    if entry and entry[0] == version and entry[1] > now:
+        return version, entry[2]
+
+    value = builder()
+    with _lock:
+        if len(_entries) >= MAX_ENTRIES:
+            for stale_key in [k for k, e in _entries.items() if e[0] != version]:
+                del _entries[stale_key]
+            if len(_entries) >= MAX_ENTRIES:
+                _entries.clear()
+        _entries[key] = (version, now + _local_ttl(), value)
+    return version, value
+
+
+def clear_local():
+    """Drop this process's copies and remembered version (used by tests)."""
+    global _version
+    with _lock:
+        _entries.clear()
+        _version = None
+
+
+def get_expense_type_rules(expense_type_id):
+    """
+    Return the validation rules for an expense type.
+
+    The result is a dict with ``name``, ``max_amount`` and
+    ``requires_receipt``, or ``None`` if the type does not exist.
+    """
+    from .models import ExpenseType
+
+    def build():
+        return {
+            expense_type.pk: {
+                'name': expense_type.name,
+                'max_amount': expense_type.max_amount,
+                'requires_receipt': expense_type.requires_receipt,
+            }
+            for expense_type in ExpenseType.objects.all()
+        }
+
+    _, rules = get_cached('expense-type-rules', build)
+    if expense_type_id in rules:
+        return rules[expense_type_id]
+
+    # Not in this process's copy yet; read the row directly.
+    expense_type = ExpenseType.objects.filter(pk=expense_type_id).first()
+    if expense_type is None:
+        return None
+    return {
+        'name': expense_type.name,
+        'max_amount': expense_type.max_amount,
+        'requires_receipt': expense_type.requires_receipt,
+    }
+
+
+def get_active_holidays():
+    """Return all active holidays as ``(date, name)`` tuples ordered by date."""
+    from .models import Holiday
+
+    def build():
+        return list(
+            Holiday.objects.filter(is_active=True)
+            .order_by('date')
+            .values_list('date', 'name')
+        )
+
+    _, holidays = get_cached('active-holidays', build)
+    return holidays
+
+
+def get_holidays_between(start_date, end_date):
+    """Return active holidays falling between two dates (inclusive)."""
+    return [
+        (date, name) for date, name in get_active_holidays()
+        if start_date <= date <= end_date
+    ]
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an ``If-None-Match`` header matches ``etag`` by weak comparison."""
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    if etags == ['*']:
+        return True
+    return etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in etags}
+
+
+class ReferenceDataCacheMixin:
+    """
+    Serve ``list`` responses of a read-only viewset from the reference cache.
+
+    The response carries an ``ETag`` equal to the reference-data version, and
+    a matching ``If-None-Match`` header short-circuits to ``304``. Matching is
+    weak, so the ``W/`` tags of compressed responses (``CompressionMiddleware``)
+    revalidate too.
+    """
+
+    def list(self, request, *args, **kwargs):
+        etag = f'"{get_version()}"'
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+
+        key = f'{self.__class__.__name__}:list:{request.get_host()}{request.get_full_path()}'
+        version, data = get_cached(
+            key, lambda: super(ReferenceDataCacheMixin, self).list(request, *args, **kwargs).data
+        )
+        response = Response(data)
+        response['ETag'] = f'"{version}"'
+        return response
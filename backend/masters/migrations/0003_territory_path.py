@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:51
+
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    """Build the materialized path of every existing territory."""
+    Territory = apps.get_model('masters', 'Territory')
+    parents = dict(Territory.objects.values_list('id', 'parent_id'))
+    paths = {}
+
+    def build(pk, seen=()):
+        if pk in paths:
+            return paths[pk]
+        parent_id = parents[pk]
+        if parent_id is None or parent_id in seen:
+            prefix = '/'
+        else:
+            prefix = build(parent_id, seen + (pk,))
+        paths[pk] = f'{prefix}{pk}/'
+        return paths[pk]
+
+    for pk in parents:
+        path = build(pk)
+        Territory.objects.filter(pk=pk).update(path=path, depth=path.count('/') - 2)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0002_chemist_doctor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='territory',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='territory',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat, Substr
+from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 
@@ -14,11 +17,21 @@ class BaseModel(models.Model):
 
 
 class Territory(BaseModel):
-    """Territory model for geographical divisions."""
+    """
+    Territory model for geographical divisions.
+
+    Besides the ``parent`` adjacency link, each territory stores a
+    materialized ``path`` of its ancestors' ids (e.g. ``/1/4/9/``), so a
+    whole subtree can be selected with one indexed prefix match.
+    """
+    PATH_SEPARATOR = '/'
+
     name = models.CharField(max_length=100, unique=True)
     code = models.CharField(max_length=20, unique=True)
     description = models.TextField(blank=True, null=True)
     parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='children')
+    path = models.CharField(max_length=255, db_index=True, editable=False, default='')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name = _('Territory')
@@ -28,6 +41,63 @@ class Territory(BaseModel):
     def __str__(self):
         return f"{self.name} ({self.code})"
 
+    def clean(self):
+        """Reject parents that would create a cycle."""
+        super().clean()
+        if self.path and self.parent_id and self._parent_path().startswith(self.path):
+            raise ValidationError({'parent': _('A territory cannot be moved under itself or its descendants.')})
+
+    def _parent_path(self):
+        if not self.parent_id:
+            return self.PATH_SEPARATOR
+        return Territory.objects.filter(pk=self.parent_id).values_list('path', flat=True).get()
+
+    def save(self, *args, **kwargs):
+        """Save the territory and keep its path, and its subtree's, in sync."""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            parent_path = self._parent_path()
+            old_path, old_depth = self.path, self.depth
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError('A territory cannot be moved under itself or its descendants.')
+
+            new_path = f"{parent_path}{self.pk}{self.PATH_SEPARATOR}"
+            new_depth = new_path.count(self.PATH_SEPARATOR) - 2
+            if new_path == old_path:
+                return
+
+            Territory.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+            if old_path:
+                # Re-root the subtree in a single UPDATE.
+                Territory.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (new_depth - old_depth),
+                )
+            self.path, self.depth = new_path, new_depth
+
+    def ancestor_ids(self):
+        """Return ancestor ids from the root down, excluding this territory."""
+        return [int(pk) for pk in self.path.strip(self.PATH_SEPARATOR).split(self.PATH_SEPARATOR)[:-1]]
+
+    def ancestors(self, include_self=False):
+        """Return the territories above this one, root first."""
+        ids = self.ancestor_ids()
+        if include_self:
+            ids.append(self.pk)
+        return Territory.objects.filter(pk__in=ids).order_by('depth')
+
+    def descendants(self, include_self=False):
+        """Return every territory below this one."""
+        queryset = Territory.objects.filter(path__startswith=self.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+
+    def subtree_ids(self):
+        """Return the ids of this territory and everything below it."""
+        return list(self.descendants(include_self=True).values_list('id', flat=True))
+
 
 class Position(BaseModel):
     """Position model for job roles."""
@@ -114,6 +184,20 @@ class ExpenseType(BaseModel):
         return self.name
 
 
+class HolidayQuerySet(models.QuerySet):
+    """QuerySet helpers for territory-scoped holiday lookups."""
+
+    def for_territory(self, territory):
+        """Holidays that apply in a territory: national, or set on it or any ancestor."""
+        return self.filter(
+            Q(territories__isnull=True) | Q(territories__in=territory.ancestor_ids() + [territory.pk])
+        ).distinct()
+
+    def in_region(self, territory):
+        """Holidays set on a territory or anywhere in its subtree."""
+        return self.filter(territories__path__startswith=territory.path).distinct()
+
+
 class Holiday(BaseModel):
     """Holiday model."""
     name = models.CharField(max_length=100)
@@ -122,6 +206,8 @@ class Holiday(BaseModel):
     is_national = models.BooleanField(default=True, help_text=_('National or regional holiday'))
     territories = models.ManyToManyField(Territory, blank=True, related_name='holidays', help_text=_('Applicable territories (empty = all)'))
 
+    objects = HolidayQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Holiday')
         verbose_name_plural = _('Holidays')
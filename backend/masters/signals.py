@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .cache import bump_version
+from .models import DoctorSpecialty, ChemistCategory, LeaveType, ExpenseType, Holiday, Territory
+
+REFERENCE_MODELS = (DoctorSpecialty, ChemistCategory, LeaveType, ExpenseType, Holiday)
+
+
+def invalidate_reference_data(sender, **kwargs):
+    """
+    Bump the reference-data version now and again once the change commits,
+    so a reader that rebuilt from pre-commit data cannot keep it.
+    """
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+for model in REFERENCE_MODELS:
+    post_save.connect(invalidate_reference_data, sender=model, dispatch_uid=f'refdata-save-{model.__name__}')
+    post_delete.connect(invalidate_reference_data, sender=model, dispatch_uid=f'refdata-delete-{model.__name__}')
+
+
+@receiver(m2m_changed, sender=Holiday.territories.through)
+def invalidate_holiday_territories(sender, action, **kwargs):
+    """Holiday applicability changes when its territories change."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_reference_data(sender)
+
+
+@receiver(post_delete, sender=Territory)
+def reroot_orphaned_territories(sender, instance, **kwargs):
+    """Children of a deleted territory become roots (``parent`` is SET_NULL)."""
+    if not instance.path:
+        return
+    Territory.objects.filter(path__startswith=instance.path).update(
+        path=Concat(Value(Territory.PATH_SEPARATOR), Substr('path', len(instance.path) + 1)),
+        depth=F('depth') - (instance.depth + 1),
+    )
@@ -1,3 +1,144 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .cache import VERSION_KEY, clear_local, get_expense_type_rules, get_version
+from .models import DoctorSpecialty, ExpenseType, Holiday, Territory
+
+User = get_user_model()
+
+
+class ReferenceDataCacheTestCase(APITestCase):
+    """Test cases for the versioned reference-data cache."""
+
+    def setUp(self):
+        clear_local()
+        self.user = User.objects.create_user(email='mr@test.com', password='testpass123', role='mr')
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/masters/doctor-specialties/'
+        DoctorSpecialty.objects.create(name='Cardiology')
+
+    def test_list_is_served_from_cache_until_version_changes(self):
+        """Test that repeated list calls skip the database until a save."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], f'"{get_version()}"')
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        DoctorSpecialty.objects.create(name='Neurology')
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_matching_etag_returns_not_modified(self):
+        """Test that a current If-None-Match header returns 304."""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_compressed_list_revalidates_with_its_weak_etag(self):
+        """Test that the W/ ETag of a gzipped list, and *, still return 304."""
+        DoctorSpecialty.objects.bulk_create(
+            DoctorSpecialty(name=f'Interventional Cardiology, Clinic {i}', description='Outpatient ' * 10)
+            for i in range(20)
+        )
+        clear_local()
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], f'W/"{get_version()}"')
+
+        for if_none_match in (response['ETag'], f'"other", {response["ETag"]}', '*'):
+            revalidated = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=if_none_match)
+            self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED, if_none_match)
+        stale = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH='W/"1"')
+        self.assertEqual(stale.status_code, status.HTTP_200_OK)
+
+    def test_new_version_does_not_repeat_after_flush(self):
+        """Test that a restarted counter never reuses an earlier version."""
+        version = get_version()
+        cache.clear()
+        clear_local()
+        self.assertGreater(get_version(), version)
+        self.assertNotEqual(get_version(), 1)
+
+    def test_version_is_read_once_per_ttl(self):
+        """Test that the shared version is re-read only after the local TTL."""
+        version = get_version()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_version(), version)
+
+        cache.set(VERSION_KEY, version + 1, timeout=None)
+        self.assertEqual(get_version(), version)
+        with override_settings(REFERENCE_DATA_CACHE_TTL=0):
+            clear_local()
+            self.assertEqual(get_version(), version + 1)
+            cache.set(VERSION_KEY, version + 2, timeout=None)
+            self.assertEqual(get_version(), version + 2)
+
+    def test_expense_type_rules_follow_updates(self):
+        """Test that expense validation rules reflect saved changes."""
+        expense_type = ExpenseType.objects.create(name='Travel', code='TR', max_amount=Decimal('100.00'))
+        self.assertEqual(get_expense_type_rules(expense_type.pk)['max_amount'], Decimal('100.00'))
+
+        expense_type.max_amount = Decimal('250.00')
+        expense_type.save()
+        self.assertEqual(get_expense_type_rules(expense_type.pk)['max_amount'], Decimal('250.00'))
+
+
+class TerritoryHierarchyTestCase(TestCase):
+    """Test cases for the materialized territory path."""
+
+    def setUp(self):
+        self.region = Territory.objects.create(name='North Region', code='NR')
+        self.state = Territory.objects.create(name='Punjab', code='PB', parent=self.region)
+        self.city = Territory.objects.create(name='Amritsar', code='ASR', parent=self.state)
+        self.other = Territory.objects.create(name='South Region', code='SR')
+
+    def test_subtree_queries(self):
+        """Test descendants, ancestors and subtree ids."""
+        self.assertEqual(set(self.region.subtree_ids()), {self.region.pk, self.state.pk, self.city.pk})
+        self.assertEqual(list(self.city.ancestors()), [self.region, self.state])
+        self.assertEqual(self.city.depth, 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(set(self.region.descendants()), {self.state, self.city})
+
+    def test_reparent_moves_subtree(self):
+        """Test that moving a territory rewrites its whole subtree."""
+        self.state.parent = self.other
+        self.state.save()
+
+        self.city.refresh_from_db()
+        self.assertEqual(self.city.path, f'/{self.other.pk}/{self.state.pk}/{self.city.pk}/')
+        self.assertEqual(set(self.other.subtree_ids()), {self.other.pk, self.state.pk, self.city.pk})
+        self.assertEqual(self.region.subtree_ids(), [self.region.pk])
+
+    def test_cannot_move_under_descendant(self):
+        """Test that cycles are rejected."""
+        self.region.parent = self.city
+        with self.assertRaises(ValueError):
+            self.region.save()
+
+    def test_deleting_parent_reroots_children(self):
+        """Test that children become roots when their parent is deleted."""
+        self.region.delete()
+        self.city.refresh_from_db()
+        self.assertEqual(self.city.path, f'/{self.state.pk}/{self.city.pk}/')
+        self.assertEqual(self.city.depth, 1)
+
+    def test_holidays_for_territory(self):
+        """Test holiday applicability through ancestor territories."""
+        national = Holiday.objects.create(name='New Year', date=date(2030, 1, 1))
+        regional = Holiday.objects.create(name='Lohri', date=date(2030, 1, 13), is_national=False)
+        regional.territories.add(self.region)
+        elsewhere = Holiday.objects.create(name='Pongal', date=date(2030, 1, 14), is_national=False)
+        elsewhere.territories.add(self.other)
+
+        self.assertEqual(set(Holiday.objects.for_territory(self.city)), {national, regional})
+        self.assertEqual(set(Holiday.objects.in_region(self.region)), {regional})
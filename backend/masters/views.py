@@ -2,6 +2,8 @@ from rest_framework import viewsets, permissions, filters
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 
+from core.mixins import RelatedFieldsMixin
+
 from .models import Doctor, Chemist, DoctorSpecialty, ChemistCategory
 from .serializers import (
     DoctorSerializer, DoctorCreateSerializer,
@@ -9,9 +11,10 @@ from .serializers import (
     DoctorSpecialtySerializer, ChemistCategorySerializer
 )
 from .permissions import IsOwnerOrManager, IsOwner
+from .cache import ReferenceDataCacheMixin
 
 
-class DoctorSpecialtyViewSet(viewsets.ReadOnlyModelViewSet):
+class DoctorSpecialtyViewSet(ReferenceDataCacheMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing DoctorSpecialty instances."""
 
     queryset = DoctorSpecialty.objects.filter(is_active=True)
@@ -23,7 +26,7 @@ class DoctorSpecialtyViewSet(viewsets.ReadOnlyModelViewSet):
     ordering = ['name']
 
 
-class ChemistCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class ChemistCategoryViewSet(ReferenceDataCacheMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing ChemistCategory instances."""
 
     queryset = ChemistCategory.objects.filter(is_active=True)
@@ -35,7 +38,7 @@ class ChemistCategoryViewSet(viewsets.ReadOnlyModelViewSet):
     ordering = ['name']
 
 
-class DoctorViewSet(viewsets.ModelViewSet):
+class DoctorViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing Doctor instances."""
 
     queryset = Doctor.objects.all()
@@ -46,12 +49,13 @@ class DoctorViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'location', 'contact_number', 'email']
     ordering_fields = ['name', 'specialty__name', 'created_at']
     ordering = ['name']
+    select_related_fields = ('specialty', 'added_by')
 
     def get_queryset(self):
         """
         This view should return a list of all doctors
-        for the currently authenticated user or all doctors
-        if the user is a manager or admin.
+        for the currently authenticated user, their team's doctors
+        if the user is a manager, or all doctors if the user is an admin.
         """
         user = self.request.user
 
@@ -59,9 +63,9 @@ class DoctorViewSet(viewsets.ModelViewSet):
         if user.is_staff:
             return Doctor.objects.all()
 
-        # Managers can see all doctors
+        # Managers can see doctors added by themselves and their team
         if user.role == 'manager':
-            return Doctor.objects.all()
+            return Doctor.objects.filter(added_by__in=user.team_user_ids())
 
         # Regular users can only see their own doctors
         return Doctor.objects.filter(added_by=user)
@@ -77,7 +81,7 @@ class DoctorViewSet(viewsets.ModelViewSet):
         serializer.save(added_by=self.request.user)
 
 
-class ChemistViewSet(viewsets.ModelViewSet):
+class ChemistViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing Chemist instances."""
 
     queryset = Chemist.objects.all()
@@ -88,12 +92,13 @@ class ChemistViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'location', 'contact_number', 'email']
     ordering_fields = ['name', 'category__name', 'created_at']
     ordering = ['name']
+    select_related_fields = ('category', 'added_by')
 
     def get_queryset(self):
         """
         This view should return a list of all chemists
-        for the currently authenticated user or all chemists
-        if the user is a manager or admin.
+        for the currently authenticated user, their team's chemists
+        if the user is a manager, or all chemists if the user is an admin.
         """
         user = self.request.user
 
@@ -101,9 +106,9 @@ class ChemistViewSet(viewsets.ModelViewSet):
         if user.is_staff:
             return Chemist.objects.all()
 
-        # Managers can see all chemists
+        # Managers can see chemists added by themselves and their team
         if user.role == 'manager':
-            return Chemist.objects.all()
+            return Chemist.objects.filter(added_by__in=user.team_user_ids())
 
         # Regular users can only see their own chemists
         return Chemist.objects.filter(added_by=user)
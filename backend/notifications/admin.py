@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, NotificationArchive
 
 
 @admin.register(Notification)
@@ -16,3 +16,18 @@ class NotificationAdmin(admin.ModelAdmin):
         """Optimize query by prefetching related objects."""
         qs = super().get_queryset(request)
         return qs.select_related('recipient')
+
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    """Admin configuration for the NotificationArchive model."""
+
+    list_display = ('recipient', 'verb', 'timestamp', 'unread', 'level', 'archived_at')
+    list_filter = ('unread', 'level')
+    search_fields = ('verb', 'recipient__email')
+    date_hierarchy = 'timestamp'
+
+    def get_queryset(self, request):
+        """Optimize query by prefetching related objects."""
+        qs = super().get_queryset(request)
+        return qs.select_related('recipient')
@@ -0,0 +1,187 @@
+"""
+Publish/subscribe for live notification events.
+
+Stream connections (see ``views.notification_stream``) subscribe to a broker
+for their user; code that creates or reads notifications publishes small
+messages of the form ``{'user': id, 'event': name, 'data': {...}}`` once its
+transaction commits.
+
+Two brokers are available:
+
+* ``InProcessBroker`` delivers to subscribers in the same process only. It
+  is enough for a single ASGI worker and for development.
+* ``PostgresBroker`` sends every message through ``pg_notify`` and keeps one
+  ``LISTEN`` connection per process, so a notification created by any web
+  worker or management command reaches streams held by any other.
+
+``NOTIFICATION_BROKER`` selects one (``'auto'``, ``'postgres'`` or
+``'memory'``); ``'auto'`` uses Postgres when the default database is Postgres.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'notification_events'
+
+# Messages buffered per stream before the client is told to resync instead.
+QUEUE_SIZE = 100
+
+# pg_notify payloads must stay under 8000 bytes.
+MESSAGES_PER_NOTIFY = 40
+
+
+class Subscription:
+    """A stream's queue, bound to the event loop that reads it."""
+
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def offer(self, message):
+        """Queue a message; called on the subscriber's event loop."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client fell behind; drop the backlog and let it refetch.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'user': self.user_id, 'event': 'resync', 'data': {}})
+
+
+class InProcessBroker:
+    """Deliver messages to subscribers in this process."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def deliver(self, messages):
+        """Hand messages to local subscribers; safe to call from any thread."""
+        with self._lock:
+            targets = [
+                (subscription, message)
+                for message in messages
+                for subscription in self._subscribers.get(message['user'], ())
+            ]
+        for subscription, message in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # The subscriber's loop has closed; it unsubscribes on exit.
+                pass
+
+    def publish(self, messages):
+        self.deliver(messages)
+
+
+class PostgresBroker(InProcessBroker):
+    """Fan messages out to every process through Postgres LISTEN/NOTIFY."""
+
+    def __init__(self, using='default'):
+        super().__init__()
+        self.using = using
+        self._listener = None
+
+    def subscribe(self, user_id):
+        self._ensure_listener()
+        return super().subscribe(user_id)
+
+    def publish(self, messages):
+        # Local subscribers hear about it through our own LISTEN connection.
+        with connections[self.using].cursor() as cursor:
+            for start in range(0, len(messages), MESSAGES_PER_NOTIFY):
+                payload = json.dumps(messages[start:start + MESSAGES_PER_NOTIFY], separators=(',', ':'))
+                cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name='notification-listener', daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        wrapper = connections[self.using]
+        while True:
+            try:
+                conn = wrapper.get_new_connection(wrapper.get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.deliver(json.loads(notify.payload))
+            except Exception:
+                logger.exception('Notification listener lost its connection; reconnecting')
+                time.sleep(5)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return this process's broker, creating it on first use."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'NOTIFICATION_BROKER', 'auto')
+                if backend == 'auto':
+                    backend = 'postgres' if connection.vendor == 'postgresql' else 'memory'
+                _broker = PostgresBroker() if backend == 'postgres' else InProcessBroker()
+    return _broker
+
+
+def publish_on_commit(build_messages):
+    """
+    Publish the messages returned by ``build_messages`` after the current
+    transaction commits.
+
+    The builder runs after commit so it can read committed values, such as
+    the recipients' unread counters.
+    """
+    def publish():
+        messages = build_messages()
+        if not messages:
+            return
+        try:
+            get_broker().publish(messages)
+        except Exception:
+            # Live updates are best effort; clients resync on reconnect.
+            logger.exception('Failed to publish notification events')
+
+    transaction.on_commit(publish)
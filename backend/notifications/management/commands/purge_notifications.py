@@ -0,0 +1,76 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notifications.utils import expired_notifications, purge_notifications_batches
+
+
+class Command(BaseCommand):
+    help = 'Delete or archive notifications past their retention period in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--read-days',
+            type=int,
+            default=getattr(settings, 'NOTIFICATION_RETENTION_READ_DAYS', 90),
+            help='Remove read notifications older than this many days',
+        )
+        parser.add_argument(
+            '--unread-days',
+            type=int,
+            default=getattr(settings, 'NOTIFICATION_RETENTION_UNREAD_DAYS', 365),
+            help='Remove unread notifications older than this many days (0 keeps them)',
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            help='Copy notifications into the archive table before deleting them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows handled per transaction',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Seconds to pause between batches to limit load',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many notifications would be removed',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        queryset = expired_notifications(
+            read_before=now - timedelta(days=options['read_days']),
+            unread_before=now - timedelta(days=options['unread_days']) if options['unread_days'] else None,
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{queryset.count()} notifications are past retention')
+            return
+
+        action = 'Archived' if options['archive'] else 'Deleted'
+        total = 0
+        started = time.monotonic()
+        for count in purge_notifications_batches(
+            queryset, archive=options['archive'], batch_size=options['batch_size']
+        ):
+            total += count
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'{action} {total} notifications ({total / max(elapsed, 1e-6):.0f} rows/s)')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {total} notifications in {elapsed:.1f}s ({total / max(elapsed, 1e-6):.0f} rows/s)'
+        ))
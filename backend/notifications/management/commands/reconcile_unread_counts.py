@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from notifications.utils import reconcile_unread_counts
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-user unread notification counters from the notification table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Only reconcile the counter of this user (email)',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if not user:
+                self.stdout.write(self.style.ERROR(f'User not found: {options["user"]}'))
+                return
+            user_ids = {user.pk}
+
+        corrected = reconcile_unread_counts(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Reconciled unread counters ({corrected} corrected)'))
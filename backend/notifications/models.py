@@ -80,3 +80,72 @@ class Notification(models.Model):
         if self.target:
             return "{actor} {verb} {target} at {timestamp}".format(**ctx)
         return "{actor} {verb} at {timestamp}".format(**ctx)
+
+
+class NotificationCounter(models.Model):
+    """
+    Denormalized per-user unread notification count.
+
+    Kept current by ``notifications.utils`` whenever notifications are
+    created or marked as read, and periodically corrected by the
+    ``reconcile_unread_counts`` management command.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter',
+        verbose_name=_('User')
+    )
+    unread_count = models.PositiveIntegerField(_('Unread Count'), default=0)
+    updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Notification Counter')
+        verbose_name_plural = _('Notification Counters')
+
+    def __str__(self):
+        return f"{self.user}: {self.unread_count} unread"
+
+
+class NotificationArchive(models.Model):
+    """
+    Notifications moved out of the live table by the retention job.
+
+    Rows keep the original notification id as their primary key, so
+    archiving the same batch twice is harmless.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_notifications',
+        verbose_name=_('Recipient')
+    )
+    actor_content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, related_name='+', null=True, blank=True
+    )
+    actor_object_id = models.PositiveIntegerField(null=True, blank=True)
+    verb = models.CharField(_('Verb'), max_length=100)
+    target_content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, related_name='+', null=True, blank=True
+    )
+    target_object_id = models.PositiveIntegerField(null=True, blank=True)
+    action_object_content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, related_name='+', null=True, blank=True
+    )
+    action_object_object_id = models.PositiveIntegerField(null=True, blank=True)
+    timestamp = models.DateTimeField(_('Timestamp'))
+    unread = models.BooleanField(_('Unread'), default=False)
+    level = models.CharField(_('Level'), max_length=10, choices=Notification.LEVEL_CHOICES, default='info')
+    archived_at = models.DateTimeField(_('Archived At'), auto_now_add=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+        verbose_name = _('Archived Notification')
+        verbose_name_plural = _('Archived Notifications')
+
+    def __str__(self):
+        return f"{self.recipient}: {self.verb} at {self.timestamp}"
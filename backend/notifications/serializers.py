@@ -1,7 +1,16 @@
 from rest_framework import serializers
-from django.contrib.contenttypes.models import ContentType
+from django.db import models
 from users.serializers import UserSerializer
 from .models import Notification
+from .utils import prefetch_generic_objects
+
+
+class NotificationListSerializer(serializers.ListSerializer):
+    """Batch-load generic relations before serializing a page of notifications."""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        return super().to_representation(prefetch_generic_objects(iterable))
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -24,20 +33,21 @@ class NotificationSerializer(serializers.ModelSerializer):
             'verb', 'target_details', 'action_object_details',
             'timestamp', 'level'
         ]
+        list_serializer_class = NotificationListSerializer
     
     def get_actor_details(self, obj):
         """Get details about the actor."""
         if not obj.actor:
             return None
         
-        if obj.actor_content_type.model == 'user':
+        if obj.actor._meta.model_name == 'user':
             # If actor is a user, return user details
             return UserSerializer(obj.actor).data
         
         # For other actor types, return basic info
         return {
             'id': obj.actor.pk,
-            'type': obj.actor_content_type.model,
+            'type': obj.actor._meta.model_name,
             'str': str(obj.actor)
         }
     
@@ -49,7 +59,7 @@ class NotificationSerializer(serializers.ModelSerializer):
         # Return basic info about the target
         return {
             'id': obj.target.pk,
-            'type': obj.target_content_type.model,
+            'type': obj.target._meta.model_name,
             'str': str(obj.target)
         }
     
@@ -61,6 +71,6 @@ class NotificationSerializer(serializers.ModelSerializer):
         # Return basic info about the action object
         return {
             'id': obj.action_object.pk,
-            'type': obj.action_object_content_type.model,
+            'type': obj.action_object._meta.model_name,
             'str': str(obj.action_object)
         }
\ No newline at end of file
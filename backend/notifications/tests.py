@@ -1,3 +1,253 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from expenses.models import ExpenseClaim
+from leaves.models import LeaveRequest
+from masters.models import ExpenseType, LeaveType
+from .models import Notification, NotificationArchive, NotificationCounter
+from .utils import (
+    create_notification, create_notifications_bulk, get_manager_recipients,
+    get_unread_count, mark_notifications_read, reconcile_unread_counts
+)
+from .views import STREAM_TICKET_SALT
+
+User = get_user_model()
+
+
+class BulkNotificationTestCase(TestCase):
+    """Test cases for notification fan-out."""
+
+    def setUp(self):
+        self.managers = [
+            User.objects.create_user(email=f'manager{i}@test.com', role='manager')
+            for i in range(5)
+        ]
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr')
+
+    def test_fan_out_is_a_single_insert(self):
+        """Test that fan-out costs the same queries and one INSERT regardless of size."""
+        managers = User.objects.filter(role='manager')
+        create_notifications_bulk(managers, actor=self.mr, verb='warm up', target=self.mr)
+
+        with CaptureQueriesContext(connection) as one:
+            create_notifications_bulk(managers[:1], actor=self.mr, verb='submitted', target=self.mr)
+        with CaptureQueriesContext(connection) as many:
+            created = create_notifications_bulk(managers, actor=self.mr, verb='submitted', target=self.mr)
+
+        self.assertEqual(len(one), len(many))
+        inserts = [q for q in many.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(len(created), 5)
+        self.assertEqual(Notification.objects.filter(verb='submitted').count(), 6)
+
+    def test_actor_is_not_notified(self):
+        """Test that the actor is skipped unless forced."""
+        self.assertEqual(create_notifications_bulk([self.mr], actor=self.mr, verb='self'), [])
+        self.assertEqual(len(create_notifications_bulk([self.mr], actor=self.mr, verb='self', force=True)), 1)
+
+    def test_manager_recipients_follow_reporting_line(self):
+        """Test that submissions notify the user's managers, or admins when there are none."""
+        admin = User.objects.create_user(email='admin@test.com', role='admin', is_staff=True)
+        self.assertEqual(list(get_manager_recipients(self.mr)), [admin])
+
+        self.mr.manager = self.managers[0]
+        self.mr.save()
+        self.assertEqual(list(get_manager_recipients(self.mr)), [self.managers[0]])
+
+        self.managers[0].is_active = False
+        self.managers[0].save()
+        self.assertEqual(list(get_manager_recipients(self.mr)), [admin])
+
+
+class NotificationListQueryTestCase(APITestCase):
+    """Test cases for generic relation prefetching on the notification list."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(email='manager@test.com', role='manager')
+        self.client.force_authenticate(user=self.manager)
+        self.expense_type = ExpenseType.objects.create(name='Travel', code='TR')
+        self.leave_type = LeaveType.objects.create(name='Sick Leave', code='SL')
+
+    def create_notifications(self, count):
+        for i in range(count):
+            mr = User.objects.create_user(email=f'mr{i}-{count}@test.com', role='mr')
+            claim = ExpenseClaim.objects.create(
+                user=mr, expense_type=self.expense_type, amount=Decimal('10.00'),
+                date=date(2030, 1, 1), description='Taxi'
+            )
+            leave = LeaveRequest.objects.create(
+                user=mr, leave_type=self.leave_type, start_date=date(2030, 1, 1),
+                end_date=date(2030, 1, 2), reason='Flu'
+            )
+            create_notification(self.manager, actor=mr, verb='submitted', target=claim)
+            create_notification(self.manager, actor=mr, verb='submitted', target=leave)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/notifications/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_page(self):
+        """Test that a page costs the same number of queries at any size."""
+        self.create_notifications(1)
+        small_page = self.count_list_queries()
+
+        self.create_notifications(4)
+        full_page = self.count_list_queries()
+
+        self.assertEqual(small_page, full_page)
+        data = self.client.get('/api/notifications/').data['results'][0]
+        self.assertEqual(data['target_details']['type'], 'leaverequest')
+        self.assertEqual(data['actor_details']['email'], 'mr3-4@test.com')
+
+
+class UnreadCounterTestCase(APITestCase):
+    """Test cases for the denormalized unread counter."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='mr@test.com', role='mr')
+        self.actor = User.objects.create_user(email='manager@test.com', role='manager')
+        self.client.force_authenticate(user=self.user)
+        create_notifications_bulk([self.user], actor=self.actor, verb='approved')
+        create_notifications_bulk([self.user], actor=self.actor, verb='rejected')
+
+    def test_counter_follows_create_and_read(self):
+        """Test that the counter tracks creates, single reads and read-all."""
+        with self.assertNumQueries(1):
+            self.assertEqual(get_unread_count(self.user), 2)
+
+        notification = Notification.objects.filter(recipient=self.user).first()
+        self.client.post(f'/api/notifications/{notification.pk}/mark_as_read/')
+        self.client.post(f'/api/notifications/{notification.pk}/mark_as_read/')
+        self.assertEqual(self.client.get('/api/notifications/unread_count/').data['unread_count'], 1)
+
+        self.client.post('/api/notifications/mark_all_as_read/')
+        self.assertEqual(self.client.get('/api/notifications/unread_count/').data['unread_count'], 0)
+
+    def test_repeated_read_all_subtracts_once(self):
+        """Test that marking the same notifications read twice changes the counter once."""
+        unread = Notification.objects.filter(recipient=self.user)
+        self.assertEqual(mark_notifications_read(unread), 2)
+        create_notifications_bulk([self.user], actor=self.actor, verb='submitted')
+        self.assertEqual(mark_notifications_read(unread.exclude(verb='submitted')), 0)
+        self.assertEqual(get_unread_count(self.user), 1)
+
+    def test_reconcile_fixes_drift(self):
+        """Test that reconciliation rewrites a drifted counter."""
+        NotificationCounter.objects.filter(user=self.user).update(unread_count=7)
+        self.assertEqual(reconcile_unread_counts(), 1)
+        self.assertEqual(get_unread_count(self.user), 2)
+
+
+@override_settings(NOTIFICATION_BROKER='memory', NOTIFICATION_STREAM_MAX_AGE=2, NOTIFICATION_STREAM_KEEPALIVE=1)
+class NotificationStreamTestCase(TestCase):
+    """Test cases for the Server-Sent Events notification stream."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='mr@test.com', role='mr')
+        self.actor = User.objects.create_user(email='manager@test.com', role='manager')
+        self.url = '/api/notifications/stream/'
+
+    def notify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_notification(self.user, actor=self.actor, verb='approved')
+
+    def ticket(self):
+        return signing.dumps(self.user.pk, salt=STREAM_TICKET_SALT)
+
+    async def test_stream_pushes_new_notifications(self):
+        """Test that the stream sends the current count, then new notifications."""
+        ticket = await sync_to_async(self.ticket)()
+        response = await self.async_client.get(self.url, {'ticket': ticket})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        self.assertIn(b'"unread_count":0', await anext(stream))
+
+        notification = await sync_to_async(self.notify)()
+        event = await anext(stream)
+        self.assertIn(f'id: {notification.pk}'.encode(), event)
+        self.assertIn(b'"unread_count":1', event)
+        await stream.aclose()
+
+    async def test_stream_requires_ticket(self):
+        """Test that the stream rejects missing, invalid and access-token credentials."""
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get(self.url, {'ticket': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.user)))()
+        response = await self.async_client.get(self.url, {'token': token})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_ticket_is_issued_under_asgi(self):
+        """Test that an authenticated ASGI client gets a usable ticket."""
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.user)))()
+        response = await self.async_client.post(
+            '/api/notifications/stream-ticket/', headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user_id = signing.loads(response.json()['ticket'], salt=STREAM_TICKET_SALT)
+        self.assertEqual(user_id, self.user.pk)
+
+    def test_wsgi_refuses_to_stream(self):
+        """Test that WSGI requests get 501 so clients keep polling."""
+        response = self.client.get(self.url, {'ticket': self.ticket()})
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+        token = str(AccessToken.for_user(self.user))
+        response = self.client.post(
+            '/api/notifications/stream-ticket/', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+
+class NotificationRetentionTestCase(TestCase):
+    """Test cases for the purge_notifications command."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='mr@test.com', role='mr')
+        self.actor = User.objects.create_user(email='manager@test.com', role='manager')
+        for verb in ('old read', 'old unread', 'ancient unread', 'recent read'):
+            create_notification(self.user, actor=self.actor, verb=verb)
+
+        now = timezone.now()
+        Notification.objects.filter(verb='old read').update(unread=False, timestamp=now - timedelta(days=100))
+        Notification.objects.filter(verb='old unread').update(timestamp=now - timedelta(days=100))
+        Notification.objects.filter(verb='ancient unread').update(timestamp=now - timedelta(days=400))
+        Notification.objects.filter(verb='recent read').update(unread=False)
+        reconcile_unread_counts()
+
+    def test_purge_respects_retention_and_counters(self):
+        """Test that only expired rows go and unread counters follow."""
+        out = StringIO()
+        call_command('purge_notifications', '--batch-size', '1', stdout=out)
+
+        self.assertEqual(
+            set(Notification.objects.values_list('verb', flat=True)), {'old unread', 'recent read'}
+        )
+        self.assertEqual(get_unread_count(self.user), 1)
+        self.assertIn('rows/s', out.getvalue())
+        self.assertFalse(NotificationArchive.objects.exists())
+
+    def test_archive_keeps_copies(self):
+        """Test that --archive moves expired rows into the archive table."""
+        call_command('purge_notifications', '--archive', stdout=StringIO())
+        self.assertEqual(
+            set(NotificationArchive.objects.values_list('verb', flat=True)), {'old read', 'ancient unread'}
+        )
@@ -1,11 +1,111 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from .models import Notification
+from django.db import transaction
+from django.db.models import Count, F, Q, QuerySet, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from outbox.utils import enqueue
+from .events import publish_on_commit
+from .models import Notification, NotificationArchive, NotificationCounter
+
+GENERIC_FIELDS = ('actor', 'target', 'action_object')
+
+# Users reconciled per transaction by reconcile_unread_counts().
+RECONCILE_BATCH_SIZE = 500
+
+# Columns copied into NotificationArchive by the retention job.
+ARCHIVE_FIELDS = (
+    'id', 'recipient_id', 'actor_content_type_id', 'actor_object_id', 'verb',
+    'target_content_type_id', 'target_object_id', 'action_object_content_type_id',
+    'action_object_object_id', 'timestamp', 'unread', 'level',
+)
+
+# Relations followed by str() of common notification targets, joined in when
+# those targets are prefetched.
+GENERIC_SELECT_RELATED = {
+    'expenses.expenseclaim': ('user', 'expense_type'),
+    'leaves.leaverequest': ('user', 'leave_type'),
+    'tours.tourprogram': ('user',),
+    'reports.dailycallreport': ('user',),
+}
+
+
+def _generic_fields(actor=None, target=None, action_object=None):
+    """Resolve the generic relation columns for a notification once."""
+    fields = {}
+    if actor:
+        fields['actor_content_type'] = ContentType.objects.get_for_model(actor)
+        fields['actor_object_id'] = actor.pk
+    if target:
+        fields['target_content_type'] = ContentType.objects.get_for_model(target)
+        fields['target_object_id'] = target.pk
+    if action_object:
+        fields['action_object_content_type'] = ContentType.objects.get_for_model(action_object)
+        fields['action_object_object_id'] = action_object.pk
+    return fields
+
+
+def get_manager_recipients(user):
+    """
+    Return the active users who should hear about a user's submission.
+
+    That is the managers above the user in the reporting line, who are the
+    ones able to open it. Users without an active manager fall back to the
+    active admins, who see every team's records.
+    """
+    if user.manager_id:
+        approvers = user.get_approvers()
+        if approvers.exists():
+            return approvers
+    return get_user_model().objects.filter(is_staff=True, is_active=True)
+
+
+def create_notifications_bulk(recipients, actor, verb, target=None, action_object=None, level='info', force=False):
+    """
+    Create the same notification for many users with a single INSERT.
+
+    Args:
+        recipients: QuerySet or iterable of users who will receive it
+        actor: User or object that performed the action
+        verb: Description of the action (e.g., 'approved', 'submitted')
+        target: Object that was acted upon (e.g., LeaveRequest, ExpenseClaim)
+        action_object: Additional related object (e.g., a comment)
+        level: Notification level ('info', 'success', 'warning', 'error')
+        force: Force creation even for a recipient who is the actor
+
+    Returns:
+        The list of created Notification objects
+    """
+    if isinstance(recipients, QuerySet):
+        recipient_ids = list(recipients.values_list('pk', flat=True))
+    else:
+        recipient_ids = [recipient.pk for recipient in recipients]
+
+    # Avoid notifying users about their own actions unless forced
+    actor_pk = getattr(actor, 'pk', None)
+    if not force and actor_pk is not None and isinstance(actor, get_user_model()):
+        recipient_ids = [pk for pk in recipient_ids if pk != actor_pk]
+
+    if not recipient_ids:
+        return []
+
+    fields = _generic_fields(actor, target, action_object)
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create([
+            Notification(recipient_id=recipient_id, verb=verb, level=level, **fields)
+            for recipient_id in recipient_ids
+        ])
+        adjust_unread_counts(recipient_ids, 1)
+        publish_on_commit(lambda: _created_events(notifications))
+    return notifications
 
 
 def create_notification(recipient, actor, verb, target=None, action_object=None, level='info', force=False):
     """
     Create a notification for a user.
-    
+
     Args:
         recipient: User who will receive the notification
         actor: User or object that performed the action
@@ -14,38 +114,306 @@ def create_notification(recipient, actor, verb, target=None, action_object=None,
         action_object: Additional related object (e.g., a comment)
         level: Notification level ('info', 'success', 'warning', 'error')
         force: Force creation even if actor == recipient
-    
+
     Returns:
         The created Notification object
     """
-    # Avoid notifying users about their own actions unless necessary or forced
-    if not force and hasattr(actor, 'pk') and hasattr(recipient, 'pk') and actor.pk == recipient.pk:
+    notifications = create_notifications_bulk(
+        [recipient], actor, verb,
+        target=target, action_object=action_object, level=level, force=force
+    )
+    return notifications[0] if notifications else None
+
+
+def _object_ref(obj):
+    if obj is None:
         return None
-    
-    # Create notification
-    notification = Notification(
-        recipient=recipient,
-        verb=verb,
-        level=level
+    return [ContentType.objects.get_for_model(obj).pk, obj.pk]
+
+
+def _resolve_ref(ref):
+    if ref is None:
+        return None
+    model = ContentType.objects.get_for_id(ref[0]).model_class()
+    return model._base_manager.filter(pk=ref[1]).first() if model else None
+
+
+def enqueue_notification(recipient, actor, verb, target=None, level='info', key=None):
+    """
+    Queue a notification through the outbox instead of creating it inline.
+
+    Call it inside the transaction that makes the change being announced;
+    the ``drain_outbox`` worker creates the notification after commit.
+    ``key`` makes the enqueue idempotent.
+
+    Args:
+        recipient: User or QuerySet/iterable of users who will receive it
+        actor: User or object that performed the action
+        verb: Description of the action (e.g., 'approved', 'submitted')
+        target: Object that was acted upon (e.g., LeaveRequest, ExpenseClaim)
+        level: Notification level ('info', 'success', 'warning', 'error')
+        key: Idempotency key; defaults to a random one
+    """
+    enqueue(*notification_message(recipient, actor, verb, target=target, level=level, key=key))
+
+
+def notification_message(recipient, actor, verb, target=None, level='info', key=None):
+    """Build the ``(topic, payload, key)`` outbox message for a notification."""
+    if isinstance(recipient, get_user_model()):
+        recipient_ids = [recipient.pk]
+    elif isinstance(recipient, QuerySet):
+        recipient_ids = list(recipient.values_list('pk', flat=True))
+    else:
+        recipient_ids = [user.pk for user in recipient]
+
+    return 'notifications.create', {
+        'recipient_ids': recipient_ids,
+        'actor': _object_ref(actor),
+        'verb': verb,
+        'target': _object_ref(target),
+        'level': level,
+    }, key
+
+
+def handle_outbox_notification(payload, key):
+    """Outbox handler for ``notifications.create`` messages."""
+    create_notifications_bulk(
+        get_user_model().objects.filter(pk__in=payload['recipient_ids'], is_active=True),
+        actor=_resolve_ref(payload['actor']),
+        verb=payload['verb'],
+        target=_resolve_ref(payload['target']),
+        level=payload['level'],
     )
-    
-    # Set actor if provided
-    if actor:
-        actor_content_type = ContentType.objects.get_for_model(actor)
-        notification.actor_content_type = actor_content_type
-        notification.actor_object_id = actor.pk
-    
-    # Set target if provided
-    if target:
-        target_content_type = ContentType.objects.get_for_model(target)
-        notification.target_content_type = target_content_type
-        notification.target_object_id = target.pk
-    
-    # Set action_object if provided
-    if action_object:
-        action_object_content_type = ContentType.objects.get_for_model(action_object)
-        notification.action_object_content_type = action_object_content_type
-        notification.action_object_object_id = action_object.pk
-    
-    notification.save()
-    return notification
\ No newline at end of file
+
+
+def prefetch_generic_objects(notifications):
+    """
+    Load the actors, targets and action objects of many notifications with
+    one query per content type, and cache them on each notification.
+
+    Returns the notifications as a list.
+    """
+    notifications = list(notifications)
+
+    wanted = defaultdict(set)
+    for notification in notifications:
+        for name in GENERIC_FIELDS:
+            ct_id = getattr(notification, f'{name}_content_type_id')
+            object_id = getattr(notification, f'{name}_object_id')
+            if ct_id and object_id is not None:
+                wanted[ct_id].add(object_id)
+
+    fetched = {}
+    for ct_id, object_ids in wanted.items():
+        model = ContentType.objects.get_for_id(ct_id).model_class()
+        if model is None:
+            continue
+        queryset = model._base_manager.filter(pk__in=object_ids)
+        related = GENERIC_SELECT_RELATED.get(model._meta.label_lower)
+        if related:
+            queryset = queryset.select_related(*related)
+        for obj in queryset:
+            fetched[(ct_id, obj.pk)] = obj
+
+    for name in GENERIC_FIELDS:
+        field = Notification._meta.get_field(name)
+        for notification in notifications:
+            key = (getattr(notification, f'{name}_content_type_id'), getattr(notification, f'{name}_object_id'))
+            field.set_cached_value(notification, fetched.get(key))
+
+    return notifications
+
+
+def _count_unread(user_ids):
+    """Count unread notifications per user straight from the notification table."""
+    counts = dict(
+        Notification.objects.filter(recipient_id__in=user_ids, unread=True)
+        .values_list('recipient_id')
+        .annotate(count=Count('id'))
+    )
+    return {user_id: counts.get(user_id, 0) for user_id in user_ids}
+
+
+def _create_counters(user_ids):
+    """
+    Create missing counter rows, seeded from the notification table.
+
+    Rows created concurrently by another writer are left alone; it seeded
+    them from the same table.
+    """
+    NotificationCounter.objects.bulk_create(
+        [
+            NotificationCounter(user_id=user_id, unread_count=count)
+            for user_id, count in _count_unread(user_ids).items()
+        ],
+        ignore_conflicts=True
+    )
+
+
+def adjust_unread_counts(user_ids, delta):
+    """
+    Atomically add ``delta`` to the unread counters of ``user_ids``.
+
+    Users without a counter row yet get one seeded from an exact count.
+    """
+    user_ids = set(user_ids)
+    if not user_ids or not delta:
+        return
+
+    counters = NotificationCounter.objects.filter(user_id__in=user_ids)
+    updated = counters.update(
+        unread_count=Greatest(F('unread_count') + delta, Value(0)),
+        updated_at=timezone.now()
+    )
+    if updated < len(user_ids):
+        existing = set(counters.values_list('user_id', flat=True))
+        _create_counters(user_ids - existing)
+
+
+def get_unread_count(user):
+    """Return a user's unread notification count from their counter row."""
+    count = NotificationCounter.objects.filter(user=user).values_list('unread_count', flat=True).first()
+    if count is None:
+        _create_counters({user.pk})
+        count = NotificationCounter.objects.filter(user=user).values_list('unread_count', flat=True).get()
+    return count
+
+
+def mark_notifications_read(queryset):
+    """Mark the unread notifications in ``queryset`` as read and update counters."""
+    with transaction.atomic():
+        # Lock the rows first: a concurrent call (another tab) then waits and
+        # finds them read, so each notification is only subtracted once.
+        rows = list(
+            queryset.filter(unread=True).select_for_update().order_by('pk').values_list('pk', 'recipient_id')
+        )
+        if not rows:
+            return 0
+        per_user = defaultdict(int)
+        for _, user_id in rows:
+            per_user[user_id] += 1
+        updated = Notification.objects.filter(pk__in=[pk for pk, _ in rows], unread=True).update(unread=False)
+        for user_id, count in per_user.items():
+            adjust_unread_counts([user_id], -count)
+        publish_on_commit(lambda: _unread_count_events(per_user))
+    return updated
+
+
+def _counter_values(user_ids):
+    return dict(
+        NotificationCounter.objects.filter(user_id__in=user_ids).values_list('user_id', 'unread_count')
+    )
+
+
+def _created_events(notifications):
+    """Build stream messages announcing new notifications."""
+    counts = _counter_values({notification.recipient_id for notification in notifications})
+    return [
+        {
+            'user': notification.recipient_id,
+            'event': 'notification',
+            'id': notification.pk,
+            'data': {
+                'id': notification.pk,
+                'verb': notification.verb,
+                'level': notification.level,
+                'timestamp': notification.timestamp.isoformat(),
+                'unread_count': counts.get(notification.recipient_id, 0),
+            },
+        }
+        for notification in notifications
+    ]
+
+
+def _unread_count_events(user_ids):
+    """Build stream messages carrying the current unread counts of users."""
+    return [
+        {'user': user_id, 'event': 'unread_count', 'data': {'unread_count': count}}
+        for user_id, count in _counter_values(user_ids).items()
+    ]
+
+
+def reconcile_unread_counts(user_ids=None):
+    """
+    Rewrite counters from exact counts over the notification table.
+
+    Returns the number of counters that were out of date.
+    """
+    if user_ids is None:
+        user_ids = set(NotificationCounter.objects.values_list('user_id', flat=True))
+        user_ids |= set(Notification.objects.filter(unread=True).values_list('recipient_id', flat=True).distinct())
+
+    user_ids = sorted(user_ids)
+    corrected = 0
+    for start in range(0, len(user_ids), RECONCILE_BATCH_SIZE):
+        batch = user_ids[start:start + RECONCILE_BATCH_SIZE]
+        with transaction.atomic():
+            current = dict(
+                NotificationCounter.objects.select_for_update()
+                .filter(user_id__in=batch)
+                .values_list('user_id', 'unread_count')
+            )
+            for user_id, count in _count_unread(batch).items():
+                if user_id not in current:
+                    NotificationCounter.objects.create(user_id=user_id, unread_count=count)
+                    corrected += 1
+                elif current[user_id] != count:
+                    NotificationCounter.objects.filter(user_id=user_id).update(
+                        unread_count=count, updated_at=timezone.now()
+                    )
+                    corrected += 1
+    return corrected
+
+
+def expired_notifications(read_before, unread_before=None):
+    """
+    Return notifications past their retention period.
+
+    Read notifications expire when older than ``read_before`` and unread
+    ones when older than ``unread_before``; ``None`` keeps them forever.
+    """
+    expired = Q(unread=False, timestamp__lt=read_before)
+    if unread_before is not None:
+        expired |= Q(unread=True, timestamp__lt=unread_before)
+    return Notification.objects.filter(expired)
+
+
+def purge_notifications_batches(queryset, archive=False, batch_size=1000):
+    """
+    Delete (optionally archiving first) the notifications in ``queryset``.
+
+    Works through the rows in primary key order, one short transaction per
+    batch, and yields the number of rows handled by each batch so callers
+    can report progress or pause between batches.
+    """
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            # Lock the batch so a concurrent mark-read cannot change ``unread``
+            # between the count and the DELETE; rows it holds are left for
+            # the next run.
+            rows = list(
+                queryset.filter(pk__gt=last_id).select_for_update(skip_locked=True)
+                .order_by('pk').values(*ARCHIVE_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return
+            last_id = rows[-1]['id']
+
+            if archive:
+                NotificationArchive.objects.bulk_create(
+                    [NotificationArchive(**row) for row in rows], ignore_conflicts=True
+                )
+
+            Notification.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+
+            unread = defaultdict(int)
+            for row in rows:
+                if row['unread']:
+                    unread[row['recipient_id']] += 1
+            users_by_count = defaultdict(list)
+            for user_id, count in unread.items():
+                users_by_count[count].append(user_id)
+            for count, user_ids in users_by_count.items():
+                adjust_unread_counts(user_ids, -count)
+        yield len(rows)
@@ -1,11 +1,42 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 
+from .events import get_broker
 from .models import Notification
 from .serializers import NotificationSerializer
+from .utils import get_unread_count, mark_notifications_read
+
+User = get_user_model()
+
+STREAM_TICKET_SALT = 'notifications.stream'
+
+
+def _ticket_ttl():
+    return getattr(settings, 'NOTIFICATION_STREAM_TICKET_TTL', 30)
+
+
+def streaming_supported(request):
+    """
+    Whether ``request`` is served under ASGI.
+
+    Under WSGI Django reads a streaming response's async iterator to the end
+    before sending anything, so a stream would deliver nothing until it
+    closed while holding a worker the whole time.
+    """
+    request = getattr(request, '_request', request)
+    return isinstance(request, ASGIRequest)
 
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -21,24 +52,126 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         """Return notifications for the current user only."""
-        return Notification.objects.filter(recipient=self.request.user)
+        return Notification.objects.filter(recipient=self.request.user).select_related('recipient')
     
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
         """Mark a notification as read."""
         notification = self.get_object()
-        notification.unread = False
-        notification.save()
+        mark_notifications_read(self.get_queryset().filter(pk=notification.pk))
         return Response({'status': 'notification marked as read'})
     
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
         """Mark all notifications as read."""
-        self.get_queryset().filter(unread=True).update(unread=False)
+        mark_notifications_read(self.get_queryset())
         return Response({'status': 'all notifications marked as read'})
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get the count of unread notifications."""
-        count = self.get_queryset().filter(unread=True).count()
-        return Response({'unread_count': count})
+        return Response({'unread_count': get_unread_count(request.user)})
+
+    @action(detail=False, methods=['post'], url_path='stream-ticket')
+    def stream_ticket(self, request):
+        """
+        Issue a short-lived ticket for opening the notification stream.
+
+        ``EventSource`` cannot send headers, so the stream URL carries this
+        ticket instead of the access token. Answers 501 when the server runs
+        under WSGI and cannot stream, so clients keep polling.
+        """
+        if not streaming_supported(request):
+            return Response(
+                {'detail': 'Live notifications are not available on this server.'},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+        return Response({
+            'ticket': signing.dumps(request.user.pk, salt=STREAM_TICKET_SALT),
+            'expires_in': _ticket_ttl(),
+        })
+
+
+def _authenticate_stream(request):
+    """Resolve the user of a stream request from its ``ticket`` parameter."""
+    ticket = request.GET.get('ticket')
+    if not ticket:
+        return None
+    try:
+        user_id = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=_ticket_ttl())
+    except signing.BadSignature:
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).only('pk').first()
+
+
+def _format_event(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _missed_notifications(user, last_event_id):
+    """Notifications created after the last one a reconnecting client saw."""
+    return list(
+        Notification.objects.filter(recipient=user, pk__gt=last_event_id)
+        .order_by('pk')
+        .values('id', 'verb', 'level', 'timestamp')[:50]
+    )
+
+
+async def _event_stream(user, last_event_id=None):
+    broker = get_broker()
+    subscription = broker.subscribe(user.pk)
+    keepalive = getattr(settings, 'NOTIFICATION_STREAM_KEEPALIVE', 15)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + getattr(settings, 'NOTIFICATION_STREAM_MAX_AGE', 300)
+    try:
+        yield f'retry: {getattr(settings, "NOTIFICATION_STREAM_RETRY_MS", 3000)}\n\n'
+        if last_event_id is not None:
+            for row in await sync_to_async(_missed_notifications)(user, last_event_id):
+                row['timestamp'] = row['timestamp'].isoformat()
+                yield _format_event('notification', row, row['id'])
+        count = await sync_to_async(get_unread_count)(user)
+        yield _format_event('unread_count', {'unread_count': count})
+
+        # Streams end after a while so clients reconnect with a fresh ticket.
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), timeout=min(keepalive, remaining))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield _format_event(message['event'], message['data'], message.get('id'))
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def notification_stream(request):
+    """
+    Stream new notifications and unread-count changes as Server-Sent Events.
+
+    Served asynchronously so idle connections do not hold a worker, which
+    requires ASGI; under WSGI it answers 501 and clients poll instead. The
+    connection is authenticated by a ticket from ``stream-ticket/``.
+    """
+    if not streaming_supported(request):
+        return JsonResponse(
+            {'detail': 'Live notifications are not available on this server.'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    user = await sync_to_async(_authenticate_stream)(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided or are invalid.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    response = StreamingHttpResponse(_event_stream(user, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,12 @@
+from django.contrib import admin
+from .models import OutboxMessage
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """Admin configuration for the OutboxMessage model."""
+
+    list_display = ('topic', 'idempotency_key', 'status', 'attempts', 'available_at', 'processed_at')
+    list_filter = ('status', 'topic')
+    search_fields = ('idempotency_key', 'topic')
+    readonly_fields = ('created_at', 'processed_at')
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from outbox.utils import drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'Process pending outbox messages (notifications and other side effects); run with --loop as the worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Messages claimed per batch',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for new messages',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls when the outbox is empty (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed, failed = drain_outbox(batch_size=options['batch_size'])
+            if processed or failed or not options['loop']:
+                style = self.style.SUCCESS if not failed else self.style.WARNING
+                self.stdout.write(style(f'Processed {processed} outbox messages ({failed} failed)'))
+            if not options['loop']:
+                return
+            if not processed and not failed:
+                time.sleep(options['interval'])
@@ -0,0 +1,41 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxMessage(models.Model):
+    """
+    A side effect recorded in the same transaction as the change causing it.
+
+    Rows are processed later by the ``drain_outbox`` command, which looks up
+    the handler for ``topic`` in ``settings.OUTBOX_HANDLERS``. The
+    ``idempotency_key`` is unique, so enqueueing the same effect twice keeps
+    a single row.
+    """
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    topic = models.CharField(_('Topic'), max_length=100)
+    payload = models.JSONField(_('Payload'), default=dict)
+    idempotency_key = models.CharField(_('Idempotency Key'), max_length=200, unique=True)
+    status = models.CharField(_('Status'), max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(_('Attempts'), default=0)
+    available_at = models.DateTimeField(_('Available At'), default=timezone.now)
+    last_error = models.TextField(_('Last Error'), blank=True)
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    processed_at = models.DateTimeField(_('Processed At'), null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = _('Outbox Message')
+        verbose_name_plural = _('Outbox Messages')
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} [{self.status}] {self.idempotency_key}"
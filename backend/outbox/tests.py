@@ -0,0 +1,85 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from expenses.models import ExpenseClaim
+from masters.models import ExpenseType
+from notifications.models import Notification
+from .models import OutboxMessage
+from .utils import drain_outbox, enqueue
+
+User = get_user_model()
+
+
+def failing_handler(payload, key):
+    raise RuntimeError('mail server unavailable')
+
+
+@override_settings(OUTBOX_DRAIN_ON_COMMIT=False)
+class ApprovalOutboxTestCase(APITestCase):
+    """Test cases for approvals queueing their notifications."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(email='manager@test.com', role='manager')
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr', manager=self.manager)
+        self.claim = ExpenseClaim.objects.create(
+            user=self.mr, expense_type=ExpenseType.objects.create(name='Travel', code='TR'),
+            amount=Decimal('10.00'), date=date(2030, 1, 1), description='Taxi'
+        )
+        self.client.force_authenticate(user=self.manager)
+
+    def test_approval_notifies_through_outbox(self):
+        """Test that approving queues the notification for the worker."""
+        response = self.client.post(f'/api/expenses/expense-claims/{self.claim.pk}/approve/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Notification.objects.filter(recipient=self.mr).exists())
+        self.assertEqual(OutboxMessage.objects.filter(status='pending').count(), 1)
+
+        self.assertEqual(drain_outbox(), (1, 0))
+        notification = Notification.objects.get(recipient=self.mr)
+        self.assertEqual(notification.target, self.claim)
+        self.assertEqual(notification.level, 'success')
+        self.assertEqual(drain_outbox(), (0, 0))
+
+    @override_settings(OUTBOX_DRAIN_ON_COMMIT=True)
+    def test_approval_notifies_on_commit_without_worker(self):
+        """Test that without a worker the request's messages run after commit."""
+        enqueue('notifications.create', {}, key='other')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/expenses/expense-claims/{self.claim.pk}/approve/')
+        self.assertTrue(Notification.objects.filter(recipient=self.mr).exists())
+        # Messages of other transactions are left to their own callbacks.
+        self.assertEqual(list(OutboxMessage.objects.values_list('idempotency_key', 'status').filter(
+            status='pending'
+        )), [('other', 'pending')])
+
+
+class OutboxTestCase(TestCase):
+    """Test cases for outbox idempotency and retries."""
+
+    def test_same_key_is_queued_once(self):
+        """Test that enqueueing with a used key keeps one message."""
+        enqueue('notifications.create', {}, key='claim:1')
+        enqueue('notifications.create', {}, key='claim:1')
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    @override_settings(OUTBOX_HANDLERS={'mail.send': 'outbox.tests.failing_handler'})
+    def test_failures_back_off_then_give_up(self):
+        """Test that failed messages are retried later and eventually marked failed."""
+        enqueue('mail.send', {}, key='mail:1')
+        with self.assertLogs('outbox.utils', 'ERROR'):
+            self.assertEqual(drain_outbox(max_attempts=2), (0, 1))
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertIn('mail server unavailable', message.last_error)
+        self.assertEqual(drain_outbox(max_attempts=2), (0, 0))
+
+        OutboxMessage.objects.update(available_at=message.created_at)
+        with self.assertLogs('outbox.utils', 'ERROR'):
+            drain_outbox(max_attempts=2)
+        self.assertEqual(OutboxMessage.objects.get().status, 'failed')
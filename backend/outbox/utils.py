@@ -0,0 +1,126 @@
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# Claimed messages are hidden from other workers for this long; a worker
+# that dies mid-batch leaves them to be picked up again afterwards.
+CLAIM_SECONDS = 300
+
+# Delay before retry n is RETRY_BASE_SECONDS * 2 ** (n - 1), capped.
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+
+def enqueue(topic, payload, key=None):
+    """
+    Record a side effect to run after the current transaction commits.
+
+    Call it inside the transaction that makes the change, so the message
+    exists if and only if the change does. Messages with a ``key`` that is
+    already queued are ignored.
+    """
+    enqueue_many([(topic, payload, key)])
+
+
+def enqueue_many(messages):
+    """
+    Record many ``(topic, payload, key)`` side effects with one INSERT.
+
+    The ``drain_outbox`` worker processes them. With
+    ``OUTBOX_DRAIN_ON_COMMIT`` (for development without a worker) they are
+    processed right after the transaction commits, in the same thread.
+    """
+    keys = []
+    rows = []
+    for topic, payload, key in messages:
+        key = key or uuid.uuid4().hex
+        keys.append(key)
+        rows.append(OutboxMessage(topic=topic, payload=payload, idempotency_key=key))
+    OutboxMessage.objects.bulk_create(rows, ignore_conflicts=True)
+
+    if getattr(settings, 'OUTBOX_DRAIN_ON_COMMIT', False):
+        transaction.on_commit(lambda: drain_outbox(keys=keys), robust=True)
+
+
+def get_handler(topic):
+    """Return the callable registered for ``topic`` in OUTBOX_HANDLERS."""
+    path = getattr(settings, 'OUTBOX_HANDLERS', {}).get(topic)
+    if path is None:
+        raise LookupError(f'No outbox handler registered for {topic!r}')
+    return import_string(path)
+
+
+def claim_batch(batch_size, keys=None):
+    """Lock and lease the next due pending messages (only ``keys``, if given)."""
+    now = timezone.now()
+    pending = OutboxMessage.objects.filter(status='pending', available_at__lte=now)
+    if keys is not None:
+        pending = pending.filter(idempotency_key__in=keys)
+    with transaction.atomic():
+        messages = list(
+            pending.select_for_update(skip_locked=True).order_by('available_at', 'id')[:batch_size]
+        )
+        if messages:
+            OutboxMessage.objects.filter(pk__in=[m.pk for m in messages]).update(
+                available_at=now + timedelta(seconds=CLAIM_SECONDS)
+            )
+    return messages
+
+
+def process_message(message, max_attempts):
+    """
+    Run one message's handler and record the outcome.
+
+    The handler's writes and the ``done`` mark share a transaction, so a
+    handler that only touches the database takes effect exactly once.
+    Returns True on success.
+    """
+    try:
+        with transaction.atomic():
+            get_handler(message.topic)(message.payload, message.idempotency_key)
+            OutboxMessage.objects.filter(pk=message.pk).update(
+                status='done', attempts=message.attempts + 1,
+                processed_at=timezone.now(), last_error=''
+            )
+        return True
+    except Exception as exc:
+        logger.exception('Outbox message %s failed', message.pk)
+        attempts = message.attempts + 1
+        delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+        OutboxMessage.objects.filter(pk=message.pk).update(
+            status='failed' if attempts >= max_attempts else 'pending',
+            attempts=attempts,
+            available_at=timezone.now() + timedelta(seconds=delay),
+            last_error=f'{type(exc).__name__}: {exc}'[:2000]
+        )
+        return False
+
+
+def drain_outbox(batch_size=100, max_attempts=None, keys=None):
+    """
+    Process due messages until none are left, or only those with ``keys``.
+
+    Returns ``(processed, failed)`` counts.
+    """
+    if max_attempts is None:
+        max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+
+    processed = failed = 0
+    while True:
+        messages = claim_batch(batch_size, keys=keys)
+        if not messages:
+            return processed, failed
+        for message in messages:
+            if process_message(message, max_attempts):
+                processed += 1
+            else:
+                failed += 1
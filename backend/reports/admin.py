@@ -1,6 +1,22 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
-from .models import DailyCallReport
+from .models import ChemistVisit, DailyCallReport, DoctorVisit
+
+
+class DoctorVisitInline(admin.TabularInline):
+    """Inline for the doctors visited on a report."""
+    model = DoctorVisit
+    fields = ('doctor',)
+    autocomplete_fields = ('doctor',)
+    extra = 0
+
+
+class ChemistVisitInline(admin.TabularInline):
+    """Inline for the chemists visited on a report."""
+    model = ChemistVisit
+    fields = ('chemist',)
+    autocomplete_fields = ('chemist',)
+    extra = 0
 
 
 class DailyCallReportAdmin(admin.ModelAdmin):
@@ -9,16 +25,13 @@ class DailyCallReportAdmin(admin.ModelAdmin):
     list_filter = ('is_active', 'work_type', 'date', 'user')
     search_fields = ('user__email', 'user__first_name', 'user__last_name', 'summary')
     date_hierarchy = 'date'
-    filter_horizontal = ('doctors_visited', 'chemists_visited')
+    inlines = (DoctorVisitInline, ChemistVisitInline)
     readonly_fields = ('submitted_at', 'created_at', 'updated_at')
 
     fieldsets = (
         (None, {
             'fields': ('user', 'date', 'work_type', 'summary')
         }),
-        (_('Contacts Visited'), {
-            'fields': ('doctors_visited', 'chemists_visited')
-        }),
         (_('Status'), {
             'fields': ('is_active',)
         }),
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def date_visits(apps, schema_editor):
+    """Date every existing visit with its report's date."""
+    DailyCallReport = apps.get_model('reports', 'DailyCallReport')
+    report_date = Subquery(DailyCallReport.objects.filter(pk=OuterRef('dailycallreport_id')).values('date')[:1])
+    for name in ('DoctorVisit', 'ChemistVisit'):
+        apps.get_model('reports', name).objects.update(date=report_date)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0002_chemist_doctor'),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        # The many-to-many tables become the through models as they are.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='DoctorVisit',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('dailycallreport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reports.dailycallreport')),
+                        ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='masters.doctor')),
+                    ],
+                    options={
+                        'verbose_name': 'Doctor Visit',
+                        'verbose_name_plural': 'Doctor Visits',
+                        'db_table': 'reports_dailycallreport_doctors_visited',
+                        'unique_together': {('dailycallreport', 'doctor')},
+                    },
+                ),
+                migrations.CreateModel(
+                    name='ChemistVisit',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('dailycallreport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reports.dailycallreport')),
+                        ('chemist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='masters.chemist')),
+                    ],
+                    options={
+                        'verbose_name': 'Chemist Visit',
+                        'verbose_name_plural': 'Chemist Visits',
+                        'db_table': 'reports_dailycallreport_chemists_visited',
+                        'unique_together': {('dailycallreport', 'chemist')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='dailycallreport',
+                    name='doctors_visited',
+                    field=models.ManyToManyField(blank=True, related_name='dcr_visits', through='reports.DoctorVisit', to='masters.doctor', verbose_name='Doctors Visited'),
+                ),
+                migrations.AlterField(
+                    model_name='dailycallreport',
+                    name='chemists_visited',
+                    field=models.ManyToManyField(blank=True, related_name='dcr_visits', through='reports.ChemistVisit', to='masters.chemist', verbose_name='Chemists Visited'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='doctorvisit',
+            name='date',
+            field=models.DateField(null=True, verbose_name='Date'),
+        ),
+        migrations.AddField(
+            model_name='chemistvisit',
+            name='date',
+            field=models.DateField(null=True, verbose_name='Date'),
+        ),
+        migrations.RunPython(date_visits, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='doctorvisit',
+            name='date',
+            field=models.DateField(verbose_name='Date'),
+        ),
+        migrations.AlterField(
+            model_name='chemistvisit',
+            name='date',
+            field=models.DateField(verbose_name='Date'),
+        ),
+    ]
@@ -4,6 +4,68 @@ from django.conf import settings
 from masters.models import BaseModel, Doctor, Chemist
 
 
+class VisitQuerySet(models.QuerySet):
+    """Visits whose ``date`` is filled in from their report when left unset."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # Related managers (report.doctors_visited.add/set) create visits
+        # through here without a date unless given through_defaults.
+        objs = list(objs)
+        undated = {obj.dailycallreport_id for obj in objs if obj.date is None}
+        if undated:
+            dates = dict(
+                DailyCallReport.objects.using(self.db).filter(pk__in=undated).values_list('pk', 'date')
+            )
+            for obj in objs:
+                if obj.date is None:
+                    obj.date = dates.get(obj.dailycallreport_id)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class Visit(models.Model):
+    """
+    A contact visited on a daily call report.
+
+    Visits carry their report's ``date``, so on PostgreSQL the visit tables
+    can be partitioned by month along with the reports and keep a foreign
+    key to them (``core.partitioning``).
+    """
+    dailycallreport = models.ForeignKey('DailyCallReport', on_delete=models.CASCADE)
+    date = models.DateField(_('Date'))
+
+    objects = VisitQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.date is None:
+            self.date = self.dailycallreport.date
+        super().save(*args, **kwargs)
+
+
+class DoctorVisit(Visit):
+    """A doctor visited on a daily call report."""
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = 'reports_dailycallreport_doctors_visited'
+        unique_together = ['dailycallreport', 'doctor']
+        verbose_name = _('Doctor Visit')
+        verbose_name_plural = _('Doctor Visits')
+
+
+class ChemistVisit(Visit):
+    """A chemist visited on a daily call report."""
+    chemist = models.ForeignKey(Chemist, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = 'reports_dailycallreport_chemists_visited'
+        unique_together = ['dailycallreport', 'chemist']
+        verbose_name = _('Chemist Visit')
+        verbose_name_plural = _('Chemist Visits')
+
+
 class DailyCallReport(BaseModel):
     """Model for daily call reports submitted by MRs."""
 
@@ -30,12 +92,14 @@ class DailyCallReport(BaseModel):
     summary = models.TextField(_('Summary'))
     doctors_visited = models.ManyToManyField(
         Doctor,
+        through=DoctorVisit,
         blank=True,
         related_name='dcr_visits',
         verbose_name=_('Doctors Visited')
     )
     chemists_visited = models.ManyToManyField(
         Chemist,
+        through=ChemistVisit,
         blank=True,
         related_name='dcr_visits',
         verbose_name=_('Chemists Visited')
@@ -51,6 +115,22 @@ class DailyCallReport(BaseModel):
     def __str__(self):
         return f"{self.user} - {self.date} - {self.get_work_type_display()}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_date = instance.__dict__.get('date')
+        return instance
+
+    def save(self, *args, **kwargs):
+        moved = not self._state.adding and self.date != getattr(self, '_saved_date', self.date)
+        super().save(*args, **kwargs)
+        if moved:
+            # Keep the visits on the report's date (a no-op on PostgreSQL once
+            # partitioned, where the foreign key cascades the change).
+            for visit_model in (DoctorVisit, ChemistVisit):
+                visit_model.objects.filter(dailycallreport=self).exclude(date=self.date).update(date=self.date)
+        self._saved_date = self.date
+
     @property
     def days_count(self):
         """Return the number of days (always 1 for DCR)."""
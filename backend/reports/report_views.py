@@ -6,6 +6,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+from core.fanout import fan_out
 from .models import DailyCallReport
 from expenses.models import ExpenseClaim
 from leaves.models import LeaveRequest
@@ -18,6 +19,7 @@ class DCRSummaryReportAPIView(generics.ListAPIView):
     
     serializer_class = DCRSummarySerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrManager]
+    replica_reads = True
     
     def get_queryset(self):
         """
@@ -37,7 +39,9 @@ class DCRSummaryReportAPIView(generics.ListAPIView):
         
         # Filter by user role
         if user.is_staff or user.role == 'manager':
-            # Admin and managers can see all DCRs, but can filter by user
+            # Admins can see all DCRs and managers their team's, but can filter by user
+            if user.role == 'manager' and not user.is_staff:
+                queryset = queryset.filter(user__in=user.team_user_ids())
             if user_id:
                 queryset = queryset.filter(user_id=user_id)
         else:
@@ -70,51 +74,58 @@ class DCRSummaryReportAPIView(generics.ListAPIView):
         Override list method to return aggregated data.
         """
         queryset = self.get_queryset()
-        
-        # Calculate aggregates
-        total_dcrs = queryset.count()
-        field_work_count = queryset.filter(work_type='field_work').count()
-        office_work_count = queryset.filter(work_type='office_work').count()
-        leave_count = queryset.filter(work_type='leave').count()
-        holiday_count = queryset.filter(work_type='holiday').count()
-        
-        # Calculate total doctors and chemists visited
-        # We need to use distinct() to avoid counting the same doctor/chemist multiple times
-        total_doctors_visited = sum(dcr.doctors_visited.count() for dcr in queryset.filter(work_type='field_work'))
-        total_chemists_visited = sum(dcr.chemists_visited.count() for dcr in queryset.filter(work_type='field_work'))
-        
-        # Group DCRs by date
-        dcr_by_date = defaultdict(int)
-        for dcr in queryset:
-            date_str = dcr.date.strftime('%Y-%m-%d')
-            dcr_by_date[date_str] += 1
-        
+        field_work = queryset.filter(work_type='field_work')
+        doctor_visits = DailyCallReport.doctors_visited.through.objects
+        chemist_visits = DailyCallReport.chemists_visited.through.objects
+
+        # The aggregates are independent, so they are read concurrently
+        tasks = {
+            'counts': lambda: queryset.aggregate(
+                total_dcrs=Count('id'),
+                field_work_count=Count('id', filter=Q(work_type='field_work')),
+                office_work_count=Count('id', filter=Q(work_type='office_work')),
+                leave_count=Count('id', filter=Q(work_type='leave')),
+                holiday_count=Count('id', filter=Q(work_type='holiday')),
+            ),
+            # Visits summed over field-work DCRs, one per doctor/chemist per DCR
+            'doctors': lambda: doctor_visits.filter(dailycallreport__in=field_work).count(),
+            'chemists': lambda: chemist_visits.filter(dailycallreport__in=field_work).count(),
+            # Group DCRs by date
+            'by_date': lambda: list(
+                queryset.order_by('-date').values_list('date').annotate(count=Count('id'))
+            ),
+        }
+        if request.query_params.get('detailed') == 'true':
+            tasks['dcrs'] = lambda: list(
+                queryset.select_related('user').order_by('-date').annotate(
+                    doctors_count=Count('doctors_visited', distinct=True),
+                    chemists_count=Count('chemists_visited', distinct=True),
+                )
+            )
+        results = fan_out(**tasks)
+
         # Prepare data for serializer
         data = {
-            'total_dcrs': total_dcrs,
-            'field_work_count': field_work_count,
-            'office_work_count': office_work_count,
-            'leave_count': leave_count,
-            'holiday_count': holiday_count,
-            'total_doctors_visited': total_doctors_visited,
-            'total_chemists_visited': total_chemists_visited,
-            'dcr_by_date': dict(dcr_by_date),
+            **results['counts'],
+            'total_doctors_visited': results['doctors'],
+            'total_chemists_visited': results['chemists'],
+            'dcr_by_date': {date.strftime('%Y-%m-%d'): count for date, count in results['by_date']},
         }
-        
+
         # Include detailed DCR data if requested
-        if request.query_params.get('detailed') == 'true':
-            dcrs = []
-            for dcr in queryset.order_by('-date'):
-                dcrs.append({
+        if 'dcrs' in results:
+            data['dcrs'] = [
+                {
                     'id': dcr.id,
                     'date': dcr.date.strftime('%Y-%m-%d'),
                     'user': dcr.user.get_full_name() or dcr.user.email,
                     'work_type': dcr.get_work_type_display(),
                     'summary': dcr.summary,
-                    'doctors_count': dcr.doctors_visited.count(),
-                    'chemists_count': dcr.chemists_visited.count(),
-                })
-            data['dcrs'] = dcrs
+                    'doctors_count': dcr.doctors_count,
+                    'chemists_count': dcr.chemists_count,
+                }
+                for dcr in results['dcrs']
+            ]
         
         serializer = self.get_serializer(data)
         return Response(serializer.data)
@@ -125,6 +136,7 @@ class ExpenseSummaryReportAPIView(generics.ListAPIView):
     
     serializer_class = ExpenseSummarySerializer
     permission_classes = [permissions.IsAuthenticated]
+    replica_reads = True
     
     def get_queryset(self):
         """
@@ -145,7 +157,9 @@ class ExpenseSummaryReportAPIView(generics.ListAPIView):
         
         # Filter by user role
         if user.is_staff or user.role == 'manager':
-            # Admin and managers can see all expense claims, but can filter by user
+            # Admins can see all expense claims and managers their team's, but can filter by user
+            if user.role == 'manager' and not user.is_staff:
+                queryset = queryset.filter(user__in=user.team_user_ids())
             if user_id:
                 queryset = queryset.filter(user_id=user_id)
         else:
@@ -182,44 +196,40 @@ class ExpenseSummaryReportAPIView(generics.ListAPIView):
         Override list method to return aggregated data.
         """
         queryset = self.get_queryset()
-        
-        # Calculate aggregates
-        total_expenses = queryset.count()
-        total_amount = queryset.aggregate(total=Sum('amount'))['total'] or 0
-        pending_count = queryset.filter(status='pending').count()
-        approved_count = queryset.filter(status='approved').count()
-        rejected_count = queryset.filter(status='rejected').count()
-        queried_count = queryset.filter(status='queried').count()
-        
-        # Group expenses by type
-        expense_by_type = {}
-        expense_types = queryset.values('expense_type__name').annotate(total=Sum('amount'))
-        for item in expense_types:
-            expense_by_type[item['expense_type__name']] = item['total']
-        
-        # Group expenses by date
-        expense_by_date = defaultdict(float)
-        for expense in queryset:
-            date_str = expense.date.strftime('%Y-%m-%d')
-            expense_by_date[date_str] += float(expense.amount)
-        
+
+        # The aggregates are independent, so they are read concurrently
+        tasks = {
+            'counts': lambda: queryset.aggregate(
+                total_expenses=Count('id'),
+                total_amount=Sum('amount'),
+                pending_count=Count('id', filter=Q(status='pending')),
+                approved_count=Count('id', filter=Q(status='approved')),
+                rejected_count=Count('id', filter=Q(status='rejected')),
+                queried_count=Count('id', filter=Q(status='queried')),
+            ),
+            # Group expenses by type and by date
+            'by_type': lambda: list(queryset.values_list('expense_type__name').annotate(total=Sum('amount'))),
+            'by_date': lambda: list(
+                queryset.order_by('-date').values_list('date').annotate(total=Sum('amount'))
+            ),
+        }
+        if request.query_params.get('detailed') == 'true':
+            tasks['expenses'] = lambda: list(queryset.select_related('user', 'expense_type').order_by('-date'))
+        results = fan_out(**tasks)
+
         # Prepare data for serializer
+        counts = results['counts']
         data = {
-            'total_expenses': total_expenses,
-            'total_amount': total_amount,
-            'pending_count': pending_count,
-            'approved_count': approved_count,
-            'rejected_count': rejected_count,
-            'queried_count': queried_count,
-            'expense_by_type': expense_by_type,
-            'expense_by_date': dict(expense_by_date),
+            **counts,
+            'total_amount': counts['total_amount'] or 0,
+            'expense_by_type': dict(results['by_type']),
+            'expense_by_date': {date.strftime('%Y-%m-%d'): total for date, total in results['by_date']},
         }
-        
+
         # Include detailed expense data if requested
-        if request.query_params.get('detailed') == 'true':
-            expenses = []
-            for expense in queryset.order_by('-date'):
-                expenses.append({
+        if 'expenses' in results:
+            data['expenses'] = [
+                {
                     'id': expense.id,
                     'date': expense.date.strftime('%Y-%m-%d'),
                     'user': expense.user.get_full_name() or expense.user.email,
@@ -227,8 +237,9 @@ class ExpenseSummaryReportAPIView(generics.ListAPIView):
                     'amount': float(expense.amount),
                     'status': expense.status,
                     'description': expense.description,
-                })
-            data['expenses'] = expenses
+                }
+                for expense in results['expenses']
+            ]
         
         serializer = self.get_serializer(data)
         return Response(serializer.data)
@@ -239,6 +250,7 @@ class LeaveSummaryReportAPIView(generics.ListAPIView):
     
     serializer_class = LeaveSummarySerializer
     permission_classes = [permissions.IsAuthenticated]
+    replica_reads = True
     
     def get_queryset(self):
         """
@@ -259,7 +271,9 @@ class LeaveSummaryReportAPIView(generics.ListAPIView):
         
         # Filter by user role
         if user.is_staff or user.role == 'manager':
-            # Admin and managers can see all leave requests, but can filter by user
+            # Admins can see all leave requests and managers their team's, but can filter by user
+            if user.role == 'manager' and not user.is_staff:
+                queryset = queryset.filter(user__in=user.team_user_ids())
             if user_id:
                 queryset = queryset.filter(user_id=user_id)
         else:
@@ -296,55 +310,52 @@ class LeaveSummaryReportAPIView(generics.ListAPIView):
         Override list method to return aggregated data.
         """
         queryset = self.get_queryset()
-        
-        # Calculate aggregates
-        total_leaves = queryset.count()
-        total_days = sum((leave.end_date - leave.start_date).days + 1 for leave in queryset)
-        pending_count = queryset.filter(status='pending').count()
-        approved_count = queryset.filter(status='approved').count()
-        rejected_count = queryset.filter(status='rejected').count()
-        cancelled_count = queryset.filter(status='cancelled').count()
-        
-        # Group leaves by type
-        leave_by_type = {}
-        leave_types = queryset.values('leave_type__name').annotate(count=Count('id'))
-        for item in leave_types:
-            leave_by_type[item['leave_type__name']] = item['count']
-        
+
+        # The aggregates are independent, so they are read concurrently
+        tasks = {
+            'counts': lambda: queryset.aggregate(
+                total_leaves=Count('id'),
+                pending_count=Count('id', filter=Q(status='pending')),
+                approved_count=Count('id', filter=Q(status='approved')),
+                rejected_count=Count('id', filter=Q(status='rejected')),
+                cancelled_count=Count('id', filter=Q(status='cancelled')),
+            ),
+            'dates': lambda: list(queryset.values_list('start_date', 'end_date')),
+            # Group leaves by type
+            'by_type': lambda: list(queryset.values_list('leave_type__name').annotate(count=Count('id'))),
+        }
+        if request.query_params.get('detailed') == 'true':
+            tasks['leaves'] = lambda: list(queryset.select_related('user', 'leave_type').order_by('-start_date'))
+        results = fan_out(**tasks)
+
         # Group leaves by date (start date)
         leave_by_date = defaultdict(int)
-        for leave in queryset:
-            date_str = leave.start_date.strftime('%Y-%m-%d')
-            leave_by_date[date_str] += 1
-        
+        for start_date, end_date in results['dates']:
+            leave_by_date[start_date.strftime('%Y-%m-%d')] += 1
+
         # Prepare data for serializer
         data = {
-            'total_leaves': total_leaves,
-            'total_days': total_days,
-            'pending_count': pending_count,
-            'approved_count': approved_count,
-            'rejected_count': rejected_count,
-            'cancelled_count': cancelled_count,
-            'leave_by_type': leave_by_type,
+            **results['counts'],
+            'total_days': sum((end_date - start_date).days + 1 for start_date, end_date in results['dates']),
+            'leave_by_type': dict(results['by_type']),
             'leave_by_date': dict(leave_by_date),
         }
-        
+
         # Include detailed leave data if requested
-        if request.query_params.get('detailed') == 'true':
-            leaves = []
-            for leave in queryset.order_by('-start_date'):
-                days = (leave.end_date - leave.start_date).days + 1
-                leaves.append({
+        if 'leaves' in results:
+            data['leaves'] = [
+                {
                     'id': leave.id,
                     'start_date': leave.start_date.strftime('%Y-%m-%d'),
                     'end_date': leave.end_date.strftime('%Y-%m-%d'),
-                    'days': days,
+                    'days': (leave.end_date - leave.start_date).days + 1,
                     'user': leave.user.get_full_name() or leave.user.email,
                     'leave_type': leave.leave_type.name,
                     'status': leave.status,
                     'reason': leave.reason,
-                })
-            data['leaves'] = leaves
+                }
+                for leave in results['leaves']
+            ]
         
         serializer = self.get_serializer(data)
         return Response(serializer.data)
@@ -2,9 +2,29 @@ from rest_framework import serializers
 from django.utils import timezone
 from .models import DailyCallReport
 from users.serializers import UserSerializer
+from masters.models import Chemist, Doctor
 from masters.serializers import DoctorSerializer, ChemistSerializer
 
 
+class VisitsMixin(serializers.Serializer):
+    """
+    Writable ``doctors_visited``/``chemists_visited`` lists.
+
+    DRF makes many-to-many fields with an explicit through model read-only,
+    so the visits are declared here and saved with the report's date.
+    """
+
+    doctors_visited = serializers.PrimaryKeyRelatedField(many=True, queryset=Doctor.objects.all(), required=False)
+    chemists_visited = serializers.PrimaryKeyRelatedField(many=True, queryset=Chemist.objects.all(), required=False)
+
+    def set_visits(self, report, doctors_visited=None, chemists_visited=None):
+        through_defaults = {'date': report.date}
+        if doctors_visited is not None:
+            report.doctors_visited.set(doctors_visited, through_defaults=through_defaults)
+        if chemists_visited is not None:
+            report.chemists_visited.set(chemists_visited, through_defaults=through_defaults)
+
+
 class DailyCallReportSerializer(serializers.ModelSerializer):
     """Serializer for the DailyCallReport model."""
 
@@ -27,7 +47,7 @@ class DailyCallReportSerializer(serializers.ModelSerializer):
         ]
 
 
-class DailyCallReportCreateSerializer(serializers.ModelSerializer):
+class DailyCallReportCreateSerializer(VisitsMixin, serializers.ModelSerializer):
     """Serializer for creating a new daily call report."""
 
     class Meta:
@@ -77,16 +97,12 @@ class DailyCallReportCreateSerializer(serializers.ModelSerializer):
         report = DailyCallReport.objects.create(**validated_data)
         
         # Add the many-to-many relationships
-        if doctors_visited:
-            report.doctors_visited.set(doctors_visited)
-        
-        if chemists_visited:
-            report.chemists_visited.set(chemists_visited)
+        self.set_visits(report, doctors_visited or None, chemists_visited or None)
         
         return report
 
 
-class DailyCallReportUpdateSerializer(serializers.ModelSerializer):
+class DailyCallReportUpdateSerializer(VisitsMixin, serializers.ModelSerializer):
     """Serializer for updating a daily call report."""
 
     class Meta:
@@ -114,3 +130,11 @@ class DailyCallReportUpdateSerializer(serializers.ModelSerializer):
             attrs['chemists_visited'] = []
         
         return attrs
+
+    def update(self, instance, validated_data):
+        """Update the report and replace the visits that were given."""
+        doctors_visited = validated_data.pop('doctors_visited', None)
+        chemists_visited = validated_data.pop('chemists_visited', None)
+        instance = super().update(instance, validated_data)
+        self.set_visits(instance, doctors_visited, chemists_visited)
+        return instance
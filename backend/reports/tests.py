@@ -1,3 +1,119 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from expenses.models import ExpenseClaim
+from leaves.models import LeaveRequest
+from masters.models import Chemist, Doctor, ExpenseType, LeaveType
+from .models import ChemistVisit, DailyCallReport, DoctorVisit
+
+User = get_user_model()
+
+
+class SummaryReportTestCase(APITestCase):
+    """Test cases for the DCR, expense and leave summary reports."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(email='manager@test.com', role='manager')
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr', manager=self.manager)
+        doctors = [Doctor.objects.create(name=f'Dr. {i}', added_by=self.mr) for i in range(3)]
+        chemist = Chemist.objects.create(name='Pharmacy', added_by=self.mr)
+
+        first = DailyCallReport.objects.create(
+            user=self.mr, date=date(2024, 1, 2), work_type='field_work', summary='Visits'
+        )
+        first.doctors_visited.set(doctors)
+        first.chemists_visited.set([chemist])
+        second = DailyCallReport.objects.create(
+            user=self.mr, date=date(2024, 1, 3), work_type='field_work', summary='Visits'
+        )
+        second.doctors_visited.set(doctors[:1])
+        DailyCallReport.objects.create(user=self.mr, date=date(2024, 1, 4), work_type='office_work', summary='Office')
+
+        travel = ExpenseType.objects.create(name='Travel', code='TR')
+        food = ExpenseType.objects.create(name='Food', code='FD')
+        for amount, expense_type, claim_status in [
+            ('100.00', travel, 'pending'), ('50.50', travel, 'approved'), ('20.00', food, 'pending'),
+        ]:
+            ExpenseClaim.objects.create(
+                user=self.mr, expense_type=expense_type, amount=Decimal(amount), date=date(2024, 1, 2),
+                description='Claim', status=claim_status,
+            )
+
+        casual = LeaveType.objects.create(name='Casual', code='CL')
+        LeaveRequest.objects.create(
+            user=self.mr, leave_type=casual, start_date=date(2024, 1, 8), end_date=date(2024, 1, 10),
+            reason='Trip', status='approved',
+        )
+        LeaveRequest.objects.create(
+            user=self.mr, leave_type=casual, start_date=date(2024, 1, 15), end_date=date(2024, 1, 15),
+            reason='Errand', status='pending',
+        )
+        self.client.force_authenticate(self.manager)
+
+    def test_dcr_summary(self):
+        """Test the DCR counts, visit totals and per-date breakdown."""
+        response = self.client.get('/api/reports/dcr-summary/', {'detailed': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_dcrs'], 3)
+        self.assertEqual(response.data['field_work_count'], 2)
+        self.assertEqual(response.data['office_work_count'], 1)
+        self.assertEqual(response.data['total_doctors_visited'], 4)
+        self.assertEqual(response.data['total_chemists_visited'], 1)
+        self.assertEqual(list(response.data['dcr_by_date']), ['2024-01-04', '2024-01-03', '2024-01-02'])
+        self.assertEqual(
+            [(dcr['doctors_count'], dcr['chemists_count']) for dcr in response.data['dcrs']],
+            [(0, 0), (1, 0), (3, 1)],
+        )
+
+    def test_expense_summary(self):
+        """Test the expense totals and breakdowns by type and date."""
+        response = self.client.get('/api/reports/expense-summary/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_expenses'], 3)
+        self.assertEqual(Decimal(response.data['total_amount']), Decimal('170.50'))
+        self.assertEqual(response.data['pending_count'], 2)
+        self.assertEqual(response.data['approved_count'], 1)
+        self.assertEqual(Decimal(response.data['expense_by_type']['Travel']), Decimal('150.50'))
+        self.assertEqual(Decimal(response.data['expense_by_date']['2024-01-02']), Decimal('170.50'))
+
+    def test_leave_summary(self):
+        """Test the leave counts, total days and breakdowns."""
+        response = self.client.get('/api/reports/leave-summary/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_leaves'], 2)
+        self.assertEqual(response.data['total_days'], 4)
+        self.assertEqual(response.data['approved_count'], 1)
+        self.assertEqual(response.data['leave_by_type'], {'Casual': 2})
+        self.assertEqual(response.data['leave_by_date'], {'2024-01-15': 1, '2024-01-08': 1})
+
+    def test_visits_carry_the_report_date(self):
+        """Test that visits are dated with their report, on create and when it moves."""
+        self.client.force_authenticate(self.mr)
+        doctor = Doctor.objects.filter(added_by=self.mr).first()
+        response = self.client.post('/api/reports/daily-call-reports/', {
+            'date': '2024-01-05', 'work_type': 'field_work', 'summary': 'Visits',
+            'doctors_visited': [doctor.pk],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        report = DailyCallReport.objects.get(user=self.mr, date=date(2024, 1, 5))
+        self.assertEqual(list(DoctorVisit.objects.filter(dailycallreport=report).values_list('date', flat=True)),
+                         [date(2024, 1, 5)])
+        chemist = Chemist.objects.get(added_by=self.mr)
+        response = self.client.patch(
+            f'/api/reports/daily-call-reports/{report.pk}/', {'chemists_visited': [chemist.pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(ChemistVisit.objects.filter(dailycallreport=report).values_list('chemist', 'date')),
+                         [(chemist.pk, date(2024, 1, 5))])
+
+        first = DailyCallReport.objects.get(user=self.mr, date=date(2024, 1, 2))
+        first.date = date(2024, 2, 1)
+        first.save()
+        self.assertEqual(set(DoctorVisit.objects.filter(dailycallreport=first).values_list('date', flat=True)),
+                         {date(2024, 2, 1)})
+        self.assertEqual(set(ChemistVisit.objects.filter(dailycallreport=first).values_list('date', flat=True)),
+                         {date(2024, 2, 1)})
@@ -1,7 +1,10 @@
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db.models import Prefetch, Q
+
+from core.mixins import RelatedFieldsMixin
+from masters.models import Chemist, Doctor
 
 from .models import DailyCallReport
 from .serializers import (
@@ -11,7 +14,7 @@ from .serializers import (
 from .permissions import IsOwnerOrManager, IsOwner
 
 
-class DailyCallReportViewSet(viewsets.ModelViewSet):
+class DailyCallReportViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing DailyCallReport instances."""
 
     queryset = DailyCallReport.objects.all()
@@ -22,12 +25,17 @@ class DailyCallReportViewSet(viewsets.ModelViewSet):
     search_fields = ['summary']
     ordering_fields = ['date', 'submitted_at']
     ordering = ['-date', '-submitted_at']
+    select_related_fields = ('user',)
+    prefetch_related_fields = (
+        Prefetch('doctors_visited', queryset=Doctor.objects.select_related('specialty', 'added_by')),
+        Prefetch('chemists_visited', queryset=Chemist.objects.select_related('category', 'added_by')),
+    )
 
     def get_queryset(self):
         """
         This view should return a list of all daily call reports
-        for the currently authenticated user or all reports
-        if the user is a manager or admin.
+        for the currently authenticated user, their team's reports
+        if the user is a manager, or all reports if the user is an admin.
         """
         user = self.request.user
 
@@ -35,9 +43,9 @@ class DailyCallReportViewSet(viewsets.ModelViewSet):
         if user.is_staff:
             return DailyCallReport.objects.all()
 
-        # Managers can see all reports
+        # Managers can see their own and their team's reports
         if user.role == 'manager':
-            return DailyCallReport.objects.all()
+            return DailyCallReport.objects.filter(user__in=user.team_user_ids())
 
         # Regular users can only see their own reports
         return DailyCallReport.objects.filter(user=user)
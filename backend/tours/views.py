@@ -1,6 +1,7 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
@@ -12,10 +13,11 @@ from .serializers import (
     TourProgramReviewSerializer
 )
 from .permissions import IsOwnerOrManager, IsOwner, IsManager
-from notifications.utils import create_notification
+from core.mixins import BulkReviewMixin, RelatedFieldsMixin
+from notifications.utils import create_notifications_bulk, get_manager_recipients
 
 
-class TourProgramViewSet(viewsets.ModelViewSet):
+class TourProgramViewSet(RelatedFieldsMixin, BulkReviewMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing TourProgram instances."""
     
     queryset = TourProgram.objects.all()
@@ -26,12 +28,18 @@ class TourProgramViewSet(viewsets.ModelViewSet):
     search_fields = ['area_details', 'manager_comments']
     ordering_fields = ['month', 'year', 'submitted_at', 'reviewed_at']
     ordering = ['-year', '-month']
+    select_related_fields = ('user', 'reviewed_by')
+    review_decisions = {
+        'approve': ('approved', ('submitted',), 'success'),
+        'reject': ('rejected', ('submitted',), 'warning'),
+    }
+    bulk_review_permission_classes = [permissions.IsAuthenticated, IsManager]
     
     def get_queryset(self):
         """
         This view should return a list of all tour programs
-        for the currently authenticated user or all tour programs
-        if the user is a manager or admin.
+        for the currently authenticated user, their team's tour programs
+        if the user is a manager, or all tour programs if the user is an admin.
         """
         user = self.request.user
         
@@ -39,13 +47,17 @@ class TourProgramViewSet(viewsets.ModelViewSet):
         if user.is_staff:
             return TourProgram.objects.all()
         
-        # Managers can see all tour programs
+        # Managers can see their own and their team's tour programs
         if user.role == 'manager':
-            return TourProgram.objects.all()
+            return TourProgram.objects.filter(user__in=user.team_user_ids())
         
         # Regular users can only see their own tour programs
         return TourProgram.objects.filter(user=user)
     
+    def get_review_verb(self, obj, status):
+        """Describe a review of a tour program to its owner."""
+        return f"{status} your tour program for {obj.month_name} {obj.year}"
+    
     def get_serializer_class(self):
         """Return appropriate serializer class based on the action."""
         if self.action == 'create':
@@ -81,17 +93,13 @@ class TourProgramViewSet(viewsets.ModelViewSet):
         
         # Create notification for managers
         user = self.request.user
-        managers = [u for u in user._meta.model.objects.filter(role='manager') if u.is_active]
-        
-        # If there are managers, notify them
-        for manager in managers:
-            create_notification(
-                recipient=manager,
-                actor=user,
-                verb=f"submitted a tour program for {tour_program.month_name} {tour_program.year}",
-                target=tour_program,
-                level='info'
-            )
+        create_notifications_bulk(
+            get_manager_recipients(user),
+            actor=user,
+            verb=f"submitted a tour program for {tour_program.month_name} {tour_program.year}",
+            target=tour_program,
+            level='info'
+        )
         
         return Response(serializer.data)
     
@@ -113,19 +121,14 @@ class TourProgramViewSet(viewsets.ModelViewSet):
             'manager_comments': request.data.get('manager_comments', '')
         })
         serializer.is_valid(raise_exception=True)
-        tour_program = serializer.save(
-            reviewed_by=request.user,
-            reviewed_at=timezone.now()
-        )
-        
-        # Create notification for the tour program owner
-        create_notification(
-            recipient=tour_program.user,
-            actor=request.user,
-            verb=f"approved your tour program for {tour_program.month_name} {tour_program.year}",
-            target=tour_program,
-            level='success'
-        )
+        with transaction.atomic():
+            tour_program = serializer.save(
+                reviewed_by=request.user,
+                reviewed_at=timezone.now()
+            )
+
+            # Queue a notification for the tour program owner
+            self.notify_owner(tour_program, 'success')
         
         return Response(serializer.data)
     
@@ -147,18 +150,13 @@ class TourProgramViewSet(viewsets.ModelViewSet):
             'manager_comments': request.data.get('manager_comments', '')
         })
         serializer.is_valid(raise_exception=True)
-        tour_program = serializer.save(
-            reviewed_by=request.user,
-            reviewed_at=timezone.now()
-        )
-        
-        # Create notification for the tour program owner
-        create_notification(
-            recipient=tour_program.user,
-            actor=request.user,
-            verb=f"rejected your tour program for {tour_program.month_name} {tour_program.year}",
-            target=tour_program,
-            level='warning'
-        )
+        with transaction.atomic():
+            tour_program = serializer.save(
+                reviewed_by=request.user,
+                reviewed_at=timezone.now()
+            )
+
+            # Queue a notification for the tour program owner
+            self.notify_owner(tour_program, 'warning')
         
         return Response(serializer.data)
@@ -12,6 +12,7 @@ class UserAdmin(BaseUserAdmin):
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (_('Personal info'), {'fields': ('first_name', 'last_name', 'role', 'phone', 'profile_picture')}),
+        (_('Reporting line'), {'fields': ('manager',)}),
         (_('Permissions'), {'fields': ('is_active', 'is_staff', 'is_superuser',
                                        'groups', 'user_permissions')}),
         (_('Important dates'), {'fields': ('last_login', 'date_joined')}),
@@ -19,9 +20,11 @@ class UserAdmin(BaseUserAdmin):
     add_fieldsets = (
         (None, {
             'classes': ('wide',),
-            'fields': ('email', 'password1', 'password2', 'role'),
+            'fields': ('email', 'password1', 'password2', 'role', 'manager'),
         }),
     )
-    list_display = ('email', 'first_name', 'last_name', 'role', 'is_staff')
+    list_display = ('email', 'first_name', 'last_name', 'role', 'manager', 'is_staff')
+    list_select_related = ('manager',)
     search_fields = ('email', 'first_name', 'last_name')
+    autocomplete_fields = ('manager',)
     ordering = ('email',)
\ No newline at end of file
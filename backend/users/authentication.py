@@ -0,0 +1,122 @@
+"""
+JWT authentication without a user query on every request.
+
+``CachedJWTAuthentication`` keeps each user's fields (all but the password)
+in a small per-process LRU with a short TTL. Saving or
+deleting a user evicts it from this process's cache (see
+``users.signals``); other processes notice within
+``JWT_USER_CACHE_TTL`` seconds.
+
+With ``JWT_TRUST_TOKEN_CLAIMS`` on, the same fields are read from the
+claims ``users.token_views`` puts in each access token (role, flags, name
+and manager), and the database is not consulted at all. Changes to a user,
+including deactivation, then only apply once their access token expires:
+refresh tokens carry no claims, and refreshing re-reads the user, refusing
+inactive ones.
+
+Either way the user is a real ``User`` with the missing fields deferred,
+so code that reads them or calls ``save()`` keeps working, at the cost of
+a query per deferred field read.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+# Fields carried as token claims; the cache holds every field but the password.
+CLAIM_FIELDS = ('email', 'first_name', 'last_name', 'role', 'is_staff', 'is_superuser', 'manager_id')
+CACHED_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields if field.attname not in ('id', 'password')
+)
+
+
+class UserCache:
+    """Bounded, thread-safe LRU of user field values with a TTL."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, values):
+        expires = time.monotonic() + getattr(settings, 'JWT_USER_CACHE_TTL', 60)
+        with self._lock:
+            self._entries[user_id] = (expires, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > getattr(settings, 'JWT_USER_CACHE_SIZE', 1024):
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+def user_from_values(user_id, values):
+    """Build a ``User`` with ``values`` loaded and every other field deferred."""
+    loaded = {'id': user_id, **values}
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in loaded]
+    return User.from_db(router.db_for_read(User), field_names, [loaded[name] for name in field_names])
+
+
+def token_claims(user):
+    """Claims describing ``user`` for ``JWT_TRUST_TOKEN_CLAIMS``."""
+    return {field: getattr(user, field) for field in CLAIM_FIELDS}
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` resolving users from a cache or the token."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares the password hash, which is not cached.
+            return super().get_user(validated_token)
+
+        if getattr(settings, 'JWT_TRUST_TOKEN_CLAIMS', False) and all(
+            field in validated_token for field in CLAIM_FIELDS
+        ):
+            values = {field: validated_token[field] for field in CLAIM_FIELDS}
+            return user_from_values(user_id, {**values, 'is_active': True})
+
+        values = user_cache.get(user_id)
+        if values is None:
+            values = (
+                User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values(*CACHED_FIELDS).first()
+            )
+            if values is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.set(user_id, values)
+
+        if not values['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user_from_values(user_id, values)
@@ -0,0 +1,77 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Set who users report to (managers only see their own team\'s records)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('emails', nargs='*', help='Users to place under --manager')
+        parser.add_argument('--manager', help='Email of the manager to assign the users to')
+        parser.add_argument(
+            '--unassigned-mrs',
+            action='store_true',
+            help='Also assign every active MR who has no manager yet to --manager',
+        )
+        parser.add_argument(
+            '--csv',
+            dest='csv_path',
+            help='CSV file of "user email,manager email" rows (an empty manager clears it)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the changes',
+        )
+
+    def handle(self, *args, **options):
+        assignments = []
+        if options['csv_path']:
+            with open(options['csv_path'], newline='') as f:
+                for row in csv.reader(f):
+                    if not row or row[0].strip().lower() in ('', 'email', 'user'):
+                        continue
+                    assignments.append((row[0].strip(), row[1].strip() if len(row) > 1 else ''))
+
+        if options['emails'] or options['unassigned_mrs']:
+            if not options['manager']:
+                raise CommandError('--manager is required with user emails or --unassigned-mrs.')
+            emails = list(options['emails'])
+            if options['unassigned_mrs']:
+                emails += User.objects.filter(role='mr', is_active=True, manager__isnull=True).exclude(
+                    email__iexact=options['manager']
+                ).values_list('email', flat=True)
+            assignments += [(email, options['manager']) for email in emails]
+
+        if not assignments:
+            raise CommandError('Nothing to assign; pass user emails, --unassigned-mrs or --csv.')
+
+        changed = 0
+        with transaction.atomic():
+            for email, manager_email in assignments:
+                user = self.get_user(email)
+                manager = self.get_user(manager_email) if manager_email else None
+                if user.manager_id == (manager.pk if manager else None):
+                    continue
+                self.stdout.write(f'{user.email} -> {manager.email if manager else "(none)"}')
+                changed += 1
+                if options['dry_run']:
+                    continue
+                user.manager = manager
+                try:
+                    user.save(update_fields=['manager'])
+                except ValueError as e:
+                    raise CommandError(f'{user.email}: {e}')
+
+        verb = 'would change' if options['dry_run'] else 'changed'
+        self.stdout.write(self.style.SUCCESS(f'{changed} reporting lines {verb}'))
+
+    def get_user(self, email):
+        try:
+            return User.objects.get(email__iexact=email)
+        except User.DoesNotExist:
+            raise CommandError(f'No user with email {email}')
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_self_links(apps, schema_editor):
+    """Every user is their own depth-0 ancestor in the closure table."""
+    User = apps.get_model('users', 'User')
+    ReportingLine = apps.get_model('users', 'ReportingLine')
+    ReportingLine.objects.bulk_create([
+        ReportingLine(ancestor_id=pk, descendant_id=pk, depth=0)
+        for pk in User.objects.values_list('pk', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='manager',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='direct_reports', to=settings.AUTH_USER_MODEL, verbose_name='Reports To'),
+        ),
+        migrations.CreateModel(
+            name='ReportingLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(default=0)),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Reporting Line',
+                'verbose_name_plural': 'Reporting Lines',
+                'indexes': [models.Index(fields=['ancestor', 'depth'], name='users_repor_ancesto_d51976_idx'), models.Index(fields=['descendant', 'depth'], name='users_repor_descend_dc12f6_idx')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(create_self_links, migrations.RunPython.noop),
+    ]
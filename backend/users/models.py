@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DEFERRED
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 
@@ -51,11 +52,124 @@ class User(AbstractUser):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='mr')
     phone = models.CharField(max_length=15, blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    manager = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='direct_reports',
+        verbose_name=_('Reports To')
+    )
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
     objects = UserManager()
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Read through __dict__ so deferred loads don't trigger a query.
+        self._saved_manager_id = self.__dict__.get('manager_id', DEFERRED)
+
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+    @property
+    def full_name(self):
+        """Return the full name, falling back to the email address."""
+        return self.get_full_name() or self.email
+
+    def save(self, *args, **kwargs):
+        """Save the user and keep the reporting-line closure table in sync."""
+        adding = self._state.adding
+        manager_changed = 'manager_id' in self.__dict__ and self.manager_id != self._saved_manager_id
+
+        if self.manager_id and (adding or manager_changed):
+            if self.pk and (self.manager_id == self.pk or ReportingLine.objects.filter(
+                ancestor_id=self.pk, descendant_id=self.manager_id
+            ).exists()):
+                raise ValueError('A user cannot report to themselves or to one of their own reports.')
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                ReportingLine.objects.create(ancestor=self, descendant=self, depth=0)
+                ReportingLine.attach_subtree(self)
+            elif manager_changed:
+                ReportingLine.detach_subtree(self)
+                ReportingLine.attach_subtree(self)
+
+        self._saved_manager_id = self.__dict__.get('manager_id', DEFERRED)
+
+    def team_user_ids(self, include_self=True):
+        """
+        Return a subquery of the ids of everyone reporting to this user at any
+        level, for use in ``user__in=`` filters.
+        """
+        links = ReportingLine.objects.filter(ancestor=self)
+        if not include_self:
+            links = links.filter(depth__gte=1)
+        return links.values('descendant_id')
+
+    def get_team_members(self):
+        """Return the active MRs reporting to this user, directly or indirectly."""
+        return User.objects.filter(
+            ancestor_links__ancestor=self,
+            ancestor_links__depth__gte=1,
+            role='mr',
+            is_active=True
+        )
+
+    def get_approvers(self):
+        """Return the active managers above this user in the reporting line."""
+        return User.objects.filter(
+            descendant_links__descendant=self,
+            descendant_links__depth__gte=1,
+            role='manager',
+            is_active=True
+        )
+
+
+class ReportingLine(models.Model):
+    """
+    Closure table of the manager hierarchy.
+
+    There is one row for every (ancestor, descendant) pair in the reporting
+    line, including a depth-0 row linking each user to themselves, so a
+    whole team at any depth is a single indexed lookup.
+    """
+
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Reporting Line')
+        verbose_name_plural = _('Reporting Lines')
+        unique_together = ['ancestor', 'descendant']
+        indexes = [
+            models.Index(fields=['ancestor', 'depth']),
+            models.Index(fields=['descendant', 'depth']),
+        ]
+
+    def __str__(self):
+        return f"{self.descendant} -> {self.ancestor} ({self.depth})"
+
+    @classmethod
+    def detach_subtree(cls, user):
+        """Remove the links between a user's subtree and their old managers."""
+        subtree = cls.objects.filter(ancestor=user).values('descendant_id')
+        cls.objects.filter(descendant_id__in=subtree).exclude(ancestor_id__in=subtree).delete()
+
+    @classmethod
+    def attach_subtree(cls, user):
+        """Link a user's subtree to every manager above ``user.manager``."""
+        if not user.manager_id:
+            return
+        ancestors = list(cls.objects.filter(descendant_id=user.manager_id).values_list('ancestor_id', 'depth'))
+        subtree = list(cls.objects.filter(ancestor=user).values_list('descendant_id', 'depth'))
+        cls.objects.bulk_create([
+            cls(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=up + down + 1)
+            for ancestor_id, up in ancestors
+            for descendant_id, down in subtree
+        ])
\ No newline at end of file
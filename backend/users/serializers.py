@@ -3,17 +3,46 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Roles a user may report to.
+MANAGER_ROLES = ('manager', 'admin')
 
-class UserSerializer(serializers.ModelSerializer):
+
+class ManagerFieldMixin:
+    """Let only admins set ``manager``, and only to an active manager or admin."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Only admins may change who a user reports to.
+        request = self.context.get('request')
+        if not (request and request.user.is_staff):
+            fields['manager'].read_only = True
+        return fields
+
+    def validate_manager(self, manager):
+        if manager and (manager.role not in MANAGER_ROLES or not manager.is_active):
+            raise serializers.ValidationError('Users can only report to an active manager or admin.')
+        return manager
+
+
+class UserSerializer(ManagerFieldMixin, serializers.ModelSerializer):
     """Serializer for the User model."""
 
     class Meta:
         model = User
-        fields = ['id', 'email', 'first_name', 'last_name', 'role', 'phone', 'profile_picture', 'is_staff', 'is_superuser']
+        fields = ['id', 'email', 'first_name', 'last_name', 'role', 'phone', 'profile_picture', 'manager', 'is_staff', 'is_superuser']
         read_only_fields = ['id', 'is_staff', 'is_superuser']
 
+    def validate_manager(self, manager):
+        manager = super().validate_manager(manager)
+        if manager and self.instance and (
+            manager.pk == self.instance.pk
+            or manager.ancestor_links.filter(ancestor=self.instance).exists()
+        ):
+            raise serializers.ValidationError('A user cannot report to themselves or to one of their own reports.')
+        return manager
+
 
-class UserCreateSerializer(serializers.ModelSerializer):
+class UserCreateSerializer(ManagerFieldMixin, serializers.ModelSerializer):
     """Serializer for creating a new user."""
 
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
@@ -21,7 +50,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ['email', 'password', 'password2', 'first_name', 'last_name', 'role', 'phone', 'profile_picture']
+        fields = ['email', 'password', 'password2', 'first_name', 'last_name', 'role', 'phone', 'profile_picture', 'manager']
 
     def validate(self, attrs):
         if attrs['password'] != attrs['password2']:
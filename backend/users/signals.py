@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .models import User, ReportingLine
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    """Drop this process's cached copy of a changed user."""
+    user_cache.evict(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def detach_reports_of_deleted_user(sender, instance, **kwargs):
+    """
+    A deleted manager's reports become roots (``manager`` is SET_NULL), so
+    unlink them from everyone above the deleted user.
+    """
+    above = ReportingLine.objects.filter(descendant=instance, depth__gte=1).values('ancestor_id')
+    below = ReportingLine.objects.filter(ancestor=instance, depth__gte=1).values('descendant_id')
+    ReportingLine.objects.filter(ancestor_id__in=above, descendant_id__in=below).delete()
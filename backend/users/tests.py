@@ -1,3 +1,179 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .authentication import user_cache
+
+from .models import ReportingLine
+
+User = get_user_model()
+
+
+class ReportingLineTestCase(TestCase):
+    """Test cases for the manager hierarchy closure table."""
+
+    def setUp(self):
+        self.head = User.objects.create_user(email='head@test.com', role='manager')
+        self.manager = User.objects.create_user(email='manager@test.com', role='manager', manager=self.head)
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr', manager=self.manager)
+        self.other_manager = User.objects.create_user(email='other@test.com', role='manager')
+
+    def test_team_members_span_all_levels(self):
+        """Test that team lookups include indirect reports in one query."""
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.head.get_team_members()), [self.mr])
+        self.assertEqual(list(self.manager.get_team_members()), [self.mr])
+        self.assertFalse(self.other_manager.get_team_members().exists())
+        self.assertEqual(set(self.mr.get_approvers()), {self.head, self.manager})
+
+    def test_reassigning_manager_moves_subtree(self):
+        """Test that moving a manager moves their reports with them."""
+        self.manager.manager = self.other_manager
+        self.manager.save()
+
+        self.assertFalse(self.head.get_team_members().exists())
+        self.assertEqual(list(self.other_manager.get_team_members()), [self.mr])
+        self.assertEqual(
+            ReportingLine.objects.get(ancestor=self.other_manager, descendant=self.mr).depth, 2
+        )
+
+    def test_cycles_are_rejected(self):
+        """Test that a user cannot report to one of their own reports."""
+        self.head.manager = self.mr
+        with self.assertRaises(ValueError):
+            self.head.save()
+
+    def test_deleting_manager_unlinks_reports(self):
+        """Test that reports of a deleted manager leave the old chain."""
+        self.manager.delete()
+        self.mr.refresh_from_db()
+
+        self.assertIsNone(self.mr.manager)
+        self.assertFalse(self.head.get_team_members().exists())
+        self.assertEqual(list(ReportingLine.objects.filter(descendant=self.mr)), [
+            ReportingLine.objects.get(ancestor=self.mr, descendant=self.mr)
+        ])
+
+
+class ManagerAssignmentTestCase(APITestCase):
+    """Test cases for setting reporting lines through the API and command."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@test.com', role='admin', is_staff=True)
+        self.manager = User.objects.create_user(email='manager@test.com', role='manager')
+        self.mr = User.objects.create_user(email='mr@test.com', role='mr')
+
+    def test_admin_can_set_manager(self):
+        """Test that staff can assign a manager and non-staff cannot."""
+        self.client.force_authenticate(user=self.mr)
+        self.client.patch(f'/api/users/{self.mr.pk}/', {'manager': self.manager.pk})
+        self.mr.refresh_from_db()
+        self.assertIsNone(self.mr.manager)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.patch(f'/api/users/{self.mr.pk}/', {'manager': self.manager.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(self.manager.get_team_members()), [self.mr])
+
+        response = self.client.patch(f'/api/users/{self.manager.pk}/', {'manager': self.mr.pk})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_admins_set_manager_on_create(self):
+        """Test that a new user's manager is set by staff only, and must be an active manager."""
+        data = {'email': 'new@test.com', 'password': 'Str0ng-pass!', 'password2': 'Str0ng-pass!', 'role': 'mr'}
+        self.client.force_authenticate(user=self.mr)
+        response = self.client.post('/api/users/', {**data, 'manager': self.manager.pk})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(User.objects.get(email='new@test.com').manager)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post('/api/users/', {**data, 'email': 'mr2@test.com', 'manager': self.mr.pk})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.manager.is_active = False
+        self.manager.save()
+        response = self.client.post('/api/users/', {**data, 'email': 'mr2@test.com', 'manager': self.manager.pk})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post('/api/users/', {**data, 'email': 'mr2@test.com', 'manager': self.admin.pk})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(self.admin.get_team_members()), [User.objects.get(email='mr2@test.com')])
+
+    def test_assign_managers_command(self):
+        """Test that the command places unassigned MRs under a manager."""
+        out = StringIO()
+        call_command('assign_managers', '--manager', 'manager@test.com', '--unassigned-mrs', stdout=out)
+        self.assertIn('1 reporting lines changed', out.getvalue())
+        self.assertEqual(list(self.manager.get_team_members()), [self.mr])
+
+        with self.assertRaises(CommandError):
+            call_command('assign_managers', 'mr@test.com', stdout=StringIO())
+
+
+class CachedJWTAuthenticationTestCase(APITestCase):
+    """Test cases for resolving JWT users without a query per request."""
+
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.user = User.objects.create_user(email='mr@test.com', password='secret123', role='mr')
+        self.url = '/api/users/me/'
+
+    def get(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return self.client.get(self.url)
+
+    def count_auth_queries(self, token):
+        """Count the queries of a request, less those of the view itself."""
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as view:
+            self.client.get(self.url)
+        self.client.force_authenticate(user=None)
+        with CaptureQueriesContext(connection) as total:
+            response = self.get(token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(total) - len(view)
+
+    def test_user_is_cached_until_it_changes(self):
+        """Test that repeat requests skip the user query and saves evict it."""
+        token = AccessToken.for_user(self.user)
+        self.assertEqual(self.count_auth_queries(token), 1)
+        self.assertEqual(self.count_auth_queries(token), 0)
+
+        self.user.role = 'manager'
+        self.user.save()
+        self.assertEqual(self.get(token).data['role'], 'manager')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get(token).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(JWT_TRUST_TOKEN_CLAIMS=True)
+    def test_trusted_claims_skip_the_database(self):
+        """Test that tokens from the login view carry claims that are trusted."""
+        response = self.client.post('/api/token/', {'email': 'mr@test.com', 'password': 'secret123'})
+        token = response.data['access']
+        self.assertEqual(AccessToken(token)['role'], 'mr')
+        self.assertEqual(self.count_auth_queries(token), 0)
+
+    @override_settings(JWT_TRUST_TOKEN_CLAIMS=True)
+    def test_refresh_reads_the_user_again(self):
+        """Test that refreshed access tokens carry current claims and inactive users are refused."""
+        refresh = self.client.post('/api/token/', {'email': 'mr@test.com', 'password': 'secret123'}).data['refresh']
+        self.assertNotIn('role', RefreshToken(refresh))
+
+        self.user.role = 'manager'
+        self.user.save()
+        response = self.client.post('/api/token/refresh/', {'refresh': refresh})
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'manager')
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post('/api/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
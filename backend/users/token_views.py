@@ -1,8 +1,27 @@
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .authentication import token_claims
+from .models import User
 from .serializers import UserSerializer
 
 
+def stamp_claims(access, user):
+    """
+    Return the encoded access token ``access`` with ``user``'s claims added.
+
+    Only access tokens carry them (see JWT_TRUST_TOKEN_CLAIMS); refresh
+    tokens do not, so each refresh reads the user again.
+    """
+    token = AccessToken(access)
+    for claim, value in token_claims(user).items():
+        token[claim] = value
+    return str(token)
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     Custom token serializer that includes user data in the response
@@ -10,6 +29,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
         # Get the token data from the parent class
         data = super().validate(attrs)
+        data['access'] = stamp_claims(data['access'], self.user)
         
         # Add user data to the response
         user_serializer = UserSerializer(self.user)
@@ -18,8 +38,33 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh serializer that re-reads the user, so a new access token never
+    outlives a deactivation or carries a stale role.
+    """
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        ).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(_("No active account found for the given token"), code="user_inactive")
+
+        data = super().validate(attrs)
+        data['access'] = stamp_claims(data['access'], user)
+        return data
+
+
 class CustomTokenObtainPairView(TokenObtainPairView):
     """
     Custom token view that uses the custom serializer
     """
-    serializer_class = CustomTokenObtainPairSerializer
\ No newline at end of file
+    serializer_class = CustomTokenObtainPairSerializer
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    """
+    Token refresh view that re-stamps the user's current claims
+    """
+    serializer_class = CustomTokenRefreshSerializer
@@ -36,5 +36,6 @@ class UserViewSet(viewsets.ModelViewSet):
         """
         Return the currently authenticated user's information.
         """
-        serializer = self.get_serializer(request.user)
+        # request.user only has the fields authentication needs loaded.
+        serializer = self.get_serializer(User.objects.get(pk=request.user.pk))
         return Response(serializer.data)
\ No newline at end of file
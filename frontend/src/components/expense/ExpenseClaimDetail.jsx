@@ -276,7 +276,7 @@ const ExpenseClaimDetail = () => {
             <div className="space-y-3">
               <div className="bg-white p-2 rounded border border-gray-200 inline-block">
                 <img
-                  src={currentExpenseClaim.attachment_url}
+                  src={currentExpenseClaim.attachment_preview_url || currentExpenseClaim.attachment_url}
                   alt="Receipt"
                   className="max-h-60 rounded"
                 />
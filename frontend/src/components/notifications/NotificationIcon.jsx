@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useSelector, useDispatch } from 'react-redux';
-import { fetchUnreadCount } from '../../store/slices/notificationSlice';
+import { watchNotifications } from '../../store/slices/notificationSlice';
 import NotificationList from './NotificationList';
 import './Notifications.css';
 
@@ -9,19 +9,8 @@ const NotificationIcon = () => {
   const { unreadCount } = useSelector((state) => state.notification);
   const dispatch = useDispatch();
   
-  // Fetch unread count on component mount and every 30 seconds
-  useEffect(() => {
-    dispatch(fetchUnreadCount());
-    console.log('NotificationIcon mounted, fetching unread count');
-    
-    // Set up polling for new notifications
-    const interval = setInterval(() => {
-      dispatch(fetchUnreadCount());
-      console.log('Polling for notifications');
-    }, 30000); // 30 seconds
-    
-    return () => clearInterval(interval);
-  }, [dispatch]);
+  // Follow the unread count live, falling back to polling
+  useEffect(() => dispatch(watchNotifications()), [dispatch]);
   
   // Log unread count when it changes
   useEffect(() => {
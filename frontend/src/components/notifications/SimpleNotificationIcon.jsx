@@ -1,6 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
 import { useSelector, useDispatch } from 'react-redux';
-import { fetchUnreadCount } from '../../store/slices/notificationSlice';
+import { watchNotifications } from '../../store/slices/notificationSlice';
 import NotificationList from './NotificationList';
 import { Button } from '../ui/button';
 import { Badge } from '../ui/badge';
@@ -12,17 +12,8 @@ const SimpleNotificationIcon = () => {
   const { unreadCount } = useSelector((state) => state.notification);
   const dispatch = useDispatch();
 
-  // Fetch unread count on component mount
-  useEffect(() => {
-    dispatch(fetchUnreadCount());
-
-    // Set up polling for new notifications
-    const interval = setInterval(() => {
-      dispatch(fetchUnreadCount());
-    }, 30000); // 30 seconds
-
-    return () => clearInterval(interval);
-  }, [dispatch]);
+  // Follow the unread count live, falling back to polling
+  useEffect(() => dispatch(watchNotifications()), [dispatch]);
 
   return (
     <Popover>
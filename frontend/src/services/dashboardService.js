@@ -12,3 +12,23 @@ export const getDashboardData = async () => {
     throw error;
   }
 };
+
+
+/**
+ * Get a page of the manager approval inbox
+ * @param {string} cursor - Cursor from the previous page's `next` link (optional)
+ * @param {number} pageSize - Items per page
+ * @returns {Promise<Object>} - { counts, next, results } with items of all types
+ */
+export const getInbox = async (cursor = null, pageSize = 20) => {
+  try {
+    const params = { page_size: pageSize };
+    if (cursor) {
+      params.cursor = cursor;
+    }
+    const response = await api.get('/inbox/', { params });
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
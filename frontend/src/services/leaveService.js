@@ -116,4 +116,19 @@ export const rejectLeaveRequest = async (id, comments = '') => {
   } catch (error) {
     throw error;
   }
-};
\ No newline at end of file
+};
+
+/**
+ * Get the current user's leave balances
+ * @param {number} year - Year to report (defaults to the current year)
+ * @returns {Promise<Array>} - Used, pending and remaining days per leave type
+ */
+export const getLeaveBalances = async (year) => {
+  try {
+    const params = year ? { year } : {};
+    const response = await api.get('/leaves/leave-requests/balances/', { params });
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
@@ -55,4 +55,54 @@ export const markAllAsRead = async () => {
   } catch (error) {
     throw error;
   }
-};
\ No newline at end of file
+};
+
+/**
+ * Whether the browser can open the live notification stream
+ * @returns {boolean}
+ */
+export const isStreamSupported = () => typeof EventSource !== 'undefined';
+
+/**
+ * Get a short-lived ticket for opening the live notification stream.
+ * Fails with 501 when the server cannot stream (WSGI deployments).
+ * @returns {Promise} - Promise with the ticket string
+ */
+export const getStreamTicket = async () => {
+  const response = await api.post('/notifications/stream-ticket/');
+  return response.data.ticket;
+};
+
+/**
+ * Open the live notification stream (Server-Sent Events)
+ * @param {string} ticket - Ticket from getStreamTicket()
+ * @param {Object} handlers - { onUnreadCount(count), onNotification(data), onResync(), onClosed(wasLive) }
+ * @returns {Function} - Function that closes the stream
+ */
+export const openNotificationStream = (ticket, { onUnreadCount, onNotification, onResync, onClosed }) => {
+  const url = `${api.defaults.baseURL}/notifications/stream/?ticket=${encodeURIComponent(ticket)}`;
+  const source = new EventSource(url);
+  let live = false;
+
+  source.addEventListener('unread_count', (event) => {
+    live = true;
+    onUnreadCount(JSON.parse(event.data).unread_count);
+  });
+  source.addEventListener('notification', (event) => {
+    live = true;
+    const data = JSON.parse(event.data);
+    if (data.unread_count !== undefined) {
+      onUnreadCount(data.unread_count);
+    }
+    onNotification?.(data);
+  });
+  source.addEventListener('resync', () => onResync?.());
+  source.onerror = () => {
+    // The ticket expires within seconds, so let the caller reconnect with a
+    // fresh one instead of letting EventSource retry this URL.
+    source.close();
+    onClosed?.(live);
+  };
+
+  return () => source.close();
+};
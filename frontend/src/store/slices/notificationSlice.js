@@ -52,6 +52,75 @@ export const markAllNotificationsAsRead = createAsyncThunk(
   }
 );
 
+// Poll every 30 seconds until the live stream delivers, and whenever it is down
+const POLL_INTERVAL = 30000;
+// Pause before re-opening a stream that was working
+const RECONNECT_DELAY = 3000;
+
+/**
+ * Keep the unread count current. Polls until the live stream delivers its
+ * first event, and again whenever the stream drops; servers that cannot
+ * stream refuse the ticket, leaving polling in place. Returns a function
+ * that stops watching.
+ */
+export const watchNotifications = () => (dispatch) => {
+  let interval = null;
+  let reconnectTimer = null;
+  let closeStream = null;
+  let stopped = false;
+
+  const startPolling = () => {
+    if (!interval) {
+      interval = setInterval(() => dispatch(fetchUnreadCount()), POLL_INTERVAL);
+    }
+  };
+  const stopPolling = () => {
+    clearInterval(interval);
+    interval = null;
+  };
+
+  const connect = async () => {
+    let ticket;
+    try {
+      ticket = await notificationService.getStreamTicket();
+    } catch (error) {
+      // 501 when the server runs without ASGI: keep polling.
+      return;
+    }
+    if (stopped) {
+      return;
+    }
+    closeStream = notificationService.openNotificationStream(ticket, {
+      onUnreadCount: (count) => {
+        stopPolling();
+        dispatch(setUnreadCount(count));
+      },
+      onResync: () => dispatch(fetchUnreadCount()),
+      onClosed: (wasLive) => {
+        closeStream = null;
+        startPolling();
+        // Streams end periodically; reopen the ones that were delivering.
+        if (wasLive && !stopped) {
+          reconnectTimer = setTimeout(connect, RECONNECT_DELAY);
+        }
+      },
+    });
+  };
+
+  dispatch(fetchUnreadCount());
+  startPolling();
+  if (notificationService.isStreamSupported()) {
+    connect();
+  }
+
+  return () => {
+    stopped = true;
+    closeStream?.();
+    clearTimeout(reconnectTimer);
+    stopPolling();
+  };
+};
+
 // Initial state
 const initialState = {
   notifications: [],
@@ -73,6 +142,9 @@ const notificationSlice = createSlice({
     clearSuccess: (state) => {
       state.success = false;
     },
+    setUnreadCount: (state, action) => {
+      state.unreadCount = action.payload;
+    },
   },
   extraReducers: (builder) => {
     builder
@@ -154,6 +226,6 @@ const notificationSlice = createSlice({
   },
 });
 
-export const { clearError, clearSuccess } = notificationSlice.actions;
+export const { clearError, clearSuccess, setUnreadCount } = notificationSlice.actions;
 
 export default notificationSlice.reducer;
\ No newline at end of file